@@ -1,7 +1,16 @@
 # epydemix/calibration/__init__.py
 
 from .abc import ABCSampler
-from .calibration_results import CalibrationResults
+from .calibration_results import CalibrationResults, ParticleTrajectories
 from .metrics import ae, mae, mape, rmse, wmape
 
-__all__ = ["rmse", "wmape", "ae", "mae", "mape", "CalibrationResults", "ABCSampler"]
+__all__ = [
+    "rmse",
+    "wmape",
+    "ae",
+    "mae",
+    "mape",
+    "CalibrationResults",
+    "ParticleTrajectories",
+    "ABCSampler",
+]
@@ -1,17 +1,167 @@
 import copy
+import os
+from collections import deque
+from concurrent.futures import Executor
 from datetime import datetime, timedelta
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 
+from ..model.epimodel import SimulationAborted, spawn_seeds
 from ..utils.abc_smc_utils import (
+    PERTURBATION_KERNELS,
     DefaultPerturbationContinuous,
     DefaultPerturbationDiscrete,
+    MultivariatePerturbation,
+    compute_smc_weights,
+    perturbation_groups,
     sample_prior,
 )
-from .calibration_results import CalibrationResults
-from .metrics import rmse
+from .calibration_results import CalibrationResults, ParticleTrajectories
+from .metrics import get_partial_distance, rmse
+
+# Candidates proposed per batch and per CPU when an executor is given
+BATCH_SIZE_PER_CPU = 4
+
+# Policies for the simulations of the accepted particles kept in the results
+STORE_TRAJECTORIES = ["none", "last_generation", "all"]
+
+
+class DistanceBound:
+    """
+    Stop condition of a simulation whose distance to the observed data already exceeds the tolerance.
+
+    Called by `simulate` at checkpoints with the trajectory simulated so far. The partial
+    distance of its first observations (the last one, possibly covering an incomplete period,
+    is left out) is a lower bound of the final distance, so the simulation can be aborted as
+    soon as it exceeds the tolerance.
+
+    Attributes:
+        observation (Callable): Maps a trajectory to the simulated data dictionary
+        partial_distance (Callable): Lower bound of the distance from the first observations
+        observed_data (Dict): The observed data dictionary
+        epsilon (float): The tolerance
+    """
+
+    def __init__(
+        self,
+        observation: Callable,
+        partial_distance: Callable,
+        observed_data: Dict[str, Any],
+        epsilon: float,
+    ) -> None:
+        self.observation = observation
+        self.partial_distance = partial_distance
+        self.observed_data = observed_data
+        self.epsilon = epsilon
+
+    def __call__(self, trajectory: Any) -> bool:
+        simulated = np.asarray(self.observation(trajectory)["data"])[:-1]
+        if len(simulated) == 0:
+            return False
+        return bool(
+            self.partial_distance(self.observed_data, {"data": simulated})
+            > self.epsilon
+        )
+
+
+class CandidateStream:
+    """
+    Candidate particles with their simulation and distance, in proposal order.
+
+    Without an executor, each candidate is proposed with the sampler's generator and
+    simulated when it is requested. With an executor, candidates are proposed in batches
+    of ``batch_size``, each with its own generator spawned from the sampler's, and the
+    simulations of a batch are submitted at once. A batch is only submitted before the
+    deadline and never takes the stream past its limit, so the stream stops at the
+    simulation budget and the time limit. `close` cancels the simulations that have not
+    started.
+
+    Attributes:
+        n_simulations (int): Number of simulations run or started so far, including those whose
+            candidate was not consumed
+    """
+
+    def __init__(
+        self,
+        sampler: "ABCSampler",
+        propose: Callable[[np.random.Generator], List[float]],
+        limit: Optional[int] = None,
+        epsilon: Optional[float] = None,
+        deadline: Optional[datetime] = None,
+    ) -> None:
+        """
+        Args:
+            sampler (ABCSampler): The sampler simulating the candidates
+            propose (Callable): Function drawing the parameters of a candidate with a generator
+            limit (int, optional): Maximum number of simulations. Default is None (no limit).
+            epsilon (float, optional): The tolerance of the candidates, used to abort simulations with
+                ``early_abort``. Default is None (no abort).
+            deadline (datetime, optional): No simulation is started after this time. Default is None.
+        """
+        self.sampler = sampler
+        self.propose = propose
+        self.limit = limit
+        self.epsilon = epsilon
+        self.deadline = deadline
+        self.n_simulations = 0
+        self._pending = deque()
+        self._seed_seq = (
+            None if sampler.executor is None else spawn_seeds(sampler.rng, 1)[0]
+        )
+
+    def __iter__(self) -> "CandidateStream":
+        return self
+
+    def __next__(self) -> Tuple[List[float], Optional[Dict[str, Any]], float]:
+        if not self._pending:
+            self._submit()
+        params, result = self._pending.popleft()
+        if self._seed_seq is not None:
+            result = result.result()
+        return (params, *result)
+
+    def _submit(self) -> None:
+        """Simulates the next candidate, or submits the next batch to the executor."""
+        remaining = None if self.limit is None else self.limit - self.n_simulations
+        if (remaining is not None and remaining <= 0) or (
+            self.deadline is not None and datetime.now() > self.deadline
+        ):
+            raise StopIteration
+        sampler = self.sampler
+        if self._seed_seq is None:
+            params = self.propose(sampler.rng)
+            self.n_simulations += 1
+            self._pending.append(
+                (params, sampler._evaluate(params, epsilon=self.epsilon))
+            )
+            return
+
+        size = (
+            sampler.batch_size
+            if remaining is None
+            else min(sampler.batch_size, remaining)
+        )
+        rngs = [np.random.default_rng(seed) for seed in self._seed_seq.spawn(size)]
+        for rng in rngs:
+            params = self.propose(rng)
+            # The candidate generators seed the simulations only if seeding was requested
+            future = sampler.executor.submit(
+                sampler._evaluate,
+                params,
+                rng if sampler._seed_requested else None,
+                self.epsilon,
+            )
+            self._pending.append((params, future))
+        self.n_simulations += size
+
+    def close(self) -> None:
+        """Cancels the submitted simulations that have not started; the others stay counted."""
+        while self._pending:
+            _, result = self._pending.popleft()
+            if self._seed_seq is not None and result.cancel():
+                self.n_simulations -= 1
 
 
 class ABCSampler:
@@ -27,6 +177,13 @@ class ABCSampler:
         observed_data: Any,
         distance_function: Callable = rmse,
         rng: Optional[Any] = None,
+        executor: Optional[Executor] = None,
+        batch_size: Optional[int] = None,
+        early_abort: Optional[Callable[[Any], Dict[str, Any]]] = None,
+        store_trajectories: str = "all",
+        trajectory_projection: Optional[
+            Callable[[Dict[str, Any]], Dict[str, Any]]
+        ] = None,
     ):
         """Initialize ABC calibration.
 
@@ -38,7 +195,61 @@ class ABCSampler:
                 injected into the simulation as an ``rng`` key. If None and
                 ``parameters`` has no ``"rng"`` key, a fresh unseeded Generator is
                 used and the simulation is not seeded.
+            executor: Optional ``concurrent.futures.Executor`` running the simulations
+                of candidate particles concurrently. Candidates are proposed in batches
+                of ``batch_size``, each with its own generator spawned from ``rng``, and
+                accepted in proposal order, so for a given seed the results depend
+                neither on the executor nor on the batch size (they differ from the
+                sequential results, where all candidates share one generator). With a
+                ``ProcessPoolExecutor``, the simulation and distance functions must be
+                picklable. Batches never exceed the remaining simulation budget and are
+                only submitted before ``max_time``. If None, candidates are simulated one
+                at a time.
+            batch_size: Number of candidates proposed per batch when an ``executor``
+                is given. Defaults to four per CPU.
+            early_abort: Optional function mapping a (partial) ``Trajectory`` to the
+                simulated data dictionary, as the simulation function does with its
+                trajectory. If given, simulations run with a finite tolerance receive a
+                ``stop_condition`` parameter (a `DistanceBound`), which aborts them as
+                soon as the distance of the observations simulated so far exceeds the
+                tolerance; aborted simulations are rejected. It takes effect when the
+                simulation function passes its parameters on to `simulate` (e.g.
+                ``simulate(**parameters)``). Requires a distance whose partial sums
+                bound it from below (see `get_partial_distance`), and observed data
+                aligned with the start of the simulation.
+            store_trajectories: Which simulations of the accepted particles are kept in
+                ``selected_trajectories``: ``"all"`` generations (default),
+                ``"last_generation"`` only, or ``"none"``. They are stored as
+                `ParticleTrajectories`, one ``(num_particles, T)`` array per variable.
+            trajectory_projection: Optional function reducing a simulation dictionary to
+                the dictionary of arrays to store (e.g. a single series). The distance is
+                still computed from the full simulation.
+
+        Raises:
+            ValueError: If ``batch_size`` is not positive, ``early_abort`` is given
+                with a distance without partial distance, or ``store_trajectories`` is
+                unknown.
         """
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        if store_trajectories not in STORE_TRAJECTORIES:
+            raise ValueError(
+                f"Unknown store_trajectories: {store_trajectories}. Must be one of {STORE_TRAJECTORIES}"
+            )
+        self.store_trajectories = store_trajectories
+        self.trajectory_projection = trajectory_projection
+        self.early_abort = early_abort
+        self._partial_distance = get_partial_distance(distance_function)
+        if early_abort is not None and self._partial_distance is None:
+            raise ValueError(
+                "early_abort requires a distance function with a partial distance (e.g. rmse, mae, wmape or mape)"
+            )
+        self.executor = executor
+        self.batch_size = (
+            batch_size
+            if batch_size is not None
+            else BATCH_SIZE_PER_CPU * (os.cpu_count() or 1)
+        )
         self.simulation_function = simulation_function
         self.priors = priors
         self.parameters = parameters.copy()
@@ -61,6 +272,14 @@ class ABCSampler:
             name for name in self.param_names if name not in self.continuous_params
         ]
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # Process pool workers receive the sampler with every task: the executor cannot be
+        # pickled, and the results are not needed to simulate a candidate
+        state = self.__dict__.copy()
+        state["executor"] = None
+        state["results"] = None
+        return state
+
     def calibrate(self, strategy: str = "smc", **kwargs) -> CalibrationResults:
         """Run calibration using the specified strategy.
 
@@ -90,8 +309,9 @@ class ABCSampler:
         - `minimum_epsilon` (`Optional[float]`, default: `None`): Minimum allowable epsilon value.
         - `max_time` (`Optional[timedelta]`, default: `None`): Maximum allowed runtime.
         - `total_simulations_budget` (`Optional[int]`, default: `None`): Maximum number of allowed simulations.
-        - `perturbations` (`Optional[Dict[str, Any]]`, default: `None`): Perturbation kernels for parameters.
+        - `perturbations` (`Optional[Union[Dict[str, Any], List[Any], str]]`, default: `None`): Perturbation kernels for parameters, as a dictionary mapping parameter names to kernels or a list of kernels. A `MultivariatePerturbation` perturbs its parameters jointly. `"mvn"`, `"nearest_neighbours"` or `"olcm"` perturb all continuous parameters with a multivariate normal kernel with a global, M-nearest-neighbour or optimal local covariance. Parameters without a kernel get the default component-wise kernels.
         - `verbose` (`bool`, default: `True`): Whether to print progress updates.
+        - `weight_truncation` (`Optional[float]`, default: `None`): If set, the importance weights only sum the kernels of the previous particles within this many kernel standard deviations, found with a KD-tree (see `compute_smc_weights`). Useful with many particles.
 
         #### `"rejection"` (ABC Rejection Sampling)
         - `epsilon` (`float`, default: `0.1`): Distance threshold for accepting samples.
@@ -107,7 +327,8 @@ class ABCSampler:
         - `verbose` (`bool`, default: `True`): Whether to print progress updates.
 
         ### Returns:
-        - `CalibrationResults`: A deep copy of the results from the chosen calibration strategy.
+        - `CalibrationResults`: A deep copy of the results from the chosen calibration strategy. The read-only
+        `ParticleTrajectories` of the selected trajectories are shared with the sampler's results, not copied.
 
         ### Raises:
         - `ValueError`: If an unknown strategy is specified.
@@ -147,20 +368,12 @@ class ABCSampler:
         minimum_epsilon: Optional[float] = None,
         max_time: Optional[timedelta] = None,
         total_simulations_budget: Optional[int] = None,
-        perturbations: Optional[Dict[str, Any]] = None,
+        perturbations: Optional[Union[Dict[str, Any], List[Any], str]] = None,
         verbose: bool = True,
+        weight_truncation: Optional[float] = None,
     ) -> CalibrationResults:
         """Run ABC-SMC calibration."""
-        # Initialize perturbations if not provided
-        if perturbations is None:
-            perturbations = {
-                param: (
-                    DefaultPerturbationContinuous(param)
-                    if param in self.continuous_params
-                    else DefaultPerturbationDiscrete(param, self.priors[param])
-                )
-                for param in self.param_names
-            }
+        perturbations = self._build_perturbations(perturbations)
 
         if verbose:
             print(
@@ -234,8 +447,19 @@ class ABCSampler:
                     )
 
                 # Update perturbations
-                for perturbation in perturbations.values():
-                    perturbation.update(particles, weights, self.param_names)
+                for perturbation, _ in perturbation_groups(
+                    perturbations, self.param_names
+                ):
+                    if isinstance(perturbation, MultivariatePerturbation):
+                        perturbation.update(
+                            particles,
+                            weights,
+                            self.param_names,
+                            distances=distances,
+                            epsilon=epsilon,
+                        )
+                    else:
+                        perturbation.update(particles, weights, self.param_names)
 
                 # Run generation
                 new_gen = self._run_smc_generation(
@@ -248,6 +472,7 @@ class ABCSampler:
                     max_time,
                     total_simulations_budget,
                     n_simulations,
+                    weight_truncation,
                 )
                 if new_gen is None:
                     if verbose:
@@ -266,7 +491,10 @@ class ABCSampler:
                 )
                 results.distances[gen] = new_gen["distances"]
                 results.weights[gen] = new_gen["weights"]
-                results.selected_trajectories[gen] = new_gen["simulations"]
+                if self.store_trajectories == "last_generation":
+                    results.selected_trajectories.clear()
+                if new_gen["simulations"] is not None:
+                    results.selected_trajectories[gen] = new_gen["simulations"]
 
                 # Update current generation
                 particles = new_gen["particles"]
@@ -317,7 +545,7 @@ class ABCSampler:
         progress_update_interval: int = 1000,
     ) -> CalibrationResults:
         """Run ABC rejection sampling."""
-        simulations, distances = [], []
+        simulations, distances = self._collect_trajectories(num_particles), []
         sampled_params = {p: [] for p in self.param_names}
 
         start_time = datetime.now()
@@ -329,26 +557,19 @@ class ABCSampler:
                 f"Starting ABC rejection sampling with {num_particles} particles and epsilon threshold {epsilon}"
             )
 
-        while len(distances) < num_particles:
-            # Check stopping conditions
-            if self._check_stopping_conditions(
-                None,
-                None,
-                start_time,
-                max_time,
-                n_simulations,
-                total_simulations_budget,
-            ):
-                break
-
-            # Sample and simulate
-            params = self._sample_parameters()
-            simulation = self._run_simulation(params)
-            distance = self.distance_function(self.observed_data, simulation)
+        # The stream stops at the simulation budget and the time limit
+        candidates = self._candidates(
+            self._sample_parameters,
+            limit=total_simulations_budget or None,
+            epsilon=epsilon,
+            start_time=start_time,
+            max_time=max_time,
+        )
+        for params, simulation, distance in candidates:
             n_simulations += 1
 
             if distance < epsilon:
-                simulations.append(simulation)
+                self._store_trajectory(simulations, simulation)
                 distances.append(distance)
                 for i, p in enumerate(self.param_names):
                     sampled_params[p].append(params[i])
@@ -365,6 +586,23 @@ class ABCSampler:
                     f"\tSimulations: {n_simulations}, Accepted: {len(distances)}, "
                     f"Acceptance rate: {acceptance_rate:.2f}%"
                 )
+            if len(distances) >= num_particles:
+                break
+
+        # Simulations started for unconsumed candidates count too
+        candidates.close()
+        n_simulations = candidates.n_simulations
+        if len(distances) < num_particles:
+            # Report the stopping condition that was met
+            self._check_stopping_conditions(
+                None,
+                None,
+                start_time,
+                max_time,
+                n_simulations,
+                total_simulations_budget,
+                verbose=verbose,
+            )
 
         if verbose:
             print(
@@ -377,14 +615,14 @@ class ABCSampler:
             pd.DataFrame(sampled_params),
             np.ones(len(distances)) / len(distances),
             np.array(distances),
-            simulations,
+            simulations if simulations is None else simulations.finalize(),
         )
 
     def run_top_fraction(
         self, top_fraction: float = 0.05, Nsim: int = 100, verbose: bool = True
     ) -> CalibrationResults:
         """Run ABC top fraction selection."""
-        simulations, distances = [], []
+        simulations, distances = self._collect_trajectories(Nsim), []
         sampled_params = {p: [] for p in self.param_names}
 
         if verbose:
@@ -392,12 +630,9 @@ class ABCSampler:
                 f"Starting ABC top fraction selection with {Nsim} simulations and top {top_fraction * 100:.1f}% selected"
             )
 
-        for n in range(Nsim):
-            params = self._sample_parameters()
-            simulation = self._run_simulation(params)
-            distance = self.distance_function(self.observed_data, simulation)
-
-            simulations.append(simulation)
+        candidates = self._candidates(self._sample_parameters, limit=Nsim)
+        for n, (params, simulation, distance) in enumerate(candidates):
+            self._store_trajectory(simulations, simulation)
             distances.append(distance)
             for i, p in enumerate(self.param_names):
                 sampled_params[p].append(params[i])
@@ -424,21 +659,77 @@ class ABCSampler:
             pd.DataFrame(sampled_params)[mask],
             np.ones(sum(mask)) / sum(mask),
             np.array(distances)[mask],
-            np.array(simulations)[mask],
+            simulations if simulations is None else simulations[mask].finalize(),
         )
 
-    def _run_simulation(self, params: List[float]) -> Dict[str, Any]:
-        """Run a single simulation with given parameters."""
+    def _run_simulation(
+        self,
+        params: List[float],
+        rng: Optional[np.random.Generator] = None,
+        epsilon: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Run a single simulation with given parameters.
+
+        ``rng`` is the generator of the candidate when candidates are simulated
+        concurrently; by default, the sampler's generator is used. With ``early_abort``,
+        the simulation is given a stop condition for the tolerance ``epsilon``.
+        """
         full_params = {**self.parameters, **dict(zip(self.param_names, params))}
         # Inject the sampler's Generator only when the user asked for reproducibility
         # (rng= or parameters["rng"]). This makes rng-aware simulations (e.g.
         # epydemix's `simulate`) reproducible and, when an int/seed was passed, avoids
         # reseeding every particle identically.
         if self._seed_requested:
-            full_params["rng"] = self.rng
+            full_params["rng"] = self.rng if rng is None else rng
+        if (
+            self.early_abort is not None
+            and epsilon is not None
+            and np.isfinite(epsilon)
+        ):
+            full_params["stop_condition"] = DistanceBound(
+                self.early_abort, self._partial_distance, self.observed_data, epsilon
+            )
         simulation = self.simulation_function(full_params)
         return self._validate_simulation(simulation)
 
+    def _evaluate(
+        self,
+        params: List[float],
+        rng: Optional[np.random.Generator] = None,
+        epsilon: Optional[float] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Simulate a candidate and compute its distance to the observed data.
+
+        Aborted simulations have no output and an infinite distance.
+        """
+        try:
+            simulation = self._run_simulation(params, rng, epsilon)
+        except SimulationAborted:
+            return None, np.inf
+        return simulation, self.distance_function(self.observed_data, simulation)
+
+    def _candidates(
+        self,
+        propose: Callable[[np.random.Generator], List[float]],
+        limit: Optional[int] = None,
+        epsilon: Optional[float] = None,
+        start_time: Optional[datetime] = None,
+        max_time: Optional[timedelta] = None,
+    ) -> CandidateStream:
+        """Create the stream of proposed candidates with their simulation and distance.
+
+        Args:
+            propose: Function drawing the parameters of a candidate with a generator
+            limit: Maximum number of simulations (e.g. the remaining budget). If None,
+                candidates are proposed as long as they are requested.
+            epsilon: The tolerance of the candidates, used to abort simulations with
+                ``early_abort``. Default is None (no abort).
+            start_time: Start time of the calibration run, for ``max_time``
+            max_time: Maximum allowed runtime; no simulation is started after it
+        """
+        deadline = start_time + max_time if start_time and max_time else None
+        return CandidateStream(self, propose, limit, epsilon, deadline)
+
     def _validate_simulation(self, simulation: Any) -> Dict[str, Any]:
         """Ensure simulation output is in correct format."""
         if not isinstance(simulation, dict):
@@ -447,9 +738,129 @@ class ABCSampler:
             )
         return simulation
 
-    def _sample_parameters(self) -> List[float]:
+    def _collect_trajectories(self, size: int) -> Optional[ParticleTrajectories]:
+        """Creates the container of the simulations of up to `size` accepted particles.
+
+        Returns None if the simulations are not stored.
+        """
+        if self.store_trajectories == "none":
+            return None
+        return ParticleTrajectories(size)
+
+    def _store_trajectory(
+        self, trajectories: Optional[ParticleTrajectories], simulation: Dict[str, Any]
+    ) -> None:
+        """Stores the (projected) simulation of an accepted particle, if simulations are stored."""
+        if trajectories is None:
+            return
+        if self.trajectory_projection is not None:
+            simulation = self._validate_simulation(
+                self.trajectory_projection(simulation)
+            )
+        trajectories.append(simulation)
+
+    def _sample_parameters(
+        self, rng: Optional[np.random.Generator] = None
+    ) -> List[float]:
         """Sample parameters from priors."""
-        return sample_prior(self.priors, self.param_names, self.rng)
+        return sample_prior(
+            self.priors, self.param_names, self.rng if rng is None else rng
+        )
+
+    def _build_perturbations(
+        self, perturbations: Optional[Union[Dict[str, Any], List[Any], str]]
+    ) -> Dict[str, Any]:
+        """Map every parameter to its perturbation kernel, with default kernels for the missing ones.
+
+        Raises:
+            ValueError: If the kernel name is unknown, or a multivariate kernel covers an unknown
+                or discrete parameter or a parameter with another kernel.
+        """
+        if isinstance(perturbations, str):
+            if perturbations not in PERTURBATION_KERNELS:
+                raise ValueError(
+                    f"Unknown perturbation kernel: {perturbations}. Must be one of {list(PERTURBATION_KERNELS)}"
+                )
+            perturbations = (
+                [PERTURBATION_KERNELS[perturbations](self.continuous_params)]
+                if self.continuous_params
+                else []
+            )
+        if perturbations is None:
+            perturbations = {}
+        elif not isinstance(perturbations, dict):
+            perturbations = {
+                name: kernel
+                for kernel in perturbations
+                for name in (
+                    kernel.param_names
+                    if isinstance(kernel, MultivariatePerturbation)
+                    else [kernel.param_name]
+                )
+            }
+
+        result = dict(perturbations)
+        for kernel in perturbations.values():
+            if not isinstance(kernel, MultivariatePerturbation):
+                continue
+            for name in kernel.param_names:
+                if name not in self.continuous_params:
+                    raise ValueError(
+                        f"Multivariate perturbation kernels only apply to continuous parameters, got '{name}'"
+                    )
+                if result.setdefault(name, kernel) is not kernel:
+                    raise ValueError(
+                        f"Parameter '{name}' has several perturbation kernels"
+                    )
+
+        # Default kernels for the parameters without one
+        for param in self.param_names:
+            if param not in result:
+                result[param] = (
+                    DefaultPerturbationContinuous(param)
+                    if param in self.continuous_params
+                    else DefaultPerturbationDiscrete(param, self.priors[param])
+                )
+        return result
+
+    def _perturb_particle(
+        self,
+        particles: np.ndarray,
+        weights: np.ndarray,
+        perturbations: Dict[str, Any],
+        rng: np.random.Generator,
+    ) -> List[float]:
+        """Resample a particle and perturb it until the prior probability is positive."""
+        while True:
+            # Resample a particle based on weights
+            index = rng.choice(len(particles), p=weights / weights.sum())
+            candidate_params = particles[index]
+
+            # Propose new parameters (perturbation kernels)
+            perturbed_params = list(candidate_params)
+            for perturbation, indices in perturbation_groups(
+                perturbations, self.param_names
+            ):
+                if isinstance(perturbation, MultivariatePerturbation):
+                    values = perturbation.propose(
+                        candidate_params[indices], rng, index=index
+                    )
+                    for i, value in zip(indices, values):
+                        perturbed_params[i] = value
+                else:
+                    perturbed_params[indices[0]] = perturbation.propose(
+                        candidate_params[indices[0]], rng
+                    )
+
+            # Check if perturbed parameters have prior probability > 0
+            prior_probabilities = [
+                self.priors[param].pdf(perturbed_params[i])
+                if param in self.continuous_params
+                else self.priors[param].pmf(perturbed_params[i])
+                for i, param in enumerate(self.param_names)
+            ]
+            if all(prob > 0 for prob in prior_probabilities):
+                return perturbed_params
 
     def _create_results(
         self,
@@ -457,13 +868,13 @@ class ABCSampler:
         particles: pd.DataFrame,
         weights: np.ndarray,
         distances: np.ndarray,
-        simulations: List[Dict],
+        simulations: Optional[ParticleTrajectories],
     ) -> CalibrationResults:
         """Create CalibrationResults object."""
         return CalibrationResults(
             calibration_strategy=strategy,
             posterior_distributions={0: particles},
-            selected_trajectories={0: simulations},
+            selected_trajectories={} if simulations is None else {0: simulations},
             distances={0: distances},
             weights={0: weights},
             observed_data=self.observed_data,
@@ -504,12 +915,21 @@ class ABCSampler:
             if verbose:
                 print("Maximum time reached")
             return True
-        if total_simulations_budget and n_simulations > total_simulations_budget:
+        if total_simulations_budget and n_simulations >= total_simulations_budget:
             if verbose:
                 print("Total simulations budget reached")
             return True
         return False
 
+    @staticmethod
+    def _remaining_budget(
+        total_simulations_budget: Optional[int], n_simulations: int
+    ) -> Optional[int]:
+        """Number of simulations left in the budget, or None without budget."""
+        if not total_simulations_budget:
+            return None
+        return max(total_simulations_budget - n_simulations, 0)
+
     def _initialize_particles(
         self,
         num_particles,
@@ -535,43 +955,42 @@ class ABCSampler:
                 - particles: numpy array of shape (num_particles, num_parameters)
                 - weights: numpy array of uniform weights
                 - distances: numpy array of distances between simulations and observed data
-                - simulations: list of simulation results
+                - simulations: `ParticleTrajectories` of the accepted simulations, or None if
+                  they are not stored
                 Returns None if stopped early by time/budget limits.
         """
-        particles, weights, distances, simulations = [], [], [], []
-
-        # Sample from priors and run simulations
-        while len(particles) < num_particles:
-            # Check stopping conditions per simulation
-            if self._check_stopping_conditions(
-                None,
-                None,
-                start_time,
-                max_time,
-                n_simulations,
-                total_simulations_budget,
-                verbose=False,
-            ):
-                return None
-
-            params = sample_prior(self.priors, self.param_names, self.rng)
-            simulated_data = self._run_simulation(params)
-            dist = self.distance_function(
-                data=self.observed_data, simulation=simulated_data
-            )
-            n_simulations += 1
-
+        particles, weights, distances = [], [], []
+        simulations = self._collect_trajectories(num_particles)
+
+        # Sample from priors and run simulations, until the budget or the time is exhausted
+        candidates = self._candidates(
+            self._sample_parameters,
+            limit=self._remaining_budget(total_simulations_budget, n_simulations),
+            epsilon=epsilon,
+            start_time=start_time,
+            max_time=max_time,
+        )
+        for params, simulated_data, dist in candidates:
             if dist <= epsilon:
                 particles.append(params)
                 weights.append(1.0 / num_particles)  # Uniform weights initially
                 distances.append(dist)
-                simulations.append(simulated_data)
+                self._store_trajectory(simulations, simulated_data)
+                if len(particles) == num_particles:
+                    break
+        # Simulations started for unconsumed candidates count too
+        candidates.close()
+        n_simulations += candidates.n_simulations
+        if len(particles) < num_particles:
+            return None
 
         return {
             "particles": np.array(particles),
             "weights": np.array(weights),
             "distances": np.array(distances),
-            "simulations": simulations,
+            "simulations": simulations
+            if simulations is None
+            else simulations.finalize(),
             "n_simulations": n_simulations,
         }
 
@@ -586,89 +1005,57 @@ class ABCSampler:
         max_time=None,
         total_simulations_budget=None,
         n_simulations=0,
+        weight_truncation=None,
     ) -> Optional[Dict[str, Any]]:
         """Run a single generation of ABC-SMC.
 
+        The importance weights are computed for the whole generation once its particles
+        are accepted (see `compute_smc_weights`).
+
         Returns None if stopped early by time/budget limits.
         """
-        new_particles, new_weights, new_distances, new_simulations = [], [], [], []
-
-        for _ in range(num_particles):
-            while True:
-                # Check stopping conditions inside inner loop
-                if self._check_stopping_conditions(
-                    None,
-                    None,
-                    start_time,
-                    max_time,
-                    n_simulations,
-                    total_simulations_budget,
-                    verbose=False,
-                ):
-                    return None
-
-                # Resample a particle based on weights
-                index = self.rng.choice(len(particles), p=weights / weights.sum())
-                candidate_params = particles[index]
-
-                # Propose new parameters (perturbation kernel)
-                perturbed_params = [
-                    perturbations[self.param_names[i]].propose(
-                        candidate_params[i], self.rng
-                    )
-                    for i in range(len(self.param_names))
-                ]
-
-                # Check if perturbed parameters have prior probability > 0
-                prior_probabilities = [
-                    self.priors[param].pdf(perturbed_params[i])
-                    if param in self.continuous_params
-                    else self.priors[param].pmf(perturbed_params[i])
-                    for i, param in enumerate(self.param_names)
-                ]
-                if all(prob > 0 for prob in prior_probabilities):
-                    simulation = self._run_simulation(perturbed_params)
-                    distance = self.distance_function(self.observed_data, simulation)
-                    n_simulations += 1
-
-                    if distance < epsilon:
-                        new_particles.append(perturbed_params)
-                        weight_numerator = np.prod(
-                            [
-                                self.priors[param].pdf(perturbed_params[i])
-                                if param in self.continuous_params
-                                else self.priors[param].pmf(perturbed_params[i])
-                                for i, param in enumerate(self.param_names)
-                            ]
-                        )
-                        weight_denominator = np.sum(
-                            [
-                                weights[j]
-                                * np.prod(
-                                    [
-                                        perturbations[self.param_names[i]].pdf(
-                                            perturbed_params[i], particles[j][i]
-                                        )
-                                        for i in range(len(self.param_names))
-                                    ]
-                                )
-                                for j in range(len(particles))
-                            ]
-                        )
-                        new_weights.append(weight_numerator / weight_denominator)
-                        new_distances.append(distance)
-                        new_simulations.append(simulation)
-                        break
-
-        # Normalize weights
-        new_weights = np.array(new_weights)
-        new_weights /= new_weights.sum()
+        new_particles, new_distances = [], []
+        new_simulations = self._collect_trajectories(num_particles)
+
+        candidates = self._candidates(
+            lambda rng: self._perturb_particle(particles, weights, perturbations, rng),
+            limit=self._remaining_budget(total_simulations_budget, n_simulations),
+            epsilon=epsilon,
+            start_time=start_time,
+            max_time=max_time,
+        )
+        for perturbed_params, simulation, distance in candidates:
+            if distance < epsilon:
+                new_particles.append(perturbed_params)
+                new_distances.append(distance)
+                self._store_trajectory(new_simulations, simulation)
+                if len(new_particles) == num_particles:
+                    break
+        # Simulations started for unconsumed candidates count too
+        candidates.close()
+        n_simulations += candidates.n_simulations
+        if len(new_particles) < num_particles:
+            return None
+
+        # Importance weights of the whole generation at once (normalized)
+        new_particles = np.array(new_particles)
+        new_weights = compute_smc_weights(
+            new_particles,
+            particles,
+            weights,
+            self.priors,
+            perturbations,
+            self.param_names,
+            truncation=weight_truncation,
+        )
 
         return {
-            "particles": np.array(new_particles),
-            "weights": np.array(new_weights),
+            "particles": new_particles,
+            "weights": new_weights,
             "distances": np.array(new_distances),
-            "simulations": new_simulations,
+            "simulations": new_simulations
+            if new_simulations is None
+            else new_simulations.finalize(),
             "n_simulations": n_simulations,
         }
 
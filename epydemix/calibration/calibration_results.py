@@ -1,11 +1,129 @@
 import datetime
+from collections.abc import Sequence
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 import numpy as np
 import pandas as pd
 
 
+class ParticleTrajectories(Sequence):
+    """
+    Simulations of the accepted particles of a generation, stored as one array per variable.
+
+    Each variable of the simulation dictionaries is written into a `(num_particles, T)` array
+    (more generally `(num_particles,) + shape`), allocated when the first simulation is
+    appended, instead of keeping one dictionary per particle. The array is upcast when a later
+    value needs a wider dtype. A variable whose shape varies between simulations (e.g. a list of
+    events) is kept in a `(num_particles,)` object array, one value per particle. Indexing with an integer returns
+    the dictionary of a particle (views into the arrays), and slices or masks return a new
+    `ParticleTrajectories`. Once complete, the arrays are read-only and shared by copies.
+
+    Attributes:
+        arrays (Dict[str, np.ndarray]): The stacked values of each variable
+    """
+
+    def __init__(
+        self, size: int = 0, arrays: Optional[Dict[str, np.ndarray]] = None
+    ) -> None:
+        """
+        Args:
+            size (int, optional): Maximum number of simulations appended. Default is 0.
+            arrays (Dict[str, np.ndarray], optional): Stacked values of complete trajectories. Default is None
+                (empty).
+        """
+        self.arrays = {} if arrays is None else arrays
+        self._size = size
+        self._count = len(next(iter(self.arrays.values()))) if self.arrays else 0
+        # Variables whose shape varies between simulations, stored as objects
+        self._ragged = set()
+
+    def append(self, simulation: Dict[str, Any]) -> None:
+        """
+        Writes a simulation into the next row of the arrays.
+
+        Args:
+            simulation (Dict[str, Any]): The simulation dictionary
+
+        Raises:
+            ValueError: If the simulation has different variables than the first one.
+            IndexError: If the arrays are full.
+        """
+        if self._count >= self._size:
+            raise IndexError(f"Cannot store more than {self._size} trajectories")
+        values = {key: np.asarray(value) for key, value in simulation.items()}
+        if self._count == 0:
+            self.arrays = {
+                key: np.empty((self._size,) + value.shape, dtype=value.dtype)
+                for key, value in values.items()
+            }
+        elif values.keys() != self.arrays.keys():
+            raise ValueError(
+                f"Simulations must return the same keys, got {list(values)} instead of {list(self.arrays)}"
+            )
+        for key, value in values.items():
+            array = self.arrays[key]
+            if key not in self._ragged:
+                if value.shape != array.shape[1:]:
+                    # Ragged variable: one object per particle
+                    ragged = np.empty(self._size, dtype=object)
+                    for i in range(self._count):
+                        ragged[i] = array[i]
+                    array = self.arrays[key] = ragged
+                    self._ragged.add(key)
+                else:
+                    dtype = np.result_type(array.dtype, value.dtype)
+                    if dtype != array.dtype:
+                        # e.g. integer values first, floats afterwards
+                        array = self.arrays[key] = array.astype(dtype)
+            array[self._count] = value
+        self._count += 1
+
+    def finalize(self) -> "ParticleTrajectories":
+        """
+        Drops the unused rows and makes the arrays read-only.
+
+        Returns:
+            ParticleTrajectories: The trajectories.
+        """
+        for key in self.arrays:
+            self.arrays[key] = self.arrays[key][: self._count]
+            self.arrays[key].flags.writeable = False
+        self._size = self._count
+        return self
+
+    def keys(self) -> List[str]:
+        """The simulated variables."""
+        return list(self.arrays)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(
+        self, index: Union[int, slice, np.ndarray]
+    ) -> Union[Dict[str, np.ndarray], "ParticleTrajectories"]:
+        if isinstance(index, (int, np.integer)):
+            if not -self._count <= index < self._count:
+                raise IndexError("Trajectory index out of range")
+            return {key: array[index] for key, array in self.arrays.items()}
+        return ParticleTrajectories(
+            arrays={
+                key: array[: self._count][index] for key, array in self.arrays.items()
+            }
+        )
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ParticleTrajectories":
+        if not any(array.flags.writeable for array in self.arrays.values()):
+            # Read-only arrays are shared
+            return ParticleTrajectories(arrays=self.arrays)
+        copied = ParticleTrajectories(
+            self._size, {key: array.copy() for key, array in self.arrays.items()}
+        )
+        copied._count = self._count
+        copied._ragged = set(self._ragged)
+        return copied
+
+
 @dataclass
 class CalibrationResults:
     """
@@ -14,7 +132,8 @@ class CalibrationResults:
     Attributes:
         calibration_strategy: The strategy used for calibration
         posterior_distributions: Dictionary of posterior distributions per generation
-        selected_trajectories: Dictionary of selected trajectories per generation
+        selected_trajectories: Dictionary of selected trajectories per generation (`ParticleTrajectories`
+            of the simulations of the accepted particles)
         observed_data: Observed data used for calibration
         priors: Dictionary of prior distributions for parameters
         calibration_params: Dictionary of parameters used in calibration
@@ -86,6 +205,15 @@ class CalibrationResults:
         ):  # Better check for empty simulations
             return {}
 
+        if isinstance(simulations, ParticleTrajectories):
+            # Already stacked (read-only arrays)
+            keys = variables if variables else simulations.keys()
+            return {
+                key: simulations.arrays[key]
+                for key in keys
+                if key in simulations.arrays
+            }
+
         # Use user-provided variables or all keys from the first simulation
         keys = variables if variables else simulations[0].keys()
         return {
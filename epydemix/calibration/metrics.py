@@ -1,4 +1,4 @@
-from typing import Dict, Tuple
+from typing import Callable, Dict, Optional, Tuple
 
 import numpy as np
 
@@ -104,3 +104,101 @@ def mape(data: Dict, simulation: Dict) -> float:
     """
     observed, simulated = validate_data(data, simulation)
     return np.mean(np.abs((observed - simulated) / observed))
+
+
+def _prefix(data: Dict, simulation: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Validates a simulation covering the first observations, returned with the full observed data."""
+    observed, simulated = validate_data(data, simulation, shape_check=False)
+    if len(simulated) > len(observed):
+        raise ValueError("The simulated data is longer than the observed data.")
+    return observed, observed[: len(simulated)], simulated
+
+
+def partial_rmse(data: Dict, simulation: Dict) -> float:
+    """
+    Lower bound of the RMSE given the simulated values of the first observations only.
+
+    The squared errors of the observations not simulated yet are taken as 0, so the RMSE of any
+    completion of the simulation is at least this value.
+
+    Args:
+        data (Dict): A Dictionary containing the observed data with a key "data" pointing to an array of observations.
+        simulation (Dict): A Dictionary containing the simulated values of the first observations with a key "data".
+
+    Returns:
+        float: The lower bound of the RMSE.
+    """
+    observed, head, simulated = _prefix(data, simulation)
+    return np.sqrt(np.sum((head - simulated) ** 2) / len(observed))
+
+
+def partial_wmape(data: Dict, simulation: Dict) -> float:
+    """
+    Lower bound of the wMAPE given the simulated values of the first observations only.
+
+    Args:
+        data (Dict): A Dictionary containing the observed data with a key "data" pointing to an array of observations.
+        simulation (Dict): A Dictionary containing the simulated values of the first observations with a key "data".
+
+    Returns:
+        float: The lower bound of the wMAPE.
+    """
+    observed, head, simulated = _prefix(data, simulation)
+    return np.sum(np.abs(head - simulated)) / np.sum(np.abs(observed))
+
+
+def partial_mae(data: Dict, simulation: Dict) -> float:
+    """
+    Lower bound of the MAE given the simulated values of the first observations only.
+
+    Args:
+        data (Dict): A Dictionary containing the observed data with a key "data" pointing to an array of observations.
+        simulation (Dict): A Dictionary containing the simulated values of the first observations with a key "data".
+
+    Returns:
+        float: The lower bound of the MAE.
+    """
+    observed, head, simulated = _prefix(data, simulation)
+    return np.sum(np.abs(head - simulated)) / len(observed)
+
+
+def partial_mape(data: Dict, simulation: Dict) -> float:
+    """
+    Lower bound of the MAPE given the simulated values of the first observations only.
+
+    Args:
+        data (Dict): A Dictionary containing the observed data with a key "data" pointing to an array of observations.
+        simulation (Dict): A Dictionary containing the simulated values of the first observations with a key "data".
+
+    Returns:
+        float: The lower bound of the MAPE.
+    """
+    observed, head, simulated = _prefix(data, simulation)
+    return np.sum(np.abs((head - simulated) / head)) / len(observed)
+
+
+# Lower bounds of the monotone distances from the simulated values of the first observations
+PARTIAL_DISTANCES = {
+    rmse: partial_rmse,
+    wmape: partial_wmape,
+    mae: partial_mae,
+    mape: partial_mape,
+}
+
+
+def get_partial_distance(distance_function: Callable) -> Optional[Callable]:
+    """
+    Returns the lower bound of a distance computed from the first observations, if the distance has one.
+
+    Distances whose terms are non-negative and accumulate over the observations (RMSE, MAE, wMAPE,
+    MAPE) have one. Custom distances can provide theirs as a `partial` attribute.
+
+    Args:
+        distance_function (Callable): The distance function
+
+    Returns:
+        Callable or None: The partial distance function, with the signature of the distance, or None.
+    """
+    if distance_function in PARTIAL_DISTANCES:
+        return PARTIAL_DISTANCES[distance_function]
+    return getattr(distance_function, "partial", None)
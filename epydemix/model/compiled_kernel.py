@@ -0,0 +1,373 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..utils.utils import PiecewiseParameter, njit
+from .compiled_model import KIND_MEDIATED
+from .contact_timeline import ContactTimeline
+
+
+def _compact_rate(
+    value: Any, T: int, N: int, time_indexed: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Splits a rate into its distinct `(N,)` rows and the row of each step.
+
+    Constant rates (scalars, broadcast views, or arrays repeating their first row) take a single
+    row; overrides of a `PiecewiseParameter` add the rows of the steps they cover.
+    """
+    if isinstance(value, PiecewiseParameter):
+        rows, index = _compact_rate(value.base, T, N, time_indexed)
+        rows, index = [rows], index.copy()
+        n_rows = len(rows[0])
+        for piece, piece_value in enumerate(value.pieces):
+            steps = np.flatnonzero(value.piece_index[:T] == piece)
+            if len(steps) == 0:
+                continue
+            piece_rows, piece_index = _compact_rate(
+                piece_value, len(piece_value), N, time_indexed
+            )
+            index[steps] = n_rows + piece_index[value.piece_offset[steps]]
+            rows.append(piece_rows)
+            n_rows += len(piece_rows)
+        return np.concatenate(rows), index
+
+    values = np.asarray(value)
+    if time_indexed:
+        # Time-indexed rate: one value, or one value per group, per step
+        values = values[:T]
+        if values.ndim == 1:
+            values = values[:, None]
+    values = np.broadcast_to(values, (T, N))
+    if T <= 1 or values.strides[0] == 0 or (values == values[:1]).all():
+        return values[:1].astype(np.float64), np.zeros(T, dtype=np.int64)
+    return values.astype(np.float64), np.arange(T, dtype=np.int64)
+
+
+@dataclass(frozen=True)
+class CompiledInputs:
+    """
+    Read-only inputs of `_compiled_kernel`, in compact form.
+
+    Contact matrices and rates are piecewise constant over the steps, so instead of `(T, N, N)`
+    contacts and a `(n_rates, T, N)` rate table, the kernel receives the overall contact matrix of
+    each contact epoch (see `ContactTimeline`) and the distinct rows of the rates, with the index
+    of the ones in effect at each step. They are built once by `_prepare_simulation` and only
+    read by the kernel, so trajectories running on several threads share them.
+
+    Attributes:
+        contacts (np.ndarray): The overall contact matrix of each epoch, of shape (E, N, N)
+        epoch_index (np.ndarray): The epoch of each step, of shape (T,)
+        rate_rows (np.ndarray): The distinct values of the rates, of shape (n_rows, N)
+        rate_index (np.ndarray): The row of `rate_rows` of each rate slot at each step, of shape (n_rates, T)
+    """
+
+    contacts: np.ndarray
+    epoch_index: np.ndarray
+    rate_rows: np.ndarray
+    rate_index: np.ndarray
+
+    @classmethod
+    def build(
+        cls,
+        T: int,
+        contact_matrices,
+        rate_params: Tuple[Any, ...],
+        rate_parameters: List[Any],
+        N: int,
+    ) -> "CompiledInputs":
+        """
+        Builds the compact inputs of a simulation.
+
+        Args:
+            T (int): Number of time steps
+            contact_matrices: Contact matrices dictionaries of each step, as a list or a `ContactTimeline`
+            rate_params (tuple): The rate parameters of the compiled plan
+            rate_parameters (list): The rates resolved by `resolve_rate_parameters`
+            N (int): Number of demographic groups
+
+        Returns:
+            CompiledInputs: The read-only inputs.
+        """
+        if isinstance(contact_matrices, ContactTimeline):
+            epochs = contact_matrices.epochs
+            epoch_index = np.asarray(contact_matrices.epoch_index[:T], dtype=np.int64)
+        else:
+            # A list of per-step dictionaries: steps sharing a dictionary share an epoch
+            epochs, epoch_of = [], {}
+            epoch_index = np.empty(T, dtype=np.int64)
+            for t in range(T):
+                matrices = contact_matrices[t]
+                if id(matrices) not in epoch_of:
+                    epoch_of[id(matrices)] = len(epochs)
+                    epochs.append(matrices)
+                epoch_index[t] = epoch_of[id(matrices)]
+        contacts = np.array(
+            [epoch["overall"] for epoch in epochs], dtype=np.float64
+        ).reshape(len(epochs), N, N)
+
+        rows, n_rows = [], 0
+        rate_index = np.empty((len(rate_params), T), dtype=np.int64)
+        for slot, (rate, value) in enumerate(zip(rate_params, rate_parameters)):
+            time_indexed = isinstance(rate, str) and np.ndim(value) > 0
+            slot_rows, slot_index = _compact_rate(value, T, N, time_indexed)
+            rate_index[slot] = n_rows + slot_index
+            rows.append(slot_rows)
+            n_rows += len(slot_rows)
+        rate_rows = np.concatenate(rows) if rows else np.empty((0, N), dtype=np.float64)
+
+        for array in (contacts, epoch_index, rate_rows, rate_index):
+            array.flags.writeable = False
+        return cls(contacts, epoch_index, rate_rows, rate_index)
+
+
+def compiled_simulation(
+    T: int,
+    contact_matrices,
+    epimodel,
+    parameters: Dict,
+    initial_conditions: np.ndarray,
+    dt: float,
+    apply_linear_approximation: bool = False,
+    rng: Optional[Union[int, np.random.Generator]] = None,
+    rate_parameters: Optional[List[Any]] = None,
+    recorder=None,
+    dtype: Union[str, np.dtype] = np.float64,
+    inputs: Optional[CompiledInputs] = None,
+) -> np.ndarray:
+    """
+    Run a stochastic simulation of the epidemic model with the compiled kernel.
+
+    The process is the one of the "stochastic" engine (one multinomial tau-leap per step of size
+    `dt`), but the whole time loop, from the assembly of the rates to the draws, runs in
+    `_compiled_kernel`. With the optional numba dependency, the kernel is compiled in nopython
+    mode and releases the GIL, so trajectories with their own generators scale across threads
+    (e.g. `EpiModel.run_simulations(executor=ThreadPoolExecutor(...))`). Without numba, the same
+    kernel runs as plain Python, much more slowly.
+
+    The multinomial draws are made as successive binomial draws, in the order used by
+    `Generator.multinomial`, so for the same seed the trajectories are usually those of the
+    "stochastic" engine; they can differ when the rates, summed in a different order, round
+    differently.
+
+    The kernel reads the compact `CompiledInputs` (contact matrices per epoch, distinct rate rows),
+    never `(T, N, N)` contacts or a `(n_rates, T, N)` rate table. With a `recorder`, it runs over
+    blocks of `recorder.chunk_size` steps, each reduced to the selected outputs before the next,
+    so only the selected outputs are stored over the whole simulation.
+
+    Args:
+        T: Number of time steps
+        contact_matrices: Pre-computed contact matrices dictionaries of each step (key is the layer, value is the contact
+            matrix), as a list or a `ContactTimeline`
+        epimodel: The epidemic model
+        parameters: Model parameters
+        initial_conditions: Initial population distribution
+        dt: Time step size
+        apply_linear_approximation (bool, optional): Whether to use linear approximation to the probabilities. Default is False.
+        rng (int or np.random.Generator, optional): Seed or random number generator. Default is None.
+        rate_parameters (list, optional): The rates of the compiled plan resolved by `resolve_rate_parameters`.
+            Resolved from `parameters` if None.
+        recorder (OutputRecorder, optional): If given, only the outputs selected by the recorder (created
+            with `Nsim=1`) are recorded. Default is None (every compartment and transition).
+        dtype (str or np.dtype, optional): The dtype of the returned arrays. Default is float64.
+        inputs (CompiledInputs, optional): The compact inputs built by `_prepare_simulation`. Built from
+            `contact_matrices` and the rates if None.
+
+    Returns:
+        tuple: Compartments of shape (T, C, N) and transitions of shape (T, n_transitions, N), or the
+            recorded compartments and transitions of shape (T, K) if a `recorder` is given
+
+    Raises:
+        ValueError: If the model has transitions of a custom kind, whose rates are Python functions.
+    """
+    # Imported here to avoid a circular import with epimodel.py
+    from .epimodel import resolve_rate_parameters
+
+    rng = np.random.default_rng(rng)
+    plan = epimodel.compile()
+    if plan.has_custom_kinds:
+        raise ValueError(
+            "The compiled engine does not support transitions of custom kinds"
+        )
+
+    pop_sizes = np.asarray(epimodel.population.Nk, dtype=np.float64)
+    N = len(pop_sizes)
+    C = plan.n_compartments
+
+    if inputs is None:
+        if rate_parameters is None:
+            rate_parameters = resolve_rate_parameters(plan.rate_params, parameters)
+        inputs = CompiledInputs.build(
+            T, contact_matrices, plan.rate_params, rate_parameters, N
+        )
+
+    # Without a recorder, the whole simulation is one block
+    block = T if recorder is None else min(T, recorder.chunk_size)
+    compartments_evolution = np.zeros((block, C, N), dtype=np.float64)
+    transitions_evolution = np.zeros((block, plan.n_outputs, N), dtype=np.float64)
+    pop = np.array(initial_conditions, dtype=np.float64)
+    for start in range(0, T, max(block, 1)):
+        steps = min(block, T - start)
+        if start > 0:
+            transitions_evolution.fill(0.0)
+        _compiled_kernel(
+            pop,
+            pop_sizes,
+            inputs.contacts,
+            inputs.epoch_index,
+            inputs.rate_rows,
+            inputs.rate_index,
+            plan.group_source.astype(np.int64),
+            plan.group_ptr.astype(np.int64),
+            plan.kind.astype(np.int64),
+            plan.target.astype(np.int64),
+            plan.param_slot.astype(np.int64),
+            plan.agent_slot.astype(np.int64),
+            plan.mediating_agents.astype(np.int64),
+            plan.record_ptr.astype(np.int64),
+            plan.record_output.astype(np.int64),
+            plan.record_target.astype(np.int64),
+            np.asarray(plan.extinction_compartments, dtype=np.int64),
+            float(dt),
+            bool(apply_linear_approximation),
+            rng,
+            start,
+            compartments_evolution[:steps],
+            transitions_evolution[:steps],
+        )
+        if recorder is not None:
+            for s in range(steps):
+                recorder.record(
+                    start + s,
+                    compartments_evolution[s][None],
+                    transitions_evolution[s][None],
+                )
+
+    if recorder is not None:
+        recorder.flush()
+        return recorder.compartments[0], recorder.transitions[0]
+    return compartments_evolution.astype(
+        dtype, copy=False
+    ), transitions_evolution.astype(dtype, copy=False)
+
+
+@njit(nogil=True, cache=True)
+def _compiled_kernel(
+    pop,
+    pop_sizes,
+    contacts,
+    epoch_index,
+    rate_rows,
+    rate_index,
+    group_source,
+    group_ptr,
+    kinds,
+    targets,
+    param_slots,
+    agent_slots,
+    mediating_agents,
+    record_ptr,
+    record_output,
+    record_target,
+    extinction_compartments,
+    dt,
+    apply_linear_approximation,
+    rng,
+    start,
+    compartments_evolution,
+    transitions_evolution,
+):
+    """
+    Advances one trajectory over the steps `start`, `start + 1`, ... filling one row of
+    `compartments_evolution` and `transitions_evolution` per step.
+
+    `pop` is the `(C, N)` state at step `start`, updated in place. The rate of slot `r` at step `t`
+    is `rate_rows[rate_index[r, t]]`, and the overall contact matrix `contacts[epoch_index[t]]`.
+    """
+    steps = compartments_evolution.shape[0]
+    C, N = pop.shape
+    n_groups = len(group_source)
+    n_agents = len(mediating_agents)
+    interactions = np.zeros((n_agents, N))
+    rates = np.zeros((n_groups, N, C))
+    probs = np.zeros(C)
+    new_pop = np.empty((C, N))
+
+    for s in range(steps):
+        t = start + s
+        # No transition can occur from an absorbing state: repeat it over the remaining steps
+        absorbing = True
+        for c in extinction_compartments:
+            for n in range(N):
+                if pop[c, n] != 0.0:
+                    absorbing = False
+        if absorbing:
+            for r in range(s, steps):
+                compartments_evolution[r] = pop
+            return
+
+        # Interaction vector of each agent compartment, shared by the mediated transitions
+        for a in range(n_agents):
+            for n in range(N):
+                total = 0.0
+                for m in range(N):
+                    total += (
+                        pop[mediating_agents[a], m]
+                        / pop_sizes[m]
+                        * contacts[epoch_index[t], n, m]
+                    )
+                interactions[a, n] = total
+
+        # Rates of every transition group, from the state at the start of the step
+        rates[:] = 0.0
+        for g in range(n_groups):
+            for i in range(group_ptr[g], group_ptr[g + 1]):
+                for n in range(N):
+                    rate = rate_rows[rate_index[param_slots[i], t], n]
+                    if kinds[i] == KIND_MEDIATED:
+                        rate *= interactions[agent_slots[i], n]
+                    rates[g, n, targets[i]] += rate
+
+        new_pop[:] = pop
+        for g in range(n_groups):
+            source_idx = group_source[g]
+            for n in range(N):
+                remaining = int(pop[source_idx, n])
+                if remaining <= 0:
+                    continue
+
+                # Transition probabilities, as in `multinomial_probs`
+                H = 0.0
+                for c in range(C):
+                    probs[c] = 0.0 if c == source_idx else rates[g, n, c] * dt
+                    H += probs[c]
+                if apply_linear_approximation:
+                    probs[source_idx] = 1.0 - H
+                else:
+                    p_leave = -np.expm1(-H)
+                    scale = p_leave / H if H > 0.0 else 0.0
+                    for c in range(C):
+                        probs[c] *= scale
+                    probs[source_idx] = 1.0 - p_leave
+
+                # Multinomial draw as successive conditional binomial draws
+                remaining_p = 1.0
+                for c in range(C):
+                    if c == C - 1:
+                        moved = remaining
+                    else:
+                        p = min(max(probs[c] / remaining_p, 0.0), 1.0)
+                        moved = rng.binomial(remaining, p)
+                        remaining_p -= probs[c]
+                    remaining -= moved
+                    if c != source_idx and moved > 0:
+                        new_pop[source_idx, n] -= moved
+                        new_pop[c, n] += moved
+                        for r in range(record_ptr[g], record_ptr[g + 1]):
+                            if record_target[r] == c:
+                                transitions_evolution[s, record_output[r], n] += moved
+                    if remaining <= 0:
+                        break
+        pop[:] = new_pop
+        compartments_evolution[s] = pop
@@ -0,0 +1,225 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+
+# Integer codes for the transition kinds understood natively by the simulation kernel.
+# Kinds registered with a user-defined rate function are dispatched through that
+# function at every step (KIND_CUSTOM).
+KIND_SPONTANEOUS = 0
+KIND_MEDIATED = 1
+KIND_CUSTOM = 2
+
+
+@dataclass(frozen=True)
+class CompiledModel:
+    """
+    Frozen, integer-indexed transition plan of an `EpiModel`.
+
+    All per-transition arrays are ordered by source compartment (following the order of
+    `EpiModel.compartments`) and, within a source, by insertion order. Transitions sharing a
+    source compartment form a group whose outflows are drawn jointly; the groups are stored in
+    CSR form through `group_ptr`.
+
+    Attributes:
+        n_compartments (int): Number of compartments of the model.
+        n_outputs (int): Number of recorded transitions (unique `(source, target)` pairs).
+        source (np.ndarray): Source compartment index of each transition.
+        target (np.ndarray): Target compartment index of each transition.
+        kind (np.ndarray): Kind code of each transition (`KIND_SPONTANEOUS`, `KIND_MEDIATED` or `KIND_CUSTOM`).
+        param_slot (np.ndarray): Index into `rate_params` of the rate of each transition (-1 for custom kinds).
+        agent (np.ndarray): Agent compartment index of mediated transitions (-1 otherwise).
+        agent_slot (np.ndarray): Index into `mediating_agents` of the agent of mediated transitions (-1 otherwise).
+        mediating_agents (np.ndarray): Unique agent compartments of the mediated transitions. The kernel
+            computes their interaction vectors once per step, shared by all the transitions they mediate.
+        output (np.ndarray): Slot of each transition in the recorded transitions array.
+        rate_params (tuple): Unique rate parameters (parameter names, expressions or numeric values).
+        group_source (np.ndarray): Source compartment index of each transition group.
+        group_ptr (np.ndarray): Offsets of each group into the per-transition arrays (length `n_groups + 1`).
+        record_ptr (np.ndarray): Offsets of each group into `record_output` / `record_target`.
+        record_output (np.ndarray): Recorded transition slot of each unique `(source, target)` pair in a group.
+        record_target (np.ndarray): Target compartment index of each unique `(source, target)` pair in a group.
+        params (tuple): The raw user-provided parameters of each transition.
+        functions (tuple): The rate function of each custom-kind transition (None for native kinds).
+        extinction_compartments (np.ndarray): Compartments that must all be empty for the state to be absorbing:
+            the agents of mediated transitions and the sources of spontaneous transitions.
+    """
+
+    n_compartments: int
+    n_outputs: int
+    source: np.ndarray
+    target: np.ndarray
+    kind: np.ndarray
+    param_slot: np.ndarray
+    agent: np.ndarray
+    agent_slot: np.ndarray
+    mediating_agents: np.ndarray
+    output: np.ndarray
+    rate_params: Tuple[Any, ...]
+    group_source: np.ndarray
+    group_ptr: np.ndarray
+    record_ptr: np.ndarray
+    record_output: np.ndarray
+    record_target: np.ndarray
+    params: Tuple[Any, ...]
+    functions: Tuple[Optional[Callable], ...]
+    extinction_compartments: np.ndarray
+
+    @property
+    def n_transitions(self) -> int:
+        """Number of transitions in the plan."""
+        return len(self.source)
+
+    @property
+    def n_groups(self) -> int:
+        """Number of transition groups (source compartments with outflows)."""
+        return len(self.group_source)
+
+    @property
+    def has_custom_kinds(self) -> bool:
+        """Whether the plan contains transitions dispatched through user-defined functions."""
+        return bool(np.any(self.kind == KIND_CUSTOM))
+
+    def is_absorbing(self, pop: np.ndarray) -> np.ndarray:
+        """
+        Checks whether no transition can occur anymore from the given states.
+
+        A state is absorbing when every agent compartment of the mediated transitions and every
+        source of the spontaneous transitions is empty. Plans with custom kinds are never
+        considered absorbing, as their rates are arbitrary functions of the state.
+
+        Args:
+            pop (np.ndarray): States of shape (..., C, N).
+
+        Returns:
+            np.ndarray: Boolean array of shape (...).
+        """
+        if self.has_custom_kinds:
+            return np.zeros(pop.shape[:-2], dtype=bool)
+        return ~np.any(pop[..., self.extinction_compartments, :], axis=(-2, -1))
+
+    def extinction_step(self, compartments_evolution: np.ndarray) -> Optional[int]:
+        """
+        Finds the first step of a trajectory whose state is absorbing.
+
+        Args:
+            compartments_evolution (np.ndarray): Compartments of shape (T, C, N).
+
+        Returns:
+            int or None: The extinction step, or None if the trajectory never reaches an absorbing state.
+        """
+        absorbing = np.flatnonzero(self.is_absorbing(compartments_evolution))
+        return int(absorbing[0]) if len(absorbing) else None
+
+
+def compile_model(epimodel) -> CompiledModel:
+    """
+    Freezes the transitions of an epidemic model into a `CompiledModel`.
+
+    Args:
+        epimodel (EpiModel): The epidemic model to compile.
+
+    Returns:
+        CompiledModel: The compiled transition plan.
+
+    Raises:
+        ValueError: If a transition uses a kind with no registered rate function.
+    """
+    # Imported here to avoid a circular import with epimodel.py
+    from .epimodel import (
+        compute_mediated_transition_rate,
+        compute_spontaneous_transition_rate,
+    )
+
+    native_kinds = {
+        "spontaneous": (KIND_SPONTANEOUS, compute_spontaneous_transition_rate),
+        "mediated": (KIND_MEDIATED, compute_mediated_transition_rate),
+    }
+    comp_idx = epimodel.compartments_idx
+
+    source, target, kind, param_slot, agent, output = [], [], [], [], [], []
+    params, functions = [], []
+    rate_params, rate_slots = [], {}
+    agent_slot, agent_slots = [], {}
+    group_source, group_ptr = [], [0]
+    record_ptr, record_output, record_target = [0], [], []
+
+    for comp in epimodel.compartments:
+        transitions = epimodel.transitions.get(comp, [])
+        if not transitions:
+            continue
+
+        seen_outputs = set()
+        for tr in transitions:
+            if tr.kind not in epimodel.transition_functions:
+                raise ValueError(
+                    f"Unknown transition kind '{tr.kind}' for transition {tr.source} -> {tr.target}. "
+                    f"Registered kinds are: {list(epimodel.transition_functions.keys())}"
+                )
+            function = epimodel.transition_functions[tr.kind]
+            code, native_function = native_kinds.get(tr.kind, (KIND_CUSTOM, None))
+            if function is not native_function:
+                code = KIND_CUSTOM
+
+            slot, agent_idx, a_slot = -1, -1, -1
+            if code != KIND_CUSTOM:
+                rate = tr.params[0] if code == KIND_MEDIATED else tr.params
+                # Named rates (parameters or expressions) share a slot; literal values
+                # (possibly unhashable arrays) get one slot each
+                key = rate if isinstance(rate, str) else ("__value__", id(rate))
+                if key not in rate_slots:
+                    rate_slots[key] = len(rate_params)
+                    rate_params.append(rate)
+                slot = rate_slots[key]
+                if code == KIND_MEDIATED:
+                    agent_idx = comp_idx[tr.params[1]]
+                    a_slot = agent_slots.setdefault(agent_idx, len(agent_slots))
+
+            out = epimodel.transitions_idx[f"{tr.source}_to_{tr.target}"]
+            source.append(comp_idx[tr.source])
+            target.append(comp_idx[tr.target])
+            kind.append(code)
+            param_slot.append(slot)
+            agent.append(agent_idx)
+            agent_slot.append(a_slot)
+            output.append(out)
+            params.append(tr.params)
+            functions.append(function if code == KIND_CUSTOM else None)
+
+            # Transitions sharing the same (source, target) pair are merged before the draw,
+            # so each pair is recorded once per group
+            if out not in seen_outputs:
+                seen_outputs.add(out)
+                record_output.append(out)
+                record_target.append(comp_idx[tr.target])
+
+        group_source.append(comp_idx[comp])
+        group_ptr.append(len(source))
+        record_ptr.append(len(record_output))
+
+    def _int_array(values):
+        return np.asarray(values, dtype=np.int64)
+
+    return CompiledModel(
+        n_compartments=len(epimodel.compartments),
+        n_outputs=len(epimodel.transitions_idx),
+        source=_int_array(source),
+        target=_int_array(target),
+        kind=_int_array(kind),
+        param_slot=_int_array(param_slot),
+        agent=_int_array(agent),
+        agent_slot=_int_array(agent_slot),
+        mediating_agents=_int_array(list(agent_slots)),
+        output=_int_array(output),
+        rate_params=tuple(rate_params),
+        group_source=_int_array(group_source),
+        group_ptr=_int_array(group_ptr),
+        record_ptr=_int_array(record_ptr),
+        record_output=_int_array(record_output),
+        record_target=_int_array(record_target),
+        params=tuple(params),
+        functions=tuple(functions),
+        extinction_compartments=np.union1d(
+            list(agent_slots), np.asarray(source)[np.asarray(kind) == KIND_SPONTANEOUS]
+        ).astype(np.int64),
+    )
@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Union
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class ContactTimeline:
+    """
+    Piecewise-constant schedule of contact matrices over the simulation steps.
+
+    Contact matrices only change at intervention boundaries, so the timeline stores one
+    matrix set per epoch (a span of steps sharing the same active interventions) and an
+    integer index mapping every step to its epoch. Indexing the timeline with a step
+    (or a date) returns the matrix set in effect, so it can be used wherever a list of
+    per-step contact matrices is expected.
+
+    Attributes:
+        dates (pd.DatetimeIndex): The date of each simulation step.
+        epochs (list): One dictionary of contact matrices (layer name -> matrix) per epoch.
+        epoch_index (np.ndarray): The epoch of each simulation step.
+    """
+
+    dates: pd.DatetimeIndex
+    epochs: List[Dict[str, np.ndarray]]
+    epoch_index: np.ndarray
+
+    @classmethod
+    def constant(
+        cls, contact_matrices: Dict[str, np.ndarray], simulation_dates
+    ) -> "ContactTimeline":
+        """
+        Creates a timeline with the same contact matrices at every step.
+
+        Args:
+            contact_matrices (dict): The contact matrices of each layer. They are copied.
+            simulation_dates (array-like): The date of each simulation step.
+
+        Returns:
+            ContactTimeline: A timeline with a single epoch.
+        """
+        dates = pd.DatetimeIndex(simulation_dates)
+        return cls(
+            dates=dates,
+            epochs=[
+                {layer: np.copy(matrix) for layer, matrix in contact_matrices.items()}
+            ],
+            epoch_index=np.zeros(len(dates), dtype=np.int64),
+        )
+
+    @property
+    def n_epochs(self) -> int:
+        """Number of distinct contact matrix sets."""
+        return len(self.epochs)
+
+    def __len__(self) -> int:
+        return len(self.epoch_index)
+
+    def __getitem__(
+        self, key: Union[int, str, pd.Timestamp, np.datetime64]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Returns the contact matrices in effect at a step (int) or at a date.
+        """
+        if isinstance(key, (int, np.integer)):
+            return self.epochs[self.epoch_index[key]]
+        return self.epochs[self.epoch_index[self.dates.get_loc(pd.Timestamp(key))]]
+
+    def __iter__(self) -> Iterator[Dict[str, np.ndarray]]:
+        return (self.epochs[epoch] for epoch in self.epoch_index)
+
+    def split(self, mask: np.ndarray) -> List[int]:
+        """
+        Gives the steps selected by `mask` epochs of their own.
+
+        Epochs spanning both selected and unselected steps are split, and the part covering
+        the selected steps receives a copy of the matrices, so the returned epochs can be
+        modified without affecting unselected steps. Epochs stay in chronological order.
+
+        Args:
+            mask (np.ndarray): Boolean mask over the simulation steps.
+
+        Returns:
+            list: The indices of the epochs covering the selected steps.
+        """
+        codes = self.epoch_index * 2 + np.asarray(mask, dtype=np.int64)
+        unique_codes, first, inverse = np.unique(
+            codes, return_index=True, return_inverse=True
+        )
+        order = np.argsort(first, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+
+        present = set(unique_codes.tolist())
+        epochs, selected = [], []
+        for code in unique_codes[order].tolist():
+            epoch, is_selected = divmod(code, 2)
+            matrices = self.epochs[epoch]
+            if is_selected:
+                if epoch * 2 in present:
+                    matrices = {layer: np.copy(m) for layer, m in matrices.items()}
+                selected.append(len(epochs))
+            epochs.append(matrices)
+
+        self.epochs = epochs
+        self.epoch_index = rank[inverse]
+        return selected
+
+    def spectral_radius(self, layer: str = "overall") -> np.ndarray:
+        """
+        Computes the spectral radius of a layer at every step, once per epoch.
+
+        Args:
+            layer (str, optional): The contact matrix layer. Defaults to "overall".
+
+        Returns:
+            np.ndarray: The spectral radius at each simulation step.
+        """
+        rho = np.array(
+            [np.linalg.eigvals(epoch[layer]).max().real for epoch in self.epochs]
+        )
+        return rho[self.epoch_index]
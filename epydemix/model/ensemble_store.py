@@ -0,0 +1,230 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .simulation_output import NamedArrayView, SelectedOutputView, Trajectory
+from .simulation_results import SimulationResults, _stack_arrays
+
+COMPARTMENTS_FILE = "compartments.npy"
+TRANSITIONS_FILE = "transitions.npy"
+HEADER_FILE = "header.json"
+
+
+def _array_layout(
+    view: Union[NamedArrayView, SelectedOutputView, Dict[str, np.ndarray]],
+) -> Dict[str, Any]:
+    """Describes how the names of a trajectory variable map to its array."""
+    if isinstance(view, NamedArrayView):
+        return {
+            "layout": "named",
+            "idx": {name: int(pos) for name, pos in view.idx.items()},
+            "demographics": [str(dem) for dem in view.demographics],
+        }
+    return {"layout": "columns", "keys": [str(key) for key in view]}
+
+
+def _as_array(
+    view: Union[NamedArrayView, SelectedOutputView, Dict[str, np.ndarray]],
+) -> np.ndarray:
+    """The array backing a trajectory variable; plain dictionaries are stacked into columns."""
+    if isinstance(view, (NamedArrayView, SelectedOutputView)):
+        return view.array
+    return np.stack([np.asarray(v) for v in view.values()], axis=-1)
+
+
+def _view(array: np.ndarray, layout: Dict[str, Any]):
+    """Creates the named view of `array` described by `layout`."""
+    if layout["layout"] == "named":
+        return NamedArrayView(array, layout["idx"], layout["demographics"])
+    return SelectedOutputView(array, layout["keys"])
+
+
+def _to_json(value: Any) -> Any:
+    """Converts trajectory metadata values to JSON."""
+    if isinstance(value, pd.Timestamp):
+        return {"timestamp": value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _from_json(value: Any) -> Any:
+    """Restores trajectory metadata values from JSON."""
+    if isinstance(value, dict) and set(value) == {"timestamp"}:
+        return pd.Timestamp(value["timestamp"])
+    return value
+
+
+class EnsembleStore:
+    """
+    On-disk store of an ensemble of trajectories.
+
+    The store is a directory holding one memory-mapped `.npy` file per output array, of
+    shape `(Nsim, T, C, N)` for compartments and `(Nsim, T, K, N)` for transitions (or
+    `(Nsim, T, K)` for selected outputs and resampled trajectories), and a JSON header with
+    the dates, the variable names and the metadata of each trajectory. Trajectories are
+    written as they finish, so an ensemble never needs to fit in memory; the results read
+    back from the store are views into the memory-mapped files, loaded lazily.
+
+    Attributes:
+        path (str): The store directory
+        Nsim (int): Number of trajectories
+        header (dict): Dates, variable layouts and per-trajectory metadata
+        compartments (np.memmap): Compartments of every trajectory
+        transitions (np.memmap): Transitions of every trajectory
+    """
+
+    def __init__(
+        self,
+        path: str,
+        header: Dict[str, Any],
+        compartments: np.memmap,
+        transitions: np.memmap,
+    ) -> None:
+        self.path = path
+        self.header = header
+        self.compartments = compartments
+        self.transitions = transitions
+
+    @property
+    def Nsim(self) -> int:
+        """Number of trajectories."""
+        return self.header["Nsim"]
+
+    @classmethod
+    def create(cls, path: str, Nsim: int, template: Trajectory) -> "EnsembleStore":
+        """
+        Creates an empty store for `Nsim` trajectories shaped like `template`.
+
+        Args:
+            path (str): The store directory. It is created if it does not exist; existing store files are
+                overwritten.
+            Nsim (int): Number of trajectories
+            template (Trajectory): A trajectory of the ensemble, giving the dates, names, shapes and dtypes
+
+        Returns:
+            EnsembleStore: The store, open for writing.
+        """
+        os.makedirs(path, exist_ok=True)
+        header = {
+            "Nsim": Nsim,
+            "dates": [pd.Timestamp(d).isoformat() for d in template.dates],
+            "compartment_idx": {
+                name: int(pos) for name, pos in template.compartment_idx.items()
+            },
+            "transitions_idx": {
+                name: int(pos) for name, pos in template.transitions_idx.items()
+            },
+            "compartments": _array_layout(template.compartments),
+            "transitions": _array_layout(template.transitions),
+            "metadata": [{} for _ in range(Nsim)],
+        }
+        arrays = []
+        for filename, view in (
+            (COMPARTMENTS_FILE, template.compartments),
+            (TRANSITIONS_FILE, template.transitions),
+        ):
+            array = _as_array(view)
+            arrays.append(
+                np.lib.format.open_memmap(
+                    os.path.join(path, filename),
+                    mode="w+",
+                    dtype=array.dtype,
+                    shape=(Nsim,) + array.shape,
+                )
+            )
+        return cls(path, header, *arrays)
+
+    @classmethod
+    def open(cls, path: str, mode: str = "r") -> "EnsembleStore":
+        """
+        Opens an existing store.
+
+        Args:
+            path (str): The store directory
+            mode (str, optional): Memory-map mode of the arrays ("r" or "r+"). Default is "r".
+
+        Returns:
+            EnsembleStore: The store.
+
+        Raises:
+            FileNotFoundError: If the directory is not a store.
+        """
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+        return cls(
+            path,
+            header,
+            np.load(os.path.join(path, COMPARTMENTS_FILE), mmap_mode=mode),
+            np.load(os.path.join(path, TRANSITIONS_FILE), mmap_mode=mode),
+        )
+
+    def write(self, start: int, trajectories: List[Trajectory]) -> None:
+        """
+        Writes consecutive trajectories to the store, starting at index `start`.
+
+        Args:
+            start (int): Index of the first trajectory
+            trajectories (List[Trajectory]): The trajectories to write
+        """
+        stop = start + len(trajectories)
+        self.compartments[start:stop] = _stack_arrays(
+            [_as_array(t.compartments) for t in trajectories]
+        )
+        self.transitions[start:stop] = _stack_arrays(
+            [_as_array(t.transitions) for t in trajectories]
+        )
+        for i, trajectory in enumerate(trajectories):
+            self.header["metadata"][start + i] = {
+                key: _to_json(value) for key, value in trajectory.metadata.items()
+            }
+
+    def close(self) -> None:
+        """Flushes the arrays and writes the header."""
+        self.compartments.flush()
+        self.transitions.flush()
+        with open(os.path.join(self.path, HEADER_FILE), "w") as f:
+            json.dump(self.header, f)
+
+    def to_results(
+        self,
+        parameters: Optional[Dict[str, Any]] = None,
+        trajectory_parameters: Optional[Dict[str, Any]] = None,
+    ) -> SimulationResults:
+        """
+        Creates `SimulationResults` whose trajectories are views into the store.
+
+        Args:
+            parameters (dict, optional): The parameters of the simulations. Default is None (empty).
+            trajectory_parameters (dict, optional): The parameters of each trajectory, which are not stored on
+                disk. Default is None (empty).
+
+        Returns:
+            SimulationResults: The results, backed by the memory-mapped arrays.
+        """
+        header = self.header
+        dates = [pd.Timestamp(d) for d in header["dates"]]
+        trajectories = [
+            Trajectory(
+                compartments=_view(self.compartments[b], header["compartments"]),
+                transitions=_view(self.transitions[b], header["transitions"]),
+                dates=dates,
+                compartment_idx=header["compartment_idx"],
+                transitions_idx=header["transitions_idx"],
+                parameters={}
+                if trajectory_parameters is None
+                else trajectory_parameters,
+                metadata={
+                    key: _from_json(value)
+                    for key, value in header["metadata"][b].items()
+                },
+            )
+            for b in range(self.Nsim)
+        ]
+        return SimulationResults(
+            trajectories=trajectories,
+            parameters={} if parameters is None else parameters,
+        )
@@ -1,24 +1,86 @@
-import copy
 import inspect
-from typing import Any, Callable, Dict, List, Optional, Union
+import os
+import warnings
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
+from evalidate import EvalException
 
 from ..population.population import Population, load_epydemix_population
+from ..utils.expressions import validate_expression
 from ..utils.utils import (
     apply_initial_conditions,
     apply_overrides,
     compute_simulation_dates,
     create_definitions,
     evaluate,
-    format_simulation_output,
-    multinomial,
+    multinomial_probs,
 )
-from .simulation_output import Trajectory
-from .simulation_results import SimulationResults
+from .compiled_kernel import CompiledInputs, compiled_simulation
+from .compiled_model import (
+    KIND_CUSTOM,
+    KIND_MEDIATED,
+    CompiledModel,
+    compile_model,
+)
+from .contact_timeline import ContactTimeline
+from .ensemble_store import EnsembleStore
+from .gillespie import gillespie_simulation
+from .quantile_summary import QUANTILE_SKETCH_SIZE, QuantileSummary
+from .simulation_output import (
+    FILL_METHODS,
+    LINEAR_RESAMPLE_METHODS,
+    OutputRecorder,
+    ResampleBins,
+    SelectedOutputView,
+    Trajectory,
+    resample_array,
+)
+from .simulation_results import SimulationResults, collect_trajectories
 from .transition import Transition
 
+SUPPORTED_ENGINES = [
+    "stochastic",
+    "batch",
+    "deterministic",
+    "adaptive_tau",
+    "gillespie",
+    "compiled",
+]
+# Engines producing one trajectory per `simulate` call
+TRAJECTORY_ENGINES = [
+    "stochastic",
+    "deterministic",
+    "adaptive_tau",
+    "gillespie",
+    "compiled",
+]
+SUPPORTED_DTYPES = ["float64", "float32", "int64", "int32"]
+# Number of trajectories simulated at once by the "batch" engine when writing to a sink
+SINK_BATCH_SIZE = 256
+SUPPORTED_SUMMARIES = [None, "quantiles"]
+# Number of blocks of trajectories sent to each worker by parallel `run_simulations`
+PARALLEL_BLOCKS_PER_WORKER = 4
+# Model and simulation arguments of a `run_simulations` worker process
+_WORKER_STATE: Dict[str, Any] = {}
+# Engines supporting the `stop_condition` of `simulate`
+STOPPABLE_ENGINES = ["stochastic", "deterministic", "adaptive_tau"]
+
+
+class SimulationAborted(Exception):
+    """
+    Raised by `simulate` when its `stop_condition` is met at a checkpoint.
+
+    Attributes:
+        step (int): The last simulated step
+    """
+
+    def __init__(self, step: int) -> None:
+        super().__init__(f"Simulation aborted at step {step}")
+        self.step = step
+
 
 class EpiModel:
     """
@@ -86,7 +148,8 @@ class EpiModel:
         self.parameters = {}
         self.definitions = {}
         self.overrides = {}
-        self.Cs = {}
+        self.Cs = None
+        self._compiled = None
 
         # Handle default empty lists for compartments and contact layers
         if compartments is None:
@@ -301,6 +364,7 @@ class EpiModel:
 
         # Add compartments to the model
         self.compartments.extend(compartments)
+        self.invalidate_compiled()
 
         # Determine the current maximum index in compartments_idx or set to -1 if empty
         max_idx = max(self.compartments_idx.values(), default=-1)
@@ -328,6 +392,7 @@ class EpiModel:
         """
         self.compartments = []
         self.compartments_idx = {}
+        self.invalidate_compiled()
 
     def add_parameter(
         self,
@@ -452,7 +517,8 @@ class EpiModel:
             params (Any): The parameters involved in the transition.
 
         Raises:
-            ValueError: If the source or target is not in the compartments list.
+            ValueError: If the source or target is not in the compartments list, or if the
+                rate expression of a spontaneous or mediated transition is invalid.
 
         Returns:
             None
@@ -465,6 +531,20 @@ class EpiModel:
                 f"These compartments are not in the compartments list: {', '.join(missing_compartments)}"
             )
 
+        # Validate rate expressions now rather than at the first simulation step
+        rate = (
+            params[0]
+            if kind == "mediated" and isinstance(params, (tuple, list))
+            else params
+        )
+        if kind in ("spontaneous", "mediated") and isinstance(rate, str):
+            try:
+                validate_expression(rate)
+            except EvalException as e:
+                raise ValueError(
+                    f"Invalid rate expression '{rate}' for transition {source} -> {target}: {e}"
+                ) from e
+
         transition = Transition(source=source, target=target, kind=kind, params=params)
         self.transitions_list.append(transition)
         self.transitions[source].append(transition)
@@ -472,6 +552,7 @@ class EpiModel:
         transition_name = f"{source}_to_{target}"
         if transition_name not in self.transitions_idx:
             self.transitions_idx[transition_name] = len(self.transitions_idx)
+        self.invalidate_compiled()
 
     def register_transition_kind(self, kind: str, function: Callable):
         """
@@ -486,6 +567,7 @@ class EpiModel:
         """
         validate_transition_function(function)
         self.transition_functions[kind] = function
+        self.invalidate_compiled()
 
     @property
     def n_transitions(self) -> int:
@@ -504,6 +586,35 @@ class EpiModel:
         """
         self.transitions_list = []
         self.transitions = {comp: [] for comp in self.compartments}
+        self.invalidate_compiled()
+
+    def compile(self) -> CompiledModel:
+        """
+        Freezes the model's transitions into flat integer index arrays consumed by the simulation kernel.
+
+        The compiled plan is cached and automatically invalidated whenever compartments,
+        transitions or transition kinds are modified through the model's methods.
+
+        Returns:
+            CompiledModel: The compiled transition plan.
+
+        Raises:
+            ValueError: If a transition uses a kind with no registered rate function.
+        """
+        if self._compiled is None:
+            self._compiled = compile_model(self)
+        return self._compiled
+
+    def invalidate_compiled(self) -> None:
+        """
+        Discards the cached compiled plan, forcing `compile` to rebuild it on next use.
+
+        Call this after mutating `Transition` objects of the model in place.
+
+        Returns:
+            None
+        """
+        self._compiled = None
 
     def add_intervention(
         self,
@@ -568,6 +679,9 @@ class EpiModel:
         """
         Applies an intervention to the contact matrices for specified simulation dates.
 
+        The steps covered by the intervention are split into epochs of their own in
+        `self.Cs`, so the matrices of the other steps are left untouched.
+
         Args:
             intervention (dict): A dictionary containing intervention details with the following keys:
                 - "layer" (str): The name of the layer to which the intervention applies.
@@ -597,45 +711,43 @@ class EpiModel:
         start_date = intervention["start_date"]
         end_date = intervention["end_date"]
 
-        # Apply the intervention to the relevant dates
-        for date in filter(lambda d: start_date <= d <= end_date, simulation_dates):
+        # Apply the intervention to the epochs covering the relevant dates
+        dates = pd.DatetimeIndex(simulation_dates)
+        active = (dates >= start_date) & (dates <= end_date)
+        for epoch in self.Cs.split(active):
+            matrices = self.Cs.epochs[epoch]
             if reduction_factor is not None:
-                self.Cs[date][layer] *= reduction_factor
+                matrices[layer] = matrices[layer] * reduction_factor
             else:  # If reduction_factor is None, we assume new_matrix is provided
-                self.Cs[date][layer] = new_matrix
+                matrices[layer] = new_matrix
 
     def compute_contact_reductions(self, simulation_dates: List[pd.Timestamp]) -> None:
         """
         Computes the contact reductions for a population over the given simulation dates.
 
         This function applies interventions to the contact matrices and computes the overall contact matrix
-        for each date in the simulation period.
+        for each date in the simulation period. Contact matrices only change at intervention boundaries, so
+        they are stored once per epoch in a `ContactTimeline`, together with the epoch of each date.
 
         Args:
             simulation_dates (list of pd.Timestamp): A list of dates over which the simulation is run.
 
         Returns:
-            None: The function updates the instance variable `self.Cs` with the contact matrices for each date,
+            None: The function updates the instance variable `self.Cs` with the contact timeline,
                 including the overall contact matrix after applying interventions.
         """
-        # Initialize contact matrices for each simulation date, copying the population's initial contact matrices
-        self.Cs = {
-            date: {
-                layer: np.copy(matrix)
-                for layer, matrix in self.population.contact_matrices.items()
-            }
-            for date in simulation_dates
-        }
+        # Start from a single epoch holding a copy of the population's contact matrices
+        self.Cs = ContactTimeline.constant(
+            self.population.contact_matrices, simulation_dates
+        )
 
         # Apply interventions to the contact matrices
         for intervention in self.interventions:
             self.apply_intervention(intervention, simulation_dates)
 
-        # Compute the overall contact matrix for each date by summing up the contact matrices across layers
-        for date in self.Cs:
-            self.Cs[date]["overall"] = np.sum(
-                np.array(list(self.Cs[date].values())), axis=0
-            )
+        # Compute the overall contact matrix for each epoch by summing up the contact matrices across layers
+        for matrices in self.Cs.epochs:
+            matrices["overall"] = np.sum(np.array(list(matrices.values())), axis=0)
 
     def create_default_initial_conditions(
         self, percentage_in_agents: float = 0.0005
@@ -771,7 +883,18 @@ class EpiModel:
         fill_method: Optional[str] = "ffill",
         apply_linear_approximation: bool = False,
         rng: Optional[Union[int, np.random.Generator]] = None,
-    ) -> SimulationResults:
+        engine: str = "stochastic",
+        tau_epsilon: float = 0.03,
+        hybrid_threshold: Optional[float] = None,
+        outputs: Optional[List[str]] = None,
+        dtype: Union[str, np.dtype] = "float64",
+        sink: Optional[str] = None,
+        summary: Optional[str] = None,
+        summary_quantiles: Optional[List[float]] = None,
+        summary_sketch_size: int = QUANTILE_SKETCH_SIZE,
+        n_jobs: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> Union[SimulationResults, QuantileSummary]:
         """
         Simulates the epidemic model multiple times over the given time period.
 
@@ -788,13 +911,73 @@ class EpiModel:
             fill_method (str, optional): Method to fill NaN values after resampling. Default is "ffill".
             apply_linear_approximation (bool, optional): Whether to use linear approximation to the probabilities. Default is False.
             rng (int or np.random.Generator, optional): Seed or random number generator. Default is None.
+            engine (str, optional): The simulation engine. "stochastic" (default) runs the `Nsim` trajectories one
+                after the other; "batch" advances all of them at once, drawing the transitions of every trajectory
+                in one vectorized call per transition group. Both are exact samples of the same process, but the
+                random streams differ, so the two engines give different trajectories for the same seed.
+                "deterministic" integrates the expected flows of the model once and returns a single trajectory
+                (`Nsim` and `rng` are ignored). "adaptive_tau" runs the trajectories one after the other, covering
+                each step of size `dt` with adaptive tau-leaps. "gillespie" runs the trajectories one after the
+                other, simulating every transition event exactly (next-reaction method). "compiled" runs the
+                process of "stochastic" one trajectory at a time in a kernel compiled with the optional numba
+                dependency, which releases the GIL, so it scales with a `ThreadPoolExecutor` as `executor` (see
+                `compiled_simulation`); without numba it runs as plain Python, much more slowly.
+            tau_epsilon (float, optional): Bound on the relative change of the propensities during a leap of the
+                "adaptive_tau" engine. Default is 0.03.
+            hybrid_threshold (float, optional): With the "gillespie" engine, populations above which transitions
+                are tau-leaped over each step. Default is None (fully exact).
+            outputs (list of str, optional): The variables to record, as compartment or transition names
+                (e.g. "Infected", for every demographic group and the total) or output keys (e.g.
+                "Susceptible_to_Infected_total"). Default is None (every compartment and transition).
+            dtype (str or np.dtype, optional): The dtype of the stored compartments and transitions: "float64"
+                (default), "float32", or, for the stochastic engines, "int32" or "int64" (see `resolve_output_dtype`).
+            sink (str, optional): A directory where the trajectories are written as they finish (see
+                `EnsembleStore`), instead of being kept in memory. The returned results are then views into the
+                memory-mapped files, and can be reloaded with `SimulationResults.load(sink)`. The "batch" engine
+                simulates `SINK_BATCH_SIZE` trajectories at a time. Default is None (results kept in memory).
+            summary (str, optional): If "quantiles", the trajectories are not kept: each one updates streaming
+                quantile estimators per time step and variable as it finishes, and a `QuantileSummary` is returned
+                instead of `SimulationResults`. Its quantiles are exact up to `summary_sketch_size` trajectories,
+                and beyond have a rank error bounded by `QuantileSummary.rank_error()` (see `QuantileSketch`).
+                Trajectories with NaN values are rejected. The "batch" engine simulates `SINK_BATCH_SIZE`
+                trajectories at a time. Cannot be combined with `sink`. Default is None (all trajectories returned).
+            summary_quantiles (list of float, optional): The quantiles tracked with `summary="quantiles"`. Default
+                is None ([0.025, 0.05, 0.25, 0.5, 0.75, 0.95, 0.975]).
+            summary_sketch_size (int, optional): The number of trajectories up to which `summary="quantiles"` is
+                exact; memory and accuracy beyond grow with it. Default is `QUANTILE_SKETCH_SIZE` (512).
+            n_jobs (int, optional): Number of worker processes (-1 for one per CPU). If given, or if an `executor`
+                is given, each trajectory gets its own random stream, spawned from `rng` as a child
+                `np.random.SeedSequence` (one per chunk of `SINK_BATCH_SIZE` trajectories with the "batch"
+                engine), so the results are identical for any number of workers, but differ from the default
+                sequential run, where all trajectories share one stream. The model is sent once to each worker
+                and must be picklable. Trajectories are returned in order. Default is None (sequential run).
+            executor (concurrent.futures.Executor, optional): An executor running the blocks of trajectories, in
+                place of the process pool created for `n_jobs`. The model is sent with every block. Default is None.
 
         Returns:
-            SimulationResults: An object containing all simulation trajectories.
+            SimulationResults: An object containing all simulation trajectories, or a `QuantileSummary` of them
+                if `summary="quantiles"`.
 
         Raises:
+            ValueError: If the engine, the dtype or the summary is not supported, if both `sink` and
+                `summary` are given, or if `n_jobs` is not a positive integer or -1.
             RuntimeError: If the simulation fails.
         """
+        if engine not in SUPPORTED_ENGINES:
+            raise ValueError(
+                f"Unknown engine: {engine}. Supported engines are: {SUPPORTED_ENGINES}"
+            )
+        dtype = resolve_output_dtype(dtype, self.population.Nk.sum(), engine)
+        if summary not in SUPPORTED_SUMMARIES:
+            raise ValueError(
+                f"Unknown summary: {summary}. Supported summaries are: {SUPPORTED_SUMMARIES}"
+            )
+        if summary is not None and sink is not None:
+            raise ValueError("A sink and a summary cannot be used together")
+        if n_jobs is not None and (n_jobs < 1 and n_jobs != -1):
+            raise ValueError(f"n_jobs must be a positive integer or -1, got {n_jobs}")
+        parallel = n_jobs is not None or executor is not None
+        workers = (os.cpu_count() or 1) if n_jobs in (None, -1) else n_jobs
 
         rng = np.random.default_rng(rng)
 
@@ -807,27 +990,135 @@ class EpiModel:
                 )
             simulation_dates = compute_simulation_dates(start_date, end_date, dt=dt)
             self.compute_contact_reductions(simulation_dates)
-            contact_matrices = [self.Cs[date] for date in simulation_dates]
-
-            trajectories = []
-            for _ in range(Nsim):
-                trajectory = simulate(
-                    self,
-                    start_date=start_date,
-                    end_date=end_date,
-                    dt=dt,
-                    initial_conditions_dict=initial_conditions_dict,
-                    percentage_in_agents=percentage_in_agents,
-                    resample_frequency=resample_frequency,
-                    resample_aggregation_compartments=resample_aggregation_compartments,
-                    resample_aggregation_transitions=resample_aggregation_transitions,
-                    fill_method=fill_method,
-                    apply_linear_approximation=apply_linear_approximation,
-                    rng=rng,
-                    simulation_dates=simulation_dates,
-                    contact_matrices=contact_matrices,
+            contact_matrices = self.Cs
+
+            batch_kwargs = dict(
+                dt=dt,
+                initial_conditions_dict=initial_conditions_dict,
+                resample_frequency=resample_frequency,
+                resample_aggregation_compartments=resample_aggregation_compartments,
+                resample_aggregation_transitions=resample_aggregation_transitions,
+                fill_method=fill_method,
+                apply_linear_approximation=apply_linear_approximation,
+                simulation_dates=simulation_dates,
+                contact_matrices=contact_matrices,
+                outputs=outputs,
+                dtype=dtype,
+            )
+            trajectory_kwargs = dict(
+                batch_kwargs,
+                start_date=start_date,
+                end_date=end_date,
+                percentage_in_agents=percentage_in_agents,
+                engine=engine,
+                tau_epsilon=tau_epsilon,
+                hybrid_threshold=hybrid_threshold,
+            )
+
+            def simulate_chunks():
+                """Yields the trajectories as they finish, in chunks."""
+                if engine == "deterministic":
+                    yield [simulate(self, **trajectory_kwargs)]
+                elif parallel:
+                    yield from simulate_parallel_chunks()
+                elif engine == "batch":
+                    # With a sink or a summary, the ensemble is simulated in chunks to bound memory
+                    chunk_size = (
+                        Nsim if sink is None and summary is None else SINK_BATCH_SIZE
+                    )
+                    for first in range(0, Nsim, max(chunk_size, 1)):
+                        yield simulate_batch(
+                            self,
+                            Nsim=min(chunk_size, Nsim - first),
+                            rng=rng,
+                            **batch_kwargs,
+                        )
+                else:
+                    for _ in range(Nsim):
+                        yield [simulate(self, rng=rng, **trajectory_kwargs)]
+
+            def simulate_parallel_chunks():
+                """Yields the trajectories of independently seeded blocks, in trajectory order."""
+                if engine == "batch":
+                    # Fixed chunks, so the streams do not depend on the number of workers
+                    sizes = [
+                        min(SINK_BATCH_SIZE, Nsim - first)
+                        for first in range(0, Nsim, SINK_BATCH_SIZE)
+                    ]
+                    seeds = spawn_seeds(rng, len(sizes))
+                    blocks = [([seed], [size]) for seed, size in zip(seeds, sizes)]
+                    kwargs = batch_kwargs
+                else:
+                    seeds = spawn_seeds(rng, Nsim)
+                    block_size = max(
+                        1, -(-Nsim // (PARALLEL_BLOCKS_PER_WORKER * workers))
+                    )
+                    blocks = [
+                        (seeds[first : first + block_size], None)
+                        for first in range(0, Nsim, block_size)
+                    ]
+                    kwargs = trajectory_kwargs
+
+                if executor is not None:
+                    # The model is sent with every block
+                    results = executor.map(
+                        _simulate_block,
+                        *zip(*blocks),
+                        [self] * len(blocks),
+                        [kwargs] * len(blocks),
+                    )
+                    yield from results
+                elif workers == 1:
+                    for seeds_block, sizes_block in blocks:
+                        yield _simulate_block(seeds_block, sizes_block, self, kwargs)
+                else:
+                    # The model is sent once to each worker
+                    with ProcessPoolExecutor(
+                        max_workers=workers,
+                        initializer=_init_worker,
+                        initargs=(self, kwargs),
+                    ) as pool:
+                        yield from pool.map(_simulate_block, *zip(*blocks))
+
+            if summary == "quantiles":
+                # Update the quantile estimators with each trajectory, then drop it
+                quantile_summary = None
+                for chunk in simulate_chunks():
+                    for trajectory in chunk:
+                        if quantile_summary is None:
+                            quantile_summary = QuantileSummary(
+                                trajectory,
+                                quantiles=summary_quantiles,
+                                parameters=self.parameters,
+                                sketch_size=summary_sketch_size,
+                            )
+                        quantile_summary.update(trajectory)
+                if quantile_summary is not None:
+                    return quantile_summary
+                trajectories = []
+            elif sink is None:
+                # Rows of contiguous (Nsim, ...) arrays, so stacking them is free
+                trajectories = collect_trajectories(
+                    simulate_chunks(), 1 if engine == "deterministic" else Nsim
                 )
-                trajectories.append(trajectory)
+            else:
+                # Write each chunk of trajectories to disk as soon as it finishes
+                n_trajectories = 1 if engine == "deterministic" else Nsim
+                store, written = None, 0
+                for chunk in simulate_chunks():
+                    if store is None:
+                        store = EnsembleStore.create(sink, n_trajectories, chunk[0])
+                        trajectory_parameters = chunk[0].parameters
+                    store.write(written, chunk)
+                    written += len(chunk)
+                if store is None:
+                    trajectories = []
+                else:
+                    store.close()
+                    return EnsembleStore.open(sink).to_results(
+                        parameters=self.parameters,
+                        trajectory_parameters=trajectory_parameters,
+                    )
         except Exception as e:
             raise RuntimeError(f"Simulation failed: {str(e)}") from e
 
@@ -835,6 +1126,254 @@ class EpiModel:
         return SimulationResults(trajectories=trajectories, parameters=self.parameters)
 
 
+def spawn_seeds(
+    rng: Optional[Union[int, np.random.Generator, np.random.SeedSequence]], n: int
+) -> List[np.random.SeedSequence]:
+    """
+    Spawns independent child seed sequences.
+
+    Spawning from a generator advances its seed sequence, so successive calls give new children.
+
+    Args:
+        rng (int, np.random.Generator or np.random.SeedSequence, optional): Seed, generator or seed sequence
+            to spawn from.
+        n (int): Number of children
+
+    Returns:
+        List[np.random.SeedSequence]: The `n` child seed sequences.
+    """
+    if isinstance(rng, np.random.Generator):
+        bit_generator = rng.bit_generator
+        # `seed_seq` is public from numpy 1.25
+        seed_seq = getattr(bit_generator, "seed_seq", None) or bit_generator._seed_seq
+    elif isinstance(rng, np.random.SeedSequence):
+        seed_seq = rng
+    else:
+        seed_seq = np.random.SeedSequence(rng)
+    return seed_seq.spawn(n)
+
+
+def _init_worker(epimodel, simulation_kwargs: Dict[str, Any]) -> None:
+    """Stores the model and simulation arguments of a `run_simulations` worker process."""
+    _WORKER_STATE["epimodel"] = epimodel
+    _WORKER_STATE["simulation_kwargs"] = simulation_kwargs
+
+
+def _simulate_block(
+    seeds: List[np.random.SeedSequence],
+    batch_sizes: Optional[List[int]] = None,
+    epimodel=None,
+    simulation_kwargs: Optional[Dict[str, Any]] = None,
+) -> List[Trajectory]:
+    """
+    Simulates a block of trajectories of a parallel `run_simulations`, one random stream per seed.
+
+    Each seed drives one `simulate` call, or, with `batch_sizes`, one `simulate_batch` call of the
+    given size. The model and arguments default to those stored by `_init_worker`.
+    """
+    if epimodel is None:
+        epimodel = _WORKER_STATE["epimodel"]
+        simulation_kwargs = _WORKER_STATE["simulation_kwargs"]
+    if batch_sizes is None:
+        return [
+            simulate(epimodel, rng=np.random.default_rng(seed), **simulation_kwargs)
+            for seed in seeds
+        ]
+    trajectories = []
+    for seed, size in zip(seeds, batch_sizes):
+        trajectories.extend(
+            simulate_batch(
+                epimodel,
+                Nsim=size,
+                rng=np.random.default_rng(seed),
+                **simulation_kwargs,
+            )
+        )
+    return trajectories
+
+
+def _prepare_simulation(
+    epimodel,
+    start_date: Union[str, pd.Timestamp],
+    end_date: Union[str, pd.Timestamp],
+    initial_conditions_dict: Optional[Dict[str, np.ndarray]],
+    percentage_in_agents: float,
+    dt: float,
+    contact_matrices: Optional[Union[List[Dict[str, np.ndarray]], ContactTimeline]],
+    simulation_dates: Optional[List[pd.Timestamp]],
+    parameter_updates: Dict[str, Any],
+    engine: Optional[str] = None,
+):
+    """
+    Computes the inputs shared by all simulation engines and stores the definitions on the model.
+
+    For the "compiled" engine, the compact read-only `CompiledInputs` of its kernel are also built.
+
+    Returns:
+        tuple: (simulation_dates, contact_matrices, initial_conditions, rate_parameters, compiled_inputs),
+            where `compiled_inputs` is None unless `engine` is "compiled"
+
+    Raises:
+        ValueError: If the model has no transitions defined.
+    """
+    # check that the model has transitions
+    if len(epimodel.transitions_list) == 0:
+        raise ValueError(
+            "The model has no transitions defined. Please add transitions before running simulations."
+        )
+
+    # Compute the simulation dates if not provided
+    if simulation_dates is None:
+        simulation_dates = compute_simulation_dates(start_date, end_date, dt=dt)
+
+    # Compute initial conditions if not provided
+    if initial_conditions_dict is None:
+        initial_conditions_dict = epimodel.create_default_initial_conditions(
+            percentage_in_agents=percentage_in_agents
+        )
+
+    # Compute the contact reductions based on the interventions if not provided
+    if contact_matrices is None:
+        epimodel.compute_contact_reductions(simulation_dates)
+        contact_matrices = epimodel.Cs
+
+    # Update parameters if any are provided via kwargs (needed for calibration purposes)
+    parameters = epimodel.parameters.copy()
+    parameters.update(parameter_updates)
+
+    # Compute the definitions and apply overrides
+    epimodel.definitions = create_definitions(
+        parameters, len(simulation_dates), epimodel.population.Nk.shape[0]
+    )
+    epimodel.definitions = apply_overrides(
+        epimodel.definitions, epimodel.overrides, simulation_dates
+    )
+
+    # Resolve derived-expression rates into dense arrays once per simulation
+    rate_parameters = resolve_rate_parameters(
+        epimodel.compile().rate_params, epimodel.definitions
+    )
+
+    compiled_inputs = None
+    if engine == "compiled":
+        compiled_inputs = CompiledInputs.build(
+            len(simulation_dates),
+            contact_matrices,
+            epimodel.compile().rate_params,
+            rate_parameters,
+            epimodel.population.Nk.shape[0],
+        )
+
+    # Initialize population in different compartments and demographic groups
+    initial_conditions = apply_initial_conditions(epimodel, initial_conditions_dict)
+
+    return (
+        simulation_dates,
+        contact_matrices,
+        initial_conditions,
+        rate_parameters,
+        compiled_inputs,
+    )
+
+
+def _build_trajectories(
+    epimodel,
+    compartments_evolution: np.ndarray,
+    transitions_evolution: np.ndarray,
+    simulation_dates: List[pd.Timestamp],
+    resample_frequency: Optional[str],
+    resample_aggregation_compartments: Optional[Union[str, dict]],
+    resample_aggregation_transitions: Optional[Union[str, dict]],
+    fill_method: Optional[str],
+    recorder: Optional[OutputRecorder] = None,
+) -> List[Trajectory]:
+    """
+    Wraps the kernel outputs of an ensemble into (resampled) `Trajectory` objects, recording their extinction steps.
+
+    The outputs have shape `(Nsim, T, ...)`. If the kernel ran with a `recorder`, they hold its
+    selected variables. The resampling bins are computed once, and aggregations commuting with
+    the sum over demographic groups are applied to the whole ensemble at once.
+    """
+    if recorder is None:
+        plan = epimodel.compile()
+        extinction_steps = [plan.extinction_step(c) for c in compartments_evolution]
+    else:
+        extinction_steps = [
+            None if step < 0 else int(step) for step in recorder.extinction_steps
+        ]
+
+    dates = simulation_dates
+    bins = None
+    # Only resample if necessary
+    if resample_frequency is not None:
+        # Check if resampling is needed (simulation dates frequency != requested frequency)
+        sim_freq = pd.infer_freq(simulation_dates)
+        if sim_freq != resample_frequency:
+            bins = ResampleBins.from_dates(simulation_dates, resample_frequency)
+    if (
+        bins is not None
+        and resample_aggregation_compartments in LINEAR_RESAMPLE_METHODS
+        and resample_aggregation_transitions in LINEAR_RESAMPLE_METHODS
+    ):
+        if fill_method not in FILL_METHODS:
+            raise ValueError(f"fill_method must be one of {FILL_METHODS}")
+        compartments_evolution = resample_array(
+            compartments_evolution,
+            bins,
+            resample_aggregation_compartments,
+            1,
+            fill_method,
+        )
+        transitions_evolution = resample_array(
+            transitions_evolution, bins, resample_aggregation_transitions, 1
+        )
+        dates, bins = bins.dates, None
+
+    trajectories = []
+    for b, extinction_step in enumerate(extinction_steps):
+        if recorder is None:
+            trajectory = Trajectory.from_arrays(
+                compartments_evolution[b],
+                transitions_evolution[b],
+                dates=dates,
+                compartment_idx=epimodel.compartments_idx,
+                transitions_idx=epimodel.transitions_idx,
+                demographics=epimodel.population.Nk_names,
+                parameters=epimodel.definitions,
+            )
+        else:
+            trajectory = Trajectory(
+                compartments=SelectedOutputView(
+                    compartments_evolution[b], recorder.compartment_keys
+                ),
+                transitions=SelectedOutputView(
+                    transitions_evolution[b], recorder.transition_keys
+                ),
+                dates=dates,
+                compartment_idx=epimodel.compartments_idx,
+                transitions_idx=epimodel.transitions_idx,
+                parameters=epimodel.definitions,
+            )
+        trajectory.metadata.update(
+            {
+                "extinction_step": extinction_step,
+                "extinction_date": None
+                if extinction_step is None
+                else pd.Timestamp(simulation_dates[extinction_step]),
+            }
+        )
+        if bins is not None:
+            trajectory.resample(
+                resample_frequency,
+                resample_aggregation_compartments,
+                resample_aggregation_transitions,
+                fill_method,
+                bins=bins,
+            )
+        trajectories.append(trajectory)
+    return trajectories
+
+
 def simulate(
     epimodel,
     start_date: Union[str, pd.Timestamp] = "2020-01-01",
@@ -848,8 +1387,17 @@ def simulate(
     fill_method: Optional[str] = "ffill",
     apply_linear_approximation: bool = False,
     rng: Optional[Union[int, np.random.Generator]] = None,
-    contact_matrices: Optional[List[Dict[str, np.ndarray]]] = None,
+    contact_matrices: Optional[
+        Union[List[Dict[str, np.ndarray]], ContactTimeline]
+    ] = None,
     simulation_dates: Optional[List[pd.Timestamp]] = None,
+    engine: str = "stochastic",
+    tau_epsilon: float = 0.03,
+    hybrid_threshold: Optional[float] = None,
+    outputs: Optional[List[str]] = None,
+    dtype: Union[str, np.dtype] = "float64",
+    stop_condition: Optional[Callable[[Trajectory], bool]] = None,
+    stop_checkpoints: int = 10,
     **kwargs,
 ) -> Trajectory:
     """
@@ -868,56 +1416,252 @@ def simulate(
         fill_method (str, optional): The method to use when filling NaN values after resampling. Default is "ffill".
         apply_linear_approximation (bool, optional): Whether to use linear approximation to the probabilities. Default is False.
         rng (int or np.random.Generator, optional): Seed or random number generator. Default is None.
-        contact_matrices (list, optional): A list of contact matrices for the simulation. Default is None.
+        contact_matrices (list or ContactTimeline, optional): The contact matrices of each simulation step. Default is None.
         simulation_dates (list, optional): A list of simulation dates. Default is None.
+        engine (str, optional): "stochastic" (default) draws the transitions with multinomial tau-leaping,
+            one leap per step of size `dt`; "adaptive_tau" covers each step with adaptive leaps, shorter
+            when the rates change fast, so `dt` only sets the output grid and the largest leap;
+            "deterministic" integrates the expected flows (mean-field), ignoring `rng`; "gillespie" simulates
+            every transition event exactly with the next-reaction method, so `dt` only sets the output grid;
+            "compiled" runs the process of "stochastic" in a kernel compiled with numba, which releases the
+            GIL (plain Python if numba is not installed).
+        tau_epsilon (float, optional): Bound on the relative change of the propensities during a leap
+            of the "adaptive_tau" engine. Default is 0.03.
+        hybrid_threshold (float, optional): With the "gillespie" engine, transitions leaving a (compartment,
+            demographic group) population larger than this are tau-leaped over each step instead of being
+            simulated event by event. Default is None (fully exact).
+        outputs (list of str, optional): The variables to record, as compartment or transition names (e.g.
+            "Infected", for every demographic group and the total) or output keys (e.g.
+            "Susceptible_to_Infected_total"). Only these are kept at each step and stored in the trajectory.
+            Default is None (every compartment and transition).
+        dtype (str or np.dtype, optional): The dtype of the stored compartments and transitions: "float64"
+            (default), "float32", or, for the stochastic engines, "int32" or "int64" (see `resolve_output_dtype`).
+        stop_condition (callable, optional): Called at `stop_checkpoints` evenly spaced steps with the
+            (resampled) trajectory simulated so far; if it returns True, the simulation stops and
+            `SimulationAborted` is raised. Used by `ABCSampler` to abort simulations whose distance
+            already exceeds the tolerance. Supported by the "stochastic", "deterministic" and
+            "adaptive_tau" engines. Default is None.
+        stop_checkpoints (int, optional): Number of checkpoints at which `stop_condition` is called. Default is 10.
         **kwargs: Additional parameters to overwrite model parameters during the simulation.
 
     Returns:
         Trajectory: The trajectory of the simulation
 
     Raises:
-        ValueError: If the model has no transitions defined.
+        ValueError: If the model has no transitions defined, the engine or the dtype is not supported, or
+            an output is not a compartment or transition of the model.
+        SimulationAborted: If the `stop_condition` is met.
     """
+    if engine not in TRAJECTORY_ENGINES:
+        raise ValueError(
+            f"Unknown engine: {engine}. Supported engines are: {TRAJECTORY_ENGINES}"
+        )
+    if stop_condition is not None and engine not in STOPPABLE_ENGINES:
+        raise ValueError(
+            f"stop_condition is not supported by the {engine} engine. Supported engines are: {STOPPABLE_ENGINES}"
+        )
+    dtype = resolve_output_dtype(dtype, epimodel.population.Nk.sum(), engine)
     rng = np.random.default_rng(rng)
 
-    # check that the model has transitions
-    if len(epimodel.transitions_list) == 0:
-        raise ValueError(
-            "The model has no transitions defined. Please add transitions before running simulations."
+    (
+        simulation_dates,
+        contact_matrices,
+        initial_conditions,
+        rate_parameters,
+        compiled_inputs,
+    ) = _prepare_simulation(
+        epimodel,
+        start_date,
+        end_date,
+        initial_conditions_dict,
+        percentage_in_agents,
+        dt,
+        contact_matrices,
+        simulation_dates,
+        kwargs,
+        engine,
+    )
+
+    recorder = None
+    if outputs is not None:
+        recorder = OutputRecorder(
+            outputs,
+            epimodel.compartments_idx,
+            epimodel.transitions_idx,
+            epimodel.population.Nk_names,
+            Nsim=1,
+            T=len(simulation_dates),
+            is_absorbing=epimodel.compile().is_absorbing,
+            dtype=dtype,
         )
 
-    # Compute the simulation dates if not provided
-    if simulation_dates is None:
-        simulation_dates = compute_simulation_dates(start_date, end_date, dt=dt)
+    checkpoint, checkpoint_every = None, None
+    if stop_condition is not None:
+        checkpoint_every = max(1, -(-len(simulation_dates) // stop_checkpoints))
+
+        def checkpoint(t, compartments_evolution, transitions_evolution):
+            # The trajectory of the steps simulated so far, resampled as the final one
+            trajectory = _build_trajectories(
+                epimodel,
+                compartments_evolution[:, : t + 1],
+                transitions_evolution[:, : t + 1],
+                simulation_dates[: t + 1],
+                resample_frequency,
+                resample_aggregation_compartments,
+                resample_aggregation_transitions,
+                fill_method,
+                recorder,
+            )[0]
+            if stop_condition(trajectory):
+                raise SimulationAborted(t)
 
-    # Compute initial conditions if not provided
-    if initial_conditions_dict is None:
-        initial_conditions_dict = epimodel.create_default_initial_conditions(
-            percentage_in_agents=percentage_in_agents
+    # Run simulation with pre-computed contacts
+    if engine == "gillespie":
+        compartments_evolution, transitions_evolution = gillespie_simulation(
+            T=len(simulation_dates),
+            contact_matrices=contact_matrices,
+            epimodel=epimodel,
+            parameters=epimodel.definitions,
+            initial_conditions=initial_conditions,
+            dt=dt,
+            rng=rng,
+            rate_parameters=rate_parameters,
+            hybrid_threshold=hybrid_threshold,
+            apply_linear_approximation=apply_linear_approximation,
+            recorder=recorder,
+            dtype=dtype,
+        )
+    elif engine == "compiled":
+        compartments_evolution, transitions_evolution = compiled_simulation(
+            T=len(simulation_dates),
+            contact_matrices=contact_matrices,
+            epimodel=epimodel,
+            parameters=epimodel.definitions,
+            initial_conditions=initial_conditions,
+            dt=dt,
+            apply_linear_approximation=apply_linear_approximation,
+            rng=rng,
+            rate_parameters=rate_parameters,
+            recorder=recorder,
+            dtype=dtype,
+            inputs=compiled_inputs,
+        )
+    elif engine == "deterministic":
+        compartments_evolution, transitions_evolution = deterministic_simulation(
+            T=len(simulation_dates),
+            contact_matrices=contact_matrices,
+            epimodel=epimodel,
+            parameters=epimodel.definitions,
+            initial_conditions=initial_conditions,
+            dt=dt,
+            apply_linear_approximation=apply_linear_approximation,
+            rate_parameters=rate_parameters,
+            recorder=recorder,
+            dtype=dtype,
+            checkpoint=checkpoint,
+            checkpoint_every=checkpoint_every,
+        )
+    else:
+        compartments_evolution, transitions_evolution = stochastic_simulation(
+            T=len(simulation_dates),
+            contact_matrices=contact_matrices,
+            epimodel=epimodel,
+            parameters=epimodel.definitions,
+            initial_conditions=initial_conditions,
+            dt=dt,
+            apply_linear_approximation=apply_linear_approximation,
+            rng=rng,
+            rate_parameters=rate_parameters,
+            tau_epsilon=tau_epsilon if engine == "adaptive_tau" else None,
+            recorder=recorder,
+            dtype=dtype,
+            checkpoint=checkpoint,
+            checkpoint_every=checkpoint_every,
         )
 
-    # Compute the contact reductions based on the interventions if not provided
-    if contact_matrices is None:
-        epimodel.compute_contact_reductions(simulation_dates)
-        contact_matrices = [epimodel.Cs[date] for date in simulation_dates]
+    return _build_trajectories(
+        epimodel,
+        compartments_evolution[None],
+        transitions_evolution[None],
+        simulation_dates,
+        resample_frequency,
+        resample_aggregation_compartments,
+        resample_aggregation_transitions,
+        fill_method,
+        recorder,
+    )[0]
 
-    # Update parameters if any are provided via kwargs (needed for calibration purposes)
-    parameters = epimodel.parameters.copy()
-    parameters.update(kwargs)
 
-    # Compute the definitions and apply overrides
-    epimodel.definitions = create_definitions(
-        parameters, len(simulation_dates), epimodel.population.Nk.shape[0]
-    )
-    epimodel.definitions = apply_overrides(
-        epimodel.definitions, epimodel.overrides, simulation_dates
+def simulate_batch(
+    epimodel,
+    Nsim: int = 100,
+    start_date: Union[str, pd.Timestamp] = "2020-01-01",
+    end_date: Union[str, pd.Timestamp] = "2020-12-31",
+    initial_conditions_dict: Optional[Dict[str, np.ndarray]] = None,
+    percentage_in_agents: float = 0.0005,
+    dt: Optional[float] = 1.0,
+    resample_frequency: Optional[str] = "D",
+    resample_aggregation_compartments: Optional[Union[str, dict]] = "last",
+    resample_aggregation_transitions: Optional[Union[str, dict]] = "sum",
+    fill_method: Optional[str] = "ffill",
+    apply_linear_approximation: bool = False,
+    rng: Optional[Union[int, np.random.Generator]] = None,
+    contact_matrices: Optional[
+        Union[List[Dict[str, np.ndarray]], ContactTimeline]
+    ] = None,
+    simulation_dates: Optional[List[pd.Timestamp]] = None,
+    outputs: Optional[List[str]] = None,
+    dtype: Union[str, np.dtype] = "float64",
+    **kwargs,
+) -> List[Trajectory]:
+    """
+    Runs `Nsim` simulations of the epidemic model at once with the vectorized ensemble engine.
+
+    Takes the same arguments as `simulate`, plus the number of trajectories `Nsim`.
+
+    Returns:
+        list of Trajectory: The `Nsim` trajectories of the ensemble.
+
+    Raises:
+        ValueError: If the model has no transitions defined, the dtype is not supported or an output
+            is not a compartment or transition of the model.
+    """
+    dtype = resolve_output_dtype(dtype, epimodel.population.Nk.sum())
+    rng = np.random.default_rng(rng)
+
+    (
+        simulation_dates,
+        contact_matrices,
+        initial_conditions,
+        rate_parameters,
+        _,
+    ) = _prepare_simulation(
+        epimodel,
+        start_date,
+        end_date,
+        initial_conditions_dict,
+        percentage_in_agents,
+        dt,
+        contact_matrices,
+        simulation_dates,
+        kwargs,
     )
 
-    # Initialize population in different compartments and demographic groups
-    initial_conditions = apply_initial_conditions(epimodel, initial_conditions_dict)
+    recorder = None
+    if outputs is not None:
+        recorder = OutputRecorder(
+            outputs,
+            epimodel.compartments_idx,
+            epimodel.transitions_idx,
+            epimodel.population.Nk_names,
+            Nsim=Nsim,
+            T=len(simulation_dates),
+            is_absorbing=epimodel.compile().is_absorbing,
+            dtype=dtype,
+        )
 
-    # Run simulation with pre-computed contacts
-    compartments_evolution, transitions_evolution = stochastic_simulation(
+    compartments_evolution, transitions_evolution = batch_stochastic_simulation(
+        Nsim=Nsim,
         T=len(simulation_dates),
         contact_matrices=contact_matrices,
         epimodel=epimodel,
@@ -926,165 +1670,552 @@ def simulate(
         dt=dt,
         apply_linear_approximation=apply_linear_approximation,
         rng=rng,
+        rate_parameters=rate_parameters,
+        recorder=recorder,
+        dtype=dtype,
     )
 
-    # Format the simulation output
-    results = format_simulation_output(
+    return _build_trajectories(
+        epimodel,
         compartments_evolution,
         transitions_evolution,
-        epimodel.compartments_idx,
-        epimodel.transitions_idx,
-        epimodel.population.Nk_names,
-    )
-    trajectory = Trajectory(
-        compartments=results["compartments"],
-        transitions=results["transitions"],
-        dates=simulation_dates,
-        compartment_idx=epimodel.compartments_idx,
-        transitions_idx=epimodel.transitions_idx,
-        parameters=epimodel.definitions,
+        simulation_dates,
+        resample_frequency,
+        resample_aggregation_compartments,
+        resample_aggregation_transitions,
+        fill_method,
+        recorder,
     )
 
-    # Only resample if necessary
-    if resample_frequency is not None:
-        # Check if resampling is needed (simulation dates frequency != requested frequency)
-        sim_freq = pd.infer_freq(simulation_dates)
-        if sim_freq != resample_frequency:
-            trajectory.resample(
-                resample_frequency,
-                resample_aggregation_compartments,
-                resample_aggregation_transitions,
-                fill_method,
-            )
-    return trajectory
-
 
 def stochastic_simulation(
     T: int,
-    contact_matrices: List[Dict[str, np.ndarray]],
+    contact_matrices: Union[List[Dict[str, np.ndarray]], ContactTimeline],
     epimodel,
     parameters: Dict,
     initial_conditions: np.ndarray,
     dt: float,
     apply_linear_approximation: bool = False,
     rng: Optional[Union[int, np.random.Generator]] = None,
+    rate_parameters: Optional[List[Any]] = None,
+    tau_epsilon: Optional[float] = None,
+    recorder: Optional[OutputRecorder] = None,
+    dtype: Union[str, np.dtype] = np.float64,
+    checkpoint: Optional[Callable[[int, np.ndarray, np.ndarray], None]] = None,
+    checkpoint_every: Optional[int] = None,
 ) -> np.ndarray:
     """
     Run a stochastic simulation of the epidemic model.
 
+    The outflows of each transition group are drawn for all demographic groups at once,
+    with a single multinomial call over the `(N, C)` matrix of transition probabilities.
+
     Args:
         T: Number of time steps
-        contact_matrices: Pre-computed list of contact matrices dictionaries (key is the layer, value is the contact matrix)
+        contact_matrices: Pre-computed contact matrices dictionaries of each step (key is the layer, value is the contact
+            matrix), as a list or a `ContactTimeline`
         epimodel: The epidemic model
         parameters: Model parameters
         initial_conditions: Initial population distribution
         dt: Time step size
         apply_linear_approximation (bool, optional): Whether to use linear approximation to the probabilities. Default is False.
         rng (int or np.random.Generator, optional): Seed or random number generator. Default is None.
+        rate_parameters (list, optional): The rates of the compiled plan resolved by `resolve_rate_parameters`.
+            Resolved from `parameters` if None.
+        tau_epsilon (float, optional): If given, each step of size `dt` is covered by adaptive tau-leaps
+            bounding the relative change of the propensities by `tau_epsilon` (see `adaptive_leap_sizes`).
+            Default is None (one leap per step).
+        recorder (OutputRecorder, optional): If given, only the outputs selected by the recorder (created
+            with `Nsim=1`) are recorded. Default is None (every compartment and transition).
+        dtype (str or np.dtype, optional): The dtype of the returned arrays (see `resolve_output_dtype`).
+            Default is float64.
+        checkpoint (callable, optional): Called every `checkpoint_every` steps with the step and the
+            outputs recorded so far (see `_simulation_kernel`). Default is None.
+        checkpoint_every (int, optional): Number of steps between checkpoints.
+
+    Returns:
+        tuple: Compartments of shape (T, C, N) and transitions of shape (T, n_transitions, N), or the
+            recorded compartments and transitions of shape (T, K) if a `recorder` is given
+    """
+    # A single trajectory is an ensemble of one
+    compartments_evolution, transitions_evolution = batch_stochastic_simulation(
+        Nsim=1,
+        T=T,
+        contact_matrices=contact_matrices,
+        epimodel=epimodel,
+        parameters=parameters,
+        initial_conditions=initial_conditions,
+        dt=dt,
+        apply_linear_approximation=apply_linear_approximation,
+        rng=rng,
+        rate_parameters=rate_parameters,
+        tau_epsilon=tau_epsilon,
+        recorder=recorder,
+        dtype=dtype,
+        checkpoint=checkpoint,
+        checkpoint_every=checkpoint_every,
+    )
+    return compartments_evolution[0], transitions_evolution[0]
+
+
+def batch_stochastic_simulation(
+    Nsim: int,
+    T: int,
+    contact_matrices: Union[List[Dict[str, np.ndarray]], ContactTimeline],
+    epimodel,
+    parameters: Dict,
+    initial_conditions: np.ndarray,
+    dt: float,
+    apply_linear_approximation: bool = False,
+    rng: Optional[Union[int, np.random.Generator]] = None,
+    rate_parameters: Optional[List[Any]] = None,
+    tau_epsilon: Optional[float] = None,
+    recorder: Optional[OutputRecorder] = None,
+    dtype: Union[str, np.dtype] = np.float64,
+    checkpoint: Optional[Callable[[int, np.ndarray, np.ndarray], None]] = None,
+    checkpoint_every: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Run `Nsim` stochastic simulations of the epidemic model at once.
+
+    The state of the ensemble is kept as a `(Nsim, C, N)` array, and the outflows of each
+    transition group are drawn for every trajectory and demographic group in a single
+    vectorized multinomial call.
+
+    Args:
+        Nsim: Number of trajectories
+        T: Number of time steps
+        contact_matrices: Pre-computed contact matrices dictionaries of each step (key is the layer, value is the contact
+            matrix), as a list or a `ContactTimeline`
+        epimodel: The epidemic model
+        parameters: Model parameters
+        initial_conditions: Initial population distribution, shared by all trajectories
+        dt: Time step size
+        apply_linear_approximation (bool, optional): Whether to use linear approximation to the probabilities. Default is False.
+        rng (int or np.random.Generator, optional): Seed or random number generator. Default is None.
+        rate_parameters (list, optional): The rates of the compiled plan resolved by `resolve_rate_parameters`.
+            Resolved from `parameters` if None.
+        tau_epsilon (float, optional): If given, each step of size `dt` is covered by adaptive tau-leaps,
+            chosen independently for each trajectory. Default is None (one leap per step).
+        recorder (OutputRecorder, optional): If given, only the outputs selected by the recorder are
+            recorded. Default is None (every compartment and transition).
+        dtype (str or np.dtype, optional): The dtype of the returned arrays (see `resolve_output_dtype`).
+            Default is float64.
+        checkpoint (callable, optional): Called every `checkpoint_every` steps with the step and the
+            outputs recorded so far (see `_simulation_kernel`). Default is None.
+        checkpoint_every (int, optional): Number of steps between checkpoints.
+
+    Returns:
+        tuple: Compartments of shape (Nsim, T, C, N) and transitions of shape (Nsim, T, n_transitions, N),
+            or the recorded compartments and transitions of shape (Nsim, T, K) if a `recorder` is given
     """
     rng = np.random.default_rng(rng)
 
-    # Pre-allocate arrays
+    def draw(current_pop, probs):
+        return rng.multinomial(current_pop.astype(np.int64), probs)
+
+    return _simulation_kernel(
+        Nsim,
+        T,
+        contact_matrices,
+        epimodel,
+        parameters,
+        initial_conditions,
+        dt,
+        apply_linear_approximation,
+        draw,
+        rate_parameters,
+        tau_epsilon,
+        recorder,
+        np.dtype(dtype),
+        checkpoint,
+        checkpoint_every,
+    )
+
+
+def deterministic_simulation(
+    T: int,
+    contact_matrices: Union[List[Dict[str, np.ndarray]], ContactTimeline],
+    epimodel,
+    parameters: Dict,
+    initial_conditions: np.ndarray,
+    dt: float,
+    apply_linear_approximation: bool = False,
+    rate_parameters: Optional[List[Any]] = None,
+    recorder: Optional[OutputRecorder] = None,
+    dtype: Union[str, np.dtype] = np.float64,
+    checkpoint: Optional[Callable[[int, np.ndarray, np.ndarray], None]] = None,
+    checkpoint_every: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Run a deterministic (mean-field) simulation of the epidemic model.
+
+    The model is integrated with fixed steps of size `dt`: at each step, the flows out of each
+    compartment are their expected values under the transition probabilities used by the
+    stochastic engine, so compartments hold real-valued populations.
+
+    Args:
+        T: Number of time steps
+        contact_matrices: Pre-computed contact matrices dictionaries of each step (key is the layer, value is the contact
+            matrix), as a list or a `ContactTimeline`
+        epimodel: The epidemic model
+        parameters: Model parameters
+        initial_conditions: Initial population distribution
+        dt: Time step size
+        apply_linear_approximation (bool, optional): Whether to use linear approximation to the probabilities. Default is False.
+        rate_parameters (list, optional): The rates of the compiled plan resolved by `resolve_rate_parameters`.
+            Resolved from `parameters` if None.
+        recorder (OutputRecorder, optional): If given, only the outputs selected by the recorder (created
+            with `Nsim=1`) are recorded. Default is None (every compartment and transition).
+        dtype (str or np.dtype, optional): The dtype of the returned arrays (see `resolve_output_dtype`).
+            Default is float64.
+        checkpoint (callable, optional): Called every `checkpoint_every` steps with the step and the
+            outputs recorded so far (see `_simulation_kernel`). Default is None.
+        checkpoint_every (int, optional): Number of steps between checkpoints.
+
+    Returns:
+        tuple: Compartments of shape (T, C, N) and transitions of shape (T, n_transitions, N), or the
+            recorded compartments and transitions of shape (T, K) if a `recorder` is given
+    """
+
+    def draw(current_pop, probs):
+        return current_pop[..., None] * probs
+
+    compartments_evolution, transitions_evolution = _simulation_kernel(
+        1,
+        T,
+        contact_matrices,
+        epimodel,
+        parameters,
+        initial_conditions,
+        dt,
+        apply_linear_approximation,
+        draw,
+        rate_parameters,
+        recorder=recorder,
+        dtype=np.dtype(dtype),
+        checkpoint=checkpoint,
+        checkpoint_every=checkpoint_every,
+    )
+    return compartments_evolution[0], transitions_evolution[0]
+
+
+def _simulation_kernel(
+    Nsim: int,
+    T: int,
+    contact_matrices: Union[List[Dict[str, np.ndarray]], ContactTimeline],
+    epimodel,
+    parameters: Dict,
+    initial_conditions: np.ndarray,
+    dt: float,
+    apply_linear_approximation: bool,
+    draw: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    rate_parameters: Optional[List[Any]],
+    tau_epsilon: Optional[float] = None,
+    recorder: Optional[OutputRecorder] = None,
+    dtype: np.dtype = np.float64,
+    checkpoint: Optional[Callable[[int, np.ndarray, np.ndarray], None]] = None,
+    checkpoint_every: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Kernel shared by the stochastic and deterministic engines.
+
+    `draw(current_pop, probs)` turns the `(Nsim, N)` populations of a source compartment and
+    their `(Nsim, N, C)` transition probabilities into the `(Nsim, N, C)` flows of a leap.
+    Each output step of size `dt` is covered by a single leap, or, if `tau_epsilon` is given,
+    by adaptive leaps whose sizes are chosen by `adaptive_leap_sizes`. If a `recorder` is
+    given, only the state of the current step is kept and the recorder stores its outputs.
+    The state is advanced in float64; the recorded outputs are stored as `dtype`.
+    If a `checkpoint` is given, it is called every `checkpoint_every` steps (but the last) with
+    the step and the compartments and transitions recorded so far, of shape `(Nsim, T, ...)`;
+    it can stop the simulation by raising an exception.
+    """
+    plan = epimodel.compile()
+
     N = len(epimodel.population.Nk)
-    C = len(epimodel.compartments)
+    C = plan.n_compartments
 
-    compartments_evolution = np.zeros((T + 1, C, N), dtype=np.float64)
-    transitions_evolution = np.zeros((T, epimodel.n_transitions, N), dtype=np.float64)
-    compartments_evolution[0] = initial_conditions
+    if recorder is None:
+        compartments_evolution = np.zeros((Nsim, T, C, N), dtype=dtype)
+        transitions_evolution = np.zeros((Nsim, T, plan.n_outputs, N), dtype=dtype)
+    else:
+        step_transitions = np.zeros((Nsim, plan.n_outputs, N), dtype=np.float64)
+    pop = np.zeros((Nsim, C, N), dtype=np.float64)
+    pop[:] = initial_conditions
 
-    # Pre-compute population sizes and create views for better performance
     pop_sizes = epimodel.population.Nk
-    comp_indices = epimodel.compartments_idx
-
-    # Pre-allocate arrays for rates and transitions
-    rates = np.zeros((C, N), dtype=np.float64)
-    new_pop = np.zeros((C, N), dtype=np.float64)
-    probs_out = np.empty(C, dtype=np.float64)
+    group_rates = np.zeros((plan.n_groups, Nsim, N, C), dtype=np.float64)
+    new_pop = np.zeros((Nsim, C, N), dtype=np.float64)
+
+    group_source = plan.group_source.tolist()
+    group_ptr = plan.group_ptr.tolist()
+    record_ptr = plan.record_ptr.tolist()
+    record_output = plan.record_output.tolist()
+    record_target = plan.record_target.tolist()
+    kinds = plan.kind.tolist()
+    targets = plan.target.tolist()
+    param_slots = plan.param_slot.tolist()
+    agent_slots = plan.agent_slot.tolist()
+    mediating_agents = plan.mediating_agents
+
+    if tau_epsilon is not None:
+        # Second-order (mediated) reactions bound the relative change of their
+        # reactants more tightly
+        highest_order = np.ones(C)
+        highest_order[plan.source[plan.kind == KIND_MEDIATED]] = 2
+        highest_order[mediating_agents] = 2
+
+    # Expressions are evaluated once here; the loop below only indexes [t]
+    if rate_parameters is None:
+        rate_parameters = resolve_rate_parameters(plan.rate_params, parameters)
+    time_indexed = [
+        isinstance(rate, str) and np.ndim(value) > 0
+        for rate, value in zip(plan.rate_params, rate_parameters)
+    ]
 
-    # create a dictionary to store the data needed for the transitions
     system_data = {
         "parameters": parameters,
         "t": 0,
-        "comp_indices": comp_indices,
+        "comp_indices": epimodel.compartments_idx,
         "contact_matrix": None,
         "pop": None,
         "pop_sizes": pop_sizes,
         "dt": dt,
     }
 
-    # Simulate each time step
     for t in range(T):
-        # Update system data with current state
-        system_data.update(
-            {
-                "t": t,
-                "contact_matrix": contact_matrices[t],
-                "pop": compartments_evolution[t],
-            }
+        # Once every trajectory is in an absorbing state (e.g. the epidemic died out),
+        # the remaining steps repeat it with no transitions
+        if plan.is_absorbing(pop).all():
+            if recorder is None:
+                compartments_evolution[:, t:] = pop[:, None]
+            else:
+                recorder.fill(t, pop)
+            break
+
+        contact_matrix = contact_matrices[t]
+        system_data.update({"t": t, "contact_matrix": contact_matrix})
+        if recorder is None:
+            step_transitions = transitions_evolution[:, t]
+        else:
+            step_transitions.fill(0)
+
+        rate_values = [
+            value[t] if indexed else value
+            for value, indexed in zip(rate_parameters, time_indexed)
+        ]
+        remaining = (
+            np.full(Nsim, dt, dtype=np.float64) if tau_epsilon is not None else None
         )
 
-        new_pop[:] = compartments_evolution[t]
+        while True:
+            # Interaction vector of each agent compartment, (Nsim, A, N), shared by all
+            # the mediated transitions it drives
+            if len(mediating_agents):
+                interactions = (pop[:, mediating_agents] / pop_sizes) @ contact_matrix[
+                    "overall"
+                ].T
+
+            # Rates of every non-empty transition group, computed from the state at the
+            # start of the leap
+            active_groups = []
+            for g, source_idx in enumerate(group_source):
+                if not np.any(pop[:, source_idx]):
+                    continue
+                active_groups.append(g)
+
+                rates = group_rates[g]
+                rates.fill(0)
+                for i in range(group_ptr[g], group_ptr[g + 1]):
+                    if kinds[i] == KIND_CUSTOM:
+                        # User-defined rate functions see one trajectory at a time
+                        trans_rate = np.empty((Nsim, N))
+                        for b in range(Nsim):
+                            system_data["pop"] = pop[b]
+                            trans_rate[b] = plan.functions[i](
+                                plan.params[i], system_data
+                            )
+                    else:
+                        trans_rate = rate_values[param_slots[i]]
+                        if kinds[i] == KIND_MEDIATED:
+                            trans_rate = trans_rate * interactions[:, agent_slots[i]]
+                    rates[:, :, targets[i]] += trans_rate
+
+            if tau_epsilon is None:
+                leap = dt
+            else:
+                tau = np.minimum(
+                    adaptive_leap_sizes(
+                        pop,
+                        group_rates[active_groups],
+                        plan.group_source[active_groups],
+                        highest_order,
+                        tau_epsilon,
+                    ),
+                    remaining,
+                )
+                leap = tau[:, None, None]
 
-        for comp in epimodel.compartments:
-            transitions = epimodel.transitions[comp]
-            if not transitions:
-                continue
+            new_pop[:] = pop
+            for g in active_groups:
+                source_idx = group_source[g]
+                probs = multinomial_probs(
+                    group_rates[g], source_idx, leap, apply_linear_approximation
+                )
+                delta = draw(pop[:, source_idx], probs)
 
-            rates.fill(0)
-            source_idx = comp_indices[comp]
-            current_pop = compartments_evolution[t, source_idx]
-            mask = np.arange(rates.shape[0]) != source_idx
+                for r in range(record_ptr[g], record_ptr[g + 1]):
+                    step_transitions[:, record_output[r]] += delta[
+                        :, :, record_target[r]
+                    ]
 
-            if not np.any(current_pop):
-                continue
+                new_pop[:, source_idx] -= delta.sum(axis=2)
+                new_pop += delta.transpose(0, 2, 1)
+            pop[:] = new_pop
 
-            for tr in transitions:
-                target_idx = comp_indices[tr.target]
-                trans_rate = epimodel.transition_functions[tr.kind](
-                    tr.params, system_data
-                )
-                rates[target_idx] += trans_rate
-
-            delta = np.array(
-                [
-                    multinomial(
-                        n,
-                        r,
-                        source_idx,
-                        mask,
-                        dt,
-                        apply_linear_approximation=apply_linear_approximation,
-                        rng=rng,
-                        probs_out=probs_out,
-                    )
-                    if n > 0
-                    else np.zeros(C)
-                    for n, r in zip(current_pop, rates.T)
-                ]
-            )
+            if tau_epsilon is None:
+                break
+            remaining -= tau
+            if np.all(remaining <= dt * 1e-9) or not active_groups:
+                break
 
-            # Store transition counts (dedupe transitions sharing the same (source, target)
-            # pair, since their rates were already merged into a single delta before the draw)
-            seen_tr_idx = set()
-            for tr in transitions:
-                tr_name = f"{tr.source}_to_{tr.target}"
-                tr_idx = epimodel.transitions_idx[tr_name]
-                if tr_idx in seen_tr_idx:
-                    continue
-                seen_tr_idx.add(tr_idx)
-                transitions_evolution[t, tr_idx] += delta[
-                    :, epimodel.compartments_idx[tr.target]
-                ]
-
-            # Update populations
-            np.subtract(
-                new_pop[source_idx], np.sum(delta, axis=1), out=new_pop[source_idx]
-            )
-            new_pop += delta.T
+        if recorder is None:
+            compartments_evolution[:, t] = pop
+        else:
+            recorder.record(t, pop, step_transitions)
+
+        if checkpoint is not None and (t + 1) % checkpoint_every == 0 and t + 1 < T:
+            if recorder is None:
+                checkpoint(t, compartments_evolution, transitions_evolution)
+            else:
+                recorder.flush()
+                checkpoint(t, recorder.compartments, recorder.transitions)
+
+    if recorder is not None:
+        recorder.flush()
+        return recorder.compartments, recorder.transitions
+    return compartments_evolution, transitions_evolution
+
+
+def adaptive_leap_sizes(
+    pop: np.ndarray,
+    group_rates: np.ndarray,
+    group_source: np.ndarray,
+    highest_order: np.ndarray,
+    tau_epsilon: float,
+) -> np.ndarray:
+    """
+    Computes the largest tau-leap of each trajectory that bounds the relative change of the propensities.
 
-        compartments_evolution[t + 1] = new_pop
+    Follows the species-based leap selection of Cao, Gillespie and Petzold (2006): with
+    `mu` and `sigma2` the expected net change and variance of each (compartment, group)
+    population per unit time, the leap is the largest `tau` such that
+    `|mu| * tau <= max(epsilon * x / g, 1)` and `sigma2 * tau <= max(epsilon * x / g, 1) ** 2`
+    for every population `x`, where `g` is the highest order of the reactions it takes part in.
 
-    return compartments_evolution[1:], transitions_evolution
+    Args:
+        pop: Current populations of shape (Nsim, C, N).
+        group_rates: Per-capita rates of shape (G, Nsim, N, C) of the transition groups (zero on the source column).
+        group_source: Source compartment index of each of the G groups.
+        highest_order: Highest reaction order of each compartment, of shape (C,).
+        tau_epsilon: Bound on the relative change of the propensities during a leap.
+
+    Returns:
+        np.ndarray: The leap size of each trajectory, of shape (Nsim,). Infinite if no transition can occur.
+    """
+    mu = np.zeros_like(pop)
+    sigma2 = np.zeros_like(pop)
+    for source_idx, rates in zip(group_source.tolist(), group_rates):
+        # Propensities of each (trajectory, group, target), (Nsim, N, C)
+        propensities = pop[:, source_idx, :, None] * rates
+        outflow = propensities.sum(axis=2)
+        mu[:, source_idx] -= outflow
+        sigma2[:, source_idx] += outflow
+        mu += propensities.transpose(0, 2, 1)
+        sigma2 += propensities.transpose(0, 2, 1)
+
+    bound = np.maximum(tau_epsilon * pop / highest_order[:, None], 1.0)
+    with np.errstate(divide="ignore"):
+        tau = np.minimum(bound / np.abs(mu), bound**2 / sigma2)
+    return tau.reshape(len(pop), -1).min(axis=1)
+
+
+def resolve_rate_parameters(
+    rate_params: Tuple[Any, ...], parameters: Dict
+) -> List[Any]:
+    """
+    Resolves the rates of a compiled plan once per simulation.
+
+    Parameter names map to their definition arrays, expressions of parameters
+    (e.g. "transmission_rate * (1 - vaccine_efficacy)") are evaluated once over the
+    whole definition arrays, and numeric values are returned unchanged.
+
+    Args:
+        rate_params: The unique rate parameters of a `CompiledModel`.
+        parameters: The model parameters (arrays indexed by time step).
+
+    Returns:
+        list: The resolved rates, in the order of `rate_params`.
+    """
+    resolved = []
+    for rate in rate_params:
+        if isinstance(rate, str):
+            if rate in parameters:
+                resolved.append(parameters[rate])
+            else:
+                resolved.append(np.asarray(evaluate(expr=rate, env=parameters)))
+        else:
+            resolved.append(rate)
+    return resolved
+
+
+def resolve_output_dtype(
+    dtype: Union[str, np.dtype],
+    population_size: float,
+    engine: str = "stochastic",
+) -> np.dtype:
+    """
+    Validates the dtype in which the simulation outputs are stored.
+
+    Stochastic engines only produce integer counts, which can be stored as int32 or int64
+    (a half or a quarter of the default float64 in memory) as long as the whole population
+    fits the integer range. float32 stores counts exactly up to 2**24.
+
+    Args:
+        dtype (str or np.dtype): One of `SUPPORTED_DTYPES`.
+        population_size (float): The total population (e.g. `population.Nk.sum()`), bounding every
+            compartment and transition count.
+        engine (str, optional): The simulation engine. Default is "stochastic".
+
+    Returns:
+        np.dtype: The validated dtype.
+
+    Raises:
+        ValueError: If the dtype is not supported, is an integer dtype with the "deterministic" engine,
+            or cannot hold the population size.
+    """
+    try:
+        dtype = np.dtype(dtype)
+    except TypeError as e:
+        raise ValueError(f"Invalid dtype: {dtype}") from e
+    if dtype.name not in SUPPORTED_DTYPES:
+        raise ValueError(
+            f"Unsupported dtype: {dtype}. Supported dtypes are: {SUPPORTED_DTYPES}"
+        )
+    if dtype.kind == "i":
+        if engine == "deterministic":
+            raise ValueError(
+                "The deterministic engine produces real-valued populations and requires a floating dtype"
+            )
+        if population_size > np.iinfo(dtype).max:
+            raise ValueError(
+                f"The population size ({population_size:.0f}) overflows {dtype}; use int64 or a floating dtype"
+            )
+    elif dtype == np.float32 and population_size > 2**24:
+        warnings.warn(
+            f"The population size ({population_size:.0f}) exceeds 2**24: counts stored as float32 may be rounded"
+        )
+    return dtype
 
 
 def compute_spontaneous_transition_rate(params, data):
@@ -1104,8 +2235,7 @@ def compute_spontaneous_transition_rate(params, data):
         parameters = data["parameters"]
         if params in parameters:
             return parameters[params][t]
-        env_copy = copy.deepcopy(parameters)
-        return evaluate(expr=params, env=env_copy)[t]
+        return evaluate(expr=params, env=parameters)[t]
     else:
         return params
 
@@ -1130,7 +2260,7 @@ def compute_mediated_transition_rate(params, data):
         if params[0] in parameters:
             rate_eval = parameters[params[0]][t]
         else:
-            rate_eval = evaluate(expr=params[0], env=copy.deepcopy(parameters))[t]
+            rate_eval = evaluate(expr=params[0], env=parameters)[t]
     else:
         rate_eval = params[0]
     agent_idx = data["comp_indices"][params[1]]
@@ -0,0 +1,294 @@
+import heapq
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from ..utils.utils import multinomial_probs
+from .compiled_model import KIND_CUSTOM, KIND_MEDIATED
+
+
+def gillespie_simulation(
+    T: int,
+    contact_matrices,
+    epimodel,
+    parameters: Dict,
+    initial_conditions: np.ndarray,
+    dt: float,
+    rng: Optional[Union[int, np.random.Generator]] = None,
+    rate_parameters: Optional[List[Any]] = None,
+    hybrid_threshold: Optional[float] = None,
+    apply_linear_approximation: bool = False,
+    recorder=None,
+    dtype: Union[str, np.dtype] = np.float64,
+) -> np.ndarray:
+    """
+    Run an exact event-driven simulation of the epidemic model with the next-reaction method.
+
+    Each transition in each demographic group is a reaction with its own putative firing time,
+    kept in a priority queue (Gibson and Bruck, 2000). After an event, only the reactions whose
+    propensity changed are rescheduled: those leaving the two compartments involved in that
+    group, and the mediated transitions driven by those compartments in every group. Stale
+    queue entries are skipped lazily. Parameters and contact matrices are constant within each
+    output step of size `dt`; the state is recorded at the end of every step.
+
+    If `hybrid_threshold` is given, at the start of each step the transitions leaving a
+    (compartment, demographic group) population larger than the threshold are advanced by one
+    multinomial tau-leap over the step, and only the remaining reactions are simulated exactly.
+
+    Args:
+        T: Number of time steps
+        contact_matrices: Pre-computed contact matrices dictionaries of each step (key is the layer, value is the contact
+            matrix), as a list or a `ContactTimeline`
+        epimodel: The epidemic model
+        parameters: Model parameters
+        initial_conditions: Initial population distribution
+        dt: Time step size
+        rng (int or np.random.Generator, optional): Seed or random number generator. Default is None.
+        rate_parameters (list, optional): The rates of the compiled plan resolved by `resolve_rate_parameters`.
+            Resolved from `parameters` if None.
+        hybrid_threshold (float, optional): Population above which transitions are tau-leaped. Default is None
+            (fully exact simulation).
+        apply_linear_approximation (bool, optional): Whether to use linear approximation to the probabilities
+            of the tau-leaped transitions. Default is False.
+        recorder (OutputRecorder, optional): If given, only the outputs selected by the recorder (created
+            with `Nsim=1`) are recorded. Default is None (every compartment and transition).
+        dtype (str or np.dtype, optional): The dtype of the returned arrays. Default is float64.
+
+    Returns:
+        tuple: Compartments of shape (T, C, N) and transitions of shape (T, n_transitions, N), or the
+            recorded compartments and transitions of shape (T, K) if a `recorder` is given
+    """
+    # Imported here to avoid a circular import with epimodel.py
+    from .epimodel import resolve_rate_parameters
+
+    rng = np.random.default_rng(rng)
+    plan = epimodel.compile()
+
+    pop_sizes = epimodel.population.Nk
+    N = len(pop_sizes)
+    C = plan.n_compartments
+    M = plan.n_transitions
+
+    if recorder is None:
+        compartments_evolution = np.zeros((T, C, N), dtype=dtype)
+        transitions_evolution = np.zeros((T, plan.n_outputs, N), dtype=dtype)
+    else:
+        step_transitions = np.zeros((plan.n_outputs, N), dtype=np.float64)
+    pop = np.array(initial_conditions, dtype=np.float64)
+
+    sources = plan.source.tolist()
+    targets = plan.target.tolist()
+    kinds = plan.kind.tolist()
+    outputs = plan.output.tolist()
+    param_slots = plan.param_slot.tolist()
+    agent_slots = plan.agent_slot.tolist()
+    mediating_agents = plan.mediating_agents
+    has_custom_kinds = plan.has_custom_kinds
+
+    # Reactions to reschedule when a compartment changes: those leaving it (in the group of
+    # the event) and the mediated ones it drives (in every group)
+    by_source = [np.flatnonzero(plan.source == c).tolist() for c in range(C)]
+    by_agent = [np.flatnonzero(plan.agent == c).tolist() for c in range(C)]
+    agent_slot_of = {c: a for a, c in enumerate(mediating_agents.tolist())}
+    all_groups = np.arange(N)
+
+    if rate_parameters is None:
+        rate_parameters = resolve_rate_parameters(plan.rate_params, parameters)
+    time_indexed = [
+        isinstance(rate, str) and np.ndim(value) > 0
+        for rate, value in zip(plan.rate_params, rate_parameters)
+    ]
+
+    system_data = {
+        "parameters": parameters,
+        "t": 0,
+        "comp_indices": epimodel.compartments_idx,
+        "contact_matrix": None,
+        "pop": pop,
+        "pop_sizes": pop_sizes,
+        "dt": dt,
+    }
+
+    base_rates = np.zeros((M, N))
+    exact = np.ones((M, N), dtype=bool)
+    propensities = np.zeros((M, N))
+    next_time = np.full((M, N), np.inf)
+    version = np.zeros((M, N), dtype=np.int64)
+    interactions = np.zeros((len(mediating_agents), N))
+    queue = []
+
+    def transition_rates(i, groups):
+        """Per-capita rates of transition i in the given demographic groups."""
+        if kinds[i] == KIND_CUSTOM:
+            return np.broadcast_to(
+                plan.functions[i](plan.params[i], system_data), (N,)
+            )[groups]
+        if kinds[i] == KIND_MEDIATED:
+            return base_rates[i, groups] * interactions[agent_slots[i], groups]
+        return base_rates[i, groups]
+
+    def reschedule(i, groups, now):
+        """Updates the propensities of transition i in the given groups and their firing times."""
+        new = transition_rates(i, groups) * pop[sources[i], groups] * exact[i, groups]
+        old = propensities[i, groups]
+        changed = (new != old) | np.isinf(next_time[i, groups]) & (new > 0)
+        if not changed.any():
+            return
+        groups, new, old = groups[changed], new[changed], old[changed]
+        times = next_time[i, groups]
+
+        # Reuse the pending firing time, rescaled to the new propensity; draw a fresh one
+        # for reactions that were not scheduled
+        reuse = (old > 0) & (new > 0) & np.isfinite(times)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            times = np.where(reuse, now + (old / new) * (times - now), np.inf)
+        fresh = ~reuse & (new > 0)
+        if fresh.any():
+            times[fresh] = now + rng.exponential(size=fresh.sum()) / new[fresh]
+
+        propensities[i, groups] = new
+        next_time[i, groups] = times
+        version[i, groups] += 1
+        for n, time in zip(groups.tolist(), times.tolist()):
+            if time < np.inf:
+                heapq.heappush(queue, (time, int(version[i, n]), i, n))
+
+    now = 0.0
+    for t in range(T):
+        # No event can occur from an absorbing state: repeat it over the remaining steps
+        if plan.is_absorbing(pop):
+            if recorder is None:
+                compartments_evolution[t:] = pop
+            else:
+                recorder.fill(t, pop[None])
+            break
+
+        if recorder is None:
+            step_transitions = transitions_evolution[t]
+        else:
+            step_transitions.fill(0)
+        contact_matrix = contact_matrices[t]["overall"]
+        system_data.update({"t": t, "contact_matrix": contact_matrices[t]})
+        rate_values = [
+            value[t] if indexed else value
+            for value, indexed in zip(rate_parameters, time_indexed)
+        ]
+        for i in range(M):
+            if kinds[i] != KIND_CUSTOM:
+                base_rates[i] = rate_values[param_slots[i]]
+
+        if hybrid_threshold is not None:
+            _hybrid_leap(
+                plan,
+                pop,
+                exact,
+                transition_rates,
+                interactions,
+                contact_matrix,
+                pop_sizes,
+                hybrid_threshold,
+                dt,
+                apply_linear_approximation,
+                rng,
+                step_transitions,
+            )
+
+        # Parameters and contacts change at step boundaries: refresh every propensity
+        interactions[:] = (pop[mediating_agents] / pop_sizes) @ contact_matrix.T
+        for i in range(M):
+            reschedule(i, all_groups, now)
+
+        end = (t + 1) * dt
+        while queue:
+            time, ver, i, n = queue[0]
+            if ver != version[i, n]:
+                heapq.heappop(queue)
+                continue
+            if time > end:
+                break
+            heapq.heappop(queue)
+            now = time
+
+            source_idx, target_idx = sources[i], targets[i]
+            pop[source_idx, n] -= 1
+            pop[target_idx, n] += 1
+            step_transitions[outputs[i], n] += 1
+
+            # The fired reaction needs a fresh firing time
+            next_time[i, n] = np.inf
+            propensities[i, n] = 0.0
+
+            for c, delta in ((source_idx, -1.0), (target_idx, 1.0)):
+                if c in agent_slot_of:
+                    interactions[agent_slot_of[c]] += (
+                        delta * contact_matrix[:, n] / pop_sizes[n]
+                    )
+
+            if has_custom_kinds:
+                for j in range(M):
+                    reschedule(j, all_groups, now)
+                continue
+            group = np.array([n])
+            for c in (source_idx, target_idx):
+                for j in by_source[c]:
+                    reschedule(j, group, now)
+                for j in by_agent[c]:
+                    reschedule(j, all_groups, now)
+
+        now = end
+        if recorder is None:
+            compartments_evolution[t] = pop
+        else:
+            recorder.record(t, pop[None], step_transitions[None])
+
+    if recorder is not None:
+        recorder.flush()
+        return recorder.compartments[0], recorder.transitions[0]
+    return compartments_evolution, transitions_evolution
+
+
+def _hybrid_leap(
+    plan,
+    pop: np.ndarray,
+    exact: np.ndarray,
+    transition_rates,
+    interactions: np.ndarray,
+    contact_matrix: np.ndarray,
+    pop_sizes: np.ndarray,
+    threshold: float,
+    dt: float,
+    apply_linear_approximation: bool,
+    rng: np.random.Generator,
+    transitions_step: np.ndarray,
+) -> None:
+    """
+    Tau-leaps over one step the transitions leaving populations larger than `threshold`.
+
+    Updates `pop` and `transitions_step` in place, and sets `exact` to the `(M, N)` mask of
+    the reactions left to the exact simulation.
+    """
+    exact.fill(True)
+    interactions[:] = (pop[plan.mediating_agents] / pop_sizes) @ contact_matrix.T
+    all_groups = np.arange(pop.shape[1])
+
+    # Rates are computed from the state at the start of the step for every group
+    leaps = []
+    for g, source_idx in enumerate(plan.group_source.tolist()):
+        leaped = pop[source_idx] > threshold
+        if not leaped.any():
+            continue
+        rates = np.zeros((pop.shape[1], plan.n_compartments))
+        for i in range(plan.group_ptr[g], plan.group_ptr[g + 1]):
+            rates[:, plan.target[i]] += transition_rates(i, all_groups)
+            exact[i, leaped] = False
+        leaps.append((g, source_idx, leaped, rates))
+
+    for g, source_idx, leaped, rates in leaps:
+        probs = multinomial_probs(rates, source_idx, dt, apply_linear_approximation)
+        delta = rng.multinomial(
+            np.where(leaped, pop[source_idx], 0).astype(np.int64), probs
+        )
+        for r in range(plan.record_ptr[g], plan.record_ptr[g + 1]):
+            transitions_step[plan.record_output[r]] += delta[:, plan.record_target[r]]
+        pop[source_idx] -= delta.sum(axis=1)
+        pop += delta.T
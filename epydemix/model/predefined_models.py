@@ -348,4 +348,6 @@ def add_outcome(
         raise ValueError(
             f"Unknown outcome: '{outcome}'. Supported values are: 'deaths', 'hospitalization'."
         )
+    # recovery_transition.params was rewritten in place
+    model.invalidate_compiled()
     return model
@@ -0,0 +1,332 @@
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .simulation_output import NamedArrayView, SelectedOutputView, Trajectory
+
+DEFAULT_QUANTILES = [0.025, 0.05, 0.25, 0.5, 0.75, 0.95, 0.975]
+
+# Capacity of each level of a `QuantileSketch`: summaries are exact up to this many trajectories
+QUANTILE_SKETCH_SIZE = 512
+
+
+class QuantileSketch:
+    """
+    Streaming quantiles of many cells at once, with a deterministic rank-error bound.
+
+    A hierarchy of compactors (Manku, Rajagopalan and Lindsay 1998; the deterministic
+    counterpart of KLL), vectorized over cells: level `h` holds up to `k` observations of
+    weight `2**h`. When a full level receives new items, it is sorted and every other item
+    (alternately the odd and the even ones) moves up one level with twice the weight. Every
+    cell receives one observation per update, so all cells compact in lockstep.
+
+    Up to `k` observations, every one is kept and the estimates are those of `np.quantile`.
+    Beyond, each estimate is an observed value whose rank among the `n` observations is within
+    `rank_error() * n` of the position `q * (n - 1)` of the exact quantile, with
+    `rank_error() = (floor(log2(n / k)) + 3) / k`. A compaction at level `h` shifts the
+    estimated rank of any value by at most `2**h`, there are at most `n / (k * 2**h)` of them
+    at each of the at most `floor(log2(n / k)) + 1` compacted levels, and the weight of the
+    selected item adds at most `2 * n / k`. For `k = 512`, the bound is 1.4% of the ranks
+    for 10,000 observations.
+
+    Levels grow by doubling up to `k` rows, so up to `k` observations the sketch holds at most
+    `2 * n` values per cell (the next power of two). Beyond, it holds at most `k * L` values per
+    cell, with `L <= floor(log2(n / k)) + 2` levels: `8 * k * L` bytes for each of the cells.
+
+    Attributes:
+        quantiles (np.ndarray): The estimated quantiles, in [0, 1]
+        shape (tuple): The shape of the observed arrays
+        k (int): The capacity of each level
+        count (int): Number of observations so far
+    """
+
+    def __init__(
+        self,
+        quantiles: List[float],
+        shape: Tuple[int, ...],
+        k: int = QUANTILE_SKETCH_SIZE,
+    ) -> None:
+        """
+        Args:
+            quantiles (List[float]): The quantiles to estimate, in [0, 1]
+            shape (tuple): The shape of the observed arrays
+            k (int, optional): The capacity of each level, an even number. Default is `QUANTILE_SKETCH_SIZE`.
+
+        Raises:
+            ValueError: If a quantile is not in [0, 1], or `k` is not a positive even number.
+        """
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        if np.any((self.quantiles < 0) | (self.quantiles > 1)):
+            raise ValueError("Quantiles must be between 0 and 1")
+        if k < 2 or k % 2:
+            raise ValueError("The sketch size must be a positive even number")
+        self.shape = tuple(shape)
+        self.k = k
+        self.count = 0
+        self._n_cells = int(np.prod(self.shape))
+        # Per level: buffer of shape (capacity, n_cells), number of items, offset of the next compaction
+        self._levels = []
+        self._sizes = []
+        self._offsets = []
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Adds one observation of every cell.
+
+        Args:
+            values (np.ndarray): Array of shape `shape`.
+
+        Raises:
+            ValueError: If the values contain NaN, whose rank is undefined.
+        """
+        x = np.asarray(values, dtype=np.float64).reshape(1, -1)
+        if np.isnan(x).any():
+            raise ValueError("Quantile summaries do not support NaN values")
+        self.count += 1
+        self._insert(0, x)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the levels, in bytes."""
+        return sum(buffer.nbytes for buffer in self._levels)
+
+    def _insert(self, level: int, items: np.ndarray) -> None:
+        """Adds `items` of shape (m, n_cells) to `level`, compacting it first if it is full."""
+        if level == len(self._levels):
+            self._levels.append(np.empty((0, self._n_cells), dtype=np.float64))
+            self._sizes.append(0)
+            self._offsets.append(0)
+        buffer = self._levels[level]
+        size = self._sizes[level]
+        if size + len(items) > self.k:
+            full = buffer[:size]
+            full.sort(axis=0)
+            promoted = full[self._offsets[level] :: 2].copy()
+            self._offsets[level] ^= 1
+            size = 0
+            self._insert(level + 1, promoted)
+        if size + len(items) > len(buffer):
+            # Double the capacity up to k, so that few observations take little memory
+            capacity = min(self.k, max(size + len(items), 2 * len(buffer)))
+            grown = np.empty((capacity, self._n_cells), dtype=np.float64)
+            grown[:size] = buffer[:size]
+            self._levels[level] = buffer = grown
+        buffer[size : size + len(items)] = items
+        self._sizes[level] = size + len(items)
+
+    def rank_error(self) -> float:
+        """
+        Bound on the rank error of the estimates, as a fraction of the number of observations.
+
+        Returns:
+            float: 0 if every observation is kept, `(floor(log2(n / k)) + 3) / k` otherwise.
+        """
+        if self.count <= self.k:
+            return 0.0
+        return (np.floor(np.log2(self.count / self.k)) + 3) / self.k
+
+    def result(self) -> np.ndarray:
+        """
+        Returns the current estimates.
+
+        Returns:
+            np.ndarray: Array of shape `(len(quantiles),) + shape` (NaN before the first observation).
+        """
+        n_quantiles = len(self.quantiles)
+        if self.count == 0:
+            return np.full((n_quantiles,) + self.shape, np.nan)
+        if len(self._levels) == 1:
+            estimates = np.quantile(
+                self._levels[0][: self.count], self.quantiles, axis=0
+            )
+            return estimates.reshape((n_quantiles,) + self.shape)
+
+        items = np.concatenate(
+            [buffer[:size] for buffer, size in zip(self._levels, self._sizes)]
+        )
+        weights = np.concatenate(
+            [np.full(size, 2.0**level) for level, size in enumerate(self._sizes)]
+        )
+        order = np.argsort(items, axis=0)
+        items = np.take_along_axis(items, order, axis=0)
+        cumulative = np.cumsum(weights[order], axis=0)
+        # The item covering the position q * (n - 1) of the exact quantile
+        estimates = np.empty((n_quantiles, self._n_cells))
+        for i, q in enumerate(self.quantiles):
+            index = (cumulative <= q * (self.count - 1)).sum(axis=0)
+            index = np.minimum(index, len(items) - 1)
+            estimates[i] = np.take_along_axis(items, index[None], axis=0)[0]
+        return estimates.reshape((n_quantiles,) + self.shape)
+
+
+def _columns(view: Mapping) -> np.ndarray:
+    """Stacks every variable of a trajectory into a `(T, V)` array."""
+    if isinstance(view, SelectedOutputView):
+        return view.array
+    if isinstance(view, NamedArrayView):
+        return np.column_stack([view[key] for key in view])
+    return np.column_stack([np.asarray(value) for value in view.values()])
+
+
+class QuantileSummary:
+    """
+    Quantile bands of an ensemble, updated as each trajectory finishes.
+
+    Returned by `EpiModel.run_simulations(summary="quantiles")` in place of `SimulationResults`:
+    instead of storing every trajectory, a `QuantileSketch` over the (time step, variable) cells
+    is updated with each trajectory. The quantiles are exact up to `sketch_size` trajectories,
+    and beyond have a rank error bounded by `rank_error()`.
+
+    With `T` dates and `V` compartment and transition variables, the sketches hold up to
+    `8 * k * L * T * V` bytes (`nbytes`), with `k = sketch_size` and `L <= floor(log2(Nsim / k)) + 2`
+    levels. Up to `k` trajectories they hold at most twice the float64 ensemble; beyond, memory
+    grows with `L` instead of `Nsim` (with the default `k = 512`, 10,000 trajectories take
+    `6 * 512` rows per cell, about a third of the ensemble).
+    `get_quantiles_compartments` and `get_quantiles_transitions` return the same long-format
+    DataFrame as their `SimulationResults` counterparts, for the tracked quantiles.
+
+    Attributes:
+        quantiles (List[float]): The tracked quantiles
+        dates (List[pd.Timestamp]): Simulation dates
+        compartment_keys (List[str]): Names of the compartment variables
+        transition_keys (List[str]): Names of the transition variables
+        compartment_idx (Dict[str, int]): Dictionary mapping compartment names to indices
+        parameters (Dict[str, Any]): Dictionary of parameters used in the simulations
+    """
+
+    def __init__(
+        self,
+        template: Trajectory,
+        quantiles: Optional[List[float]] = None,
+        parameters: Optional[Dict[str, Any]] = None,
+        sketch_size: int = QUANTILE_SKETCH_SIZE,
+    ) -> None:
+        """
+        Args:
+            template (Trajectory): A trajectory of the ensemble, giving the dates and variables. It is not added
+                to the summary.
+            quantiles (List[float], optional): The quantiles to track. Defaults to
+                [0.025, 0.05, 0.25, 0.5, 0.75, 0.95, 0.975].
+            parameters (dict, optional): The parameters of the simulations. Default is None (empty).
+            sketch_size (int, optional): The capacity of each level of the sketches. Default is
+                `QUANTILE_SKETCH_SIZE`.
+        """
+        self.quantiles = list(DEFAULT_QUANTILES if quantiles is None else quantiles)
+        self.dates = list(template.dates)
+        self.compartment_keys = list(template.compartments)
+        self.transition_keys = list(template.transitions)
+        self.compartment_idx = template.compartment_idx
+        self.parameters = {} if parameters is None else parameters
+        self._compact = {
+            name: _columns(getattr(template, name)).dtype.itemsize <= 4
+            for name in ("compartments", "transitions")
+        }
+        self._estimators = {
+            "compartments": QuantileSketch(
+                self.quantiles,
+                (len(self.dates), len(self.compartment_keys)),
+                sketch_size,
+            ),
+            "transitions": QuantileSketch(
+                self.quantiles,
+                (len(self.dates), len(self.transition_keys)),
+                sketch_size,
+            ),
+        }
+
+    @property
+    def Nsim(self) -> int:
+        """Number of trajectories summarized."""
+        return self._estimators["compartments"].count
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the sketches, in bytes."""
+        return sum(estimator.nbytes for estimator in self._estimators.values())
+
+    def rank_error(self) -> float:
+        """Bound on the rank error of the quantiles, as a fraction of `Nsim` (see `QuantileSketch`)."""
+        return self._estimators["compartments"].rank_error()
+
+    def update(self, trajectory: Trajectory) -> None:
+        """
+        Adds a trajectory to the summary.
+
+        Args:
+            trajectory (Trajectory): A trajectory with the same dates and variables as the template
+
+        Raises:
+            ValueError: If the trajectory contains NaN values.
+        """
+        for name, estimator in self._estimators.items():
+            estimator.update(_columns(getattr(trajectory, name)))
+
+    def _get_quantiles(
+        self,
+        name: str,
+        keys: List[str],
+        quantiles: Optional[List[float]],
+        variables: Optional[List[str]],
+    ) -> pd.DataFrame:
+        """Builds the long-format DataFrame of the quantiles of the `name` variables."""
+        if quantiles is None:
+            quantiles = self.quantiles
+        missing = [q for q in quantiles if q not in self.quantiles]
+        if missing:
+            raise ValueError(
+                f"Quantiles {missing} were not tracked. Tracked quantiles are: {self.quantiles}"
+            )
+        rows = [self.quantiles.index(q) for q in quantiles]
+        estimates = self._estimators[name].result()[rows]
+        if self._compact[name]:
+            estimates = estimates.astype(np.float32)
+
+        data = {
+            "date": self.dates * len(quantiles),
+            "quantile": np.repeat(quantiles, len(self.dates)).tolist(),
+        }
+        for j, key in enumerate(keys):
+            if variables and key not in variables:
+                continue
+            data[key] = estimates[:, :, j].ravel()
+        return pd.DataFrame(data)
+
+    def get_quantiles_compartments(
+        self,
+        quantiles: Optional[List[float]] = None,
+        variables: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Get the quantiles of the compartments across the summarized trajectories.
+
+        Args:
+            quantiles: Quantiles to return, among the tracked ones. If None, all tracked quantiles are returned.
+            variables: List of compartment names to include. If None, all compartments are included.
+
+        Raises:
+            ValueError: If a quantile was not tracked.
+        """
+        return self._get_quantiles(
+            "compartments", self.compartment_keys, quantiles, variables
+        )
+
+    def get_quantiles_transitions(
+        self,
+        quantiles: Optional[List[float]] = None,
+        variables: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Get the quantiles of the transitions across the summarized trajectories.
+
+        Args:
+            quantiles: Quantiles to return, among the tracked ones. If None, all tracked quantiles are returned.
+            variables: List of transition names to include. If None, all transitions are included.
+
+        Raises:
+            ValueError: If a quantile was not tracked.
+        """
+        return self._get_quantiles(
+            "transitions", self.transition_keys, quantiles, variables
+        )
@@ -1,81 +1,616 @@
-from dataclasses import dataclass
-from typing import Any, Dict, List
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 
 
+class NamedArrayView(Mapping):
+    """
+    Read-only mapping giving named access to a simulation output array.
+
+    The array has shape `(..., timesteps, K, n_demographics)`, where `K` indexes the names in
+    `idx` (compartments or transitions). Keys follow `format_simulation_output`: for each name,
+    `"{name}_{group}"` for every demographic group, then `"{name}_total"`. Group keys are
+    zero-copy views into the array; totals are summed over the groups on first access and
+    cached (unless the array is memory-mapped). Use `dict(view)` to materialize every key.
+
+    Attributes:
+        array (np.ndarray): The underlying array
+        idx (Dict[str, int]): Dictionary mapping names to their index along the `K` axis
+        demographics (List[str]): List of demographic group names
+    """
+
+    def __init__(
+        self, array: np.ndarray, idx: Dict[str, int], demographics: List[str]
+    ) -> None:
+        self.array = array
+        self.idx = idx
+        self.demographics = list(demographics)
+        self._keys: Dict[str, Tuple[int, Optional[int]]] = {}
+        for name, pos in idx.items():
+            for i, dem in enumerate(self.demographics):
+                self._keys[f"{name}_{dem}"] = (pos, i)
+            self._keys[f"{name}_total"] = (pos, None)
+        self._totals: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        pos, group = self._keys[key]
+        if group is not None:
+            return self.array[..., pos, group]
+        if key in self._totals:
+            return self._totals[key]
+        total = self.array[..., pos, :].sum(axis=-1, dtype=self.array.dtype)
+        # Totals of memory-mapped arrays are not kept in memory
+        if not isinstance(self.array, np.memmap):
+            self._totals[key] = total
+        return total
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __repr__(self) -> str:
+        return f"NamedArrayView(shape={self.array.shape}, keys={list(self._keys)})"
+
+    @property
+    def layout(self) -> Tuple:
+        """Names and demographic groups of the view; views with equal layouts have the same keys."""
+        return (tuple(self.idx.items()), tuple(self.demographics))
+
+    def like(self, array: np.ndarray) -> "NamedArrayView":
+        """Creates a view with the same layout over another array."""
+        return NamedArrayView(array, self.idx, self.demographics)
+
+
+class SelectedOutputView(Mapping):
+    """
+    Read-only mapping giving named access to the selected outputs recorded by an `OutputRecorder`.
+
+    The array has shape `(..., timesteps, K)` with one column per key; every key is a zero-copy
+    view into the array.
+
+    Attributes:
+        array (np.ndarray): The underlying array
+        keys_list (List[str]): The key of each column
+    """
+
+    def __init__(self, array: np.ndarray, keys: List[str]) -> None:
+        self.array = array
+        self.keys_list = list(keys)
+        self._columns = {key: j for j, key in enumerate(self.keys_list)}
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.array[..., self._columns[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys_list)
+
+    def __len__(self) -> int:
+        return len(self.keys_list)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._columns
+
+    def __repr__(self) -> str:
+        return f"SelectedOutputView(shape={self.array.shape}, keys={self.keys_list})"
+
+    @property
+    def layout(self) -> Tuple:
+        """Keys of the view; views with equal layouts have the same keys."""
+        return tuple(self.keys_list)
+
+    def like(self, array: np.ndarray) -> "SelectedOutputView":
+        """Creates a view with the same layout over another array."""
+        return SelectedOutputView(array, self.keys_list)
+
+
+# Aggregations applied by `resample_array` without pandas
+RESAMPLE_METHODS = ["sum", "mean", "first", "last", "min", "max"]
+# Aggregations commuting with the sum over demographic groups, which can be applied to the
+# arrays backing a `NamedArrayView` (whose totals are computed after resampling)
+LINEAR_RESAMPLE_METHODS = ["sum", "mean", "first", "last"]
+FILL_METHODS = ["ffill", "bfill", "interpolate"]
+
+
+@dataclass(frozen=True)
+class ResampleBins:
+    """
+    Time bins of a resampling, computed once from the simulation dates.
+
+    Attributes:
+        dates (List[pd.Timestamp]): Label of each bin
+        starts (np.ndarray): Position of the first date of each non-empty bin
+        counts (np.ndarray): Number of dates in each bin (zero for bins with no date)
+    """
+
+    dates: List[pd.Timestamp]
+    starts: np.ndarray
+    counts: np.ndarray
+
+    @classmethod
+    def from_dates(cls, dates: List[pd.Timestamp], freq: str) -> "ResampleBins":
+        """
+        Computes the bins of `pd.DataFrame.resample(freq)` over the given dates.
+
+        Args:
+            dates (List[pd.Timestamp]): Sorted simulation dates
+            freq (str): Frequency for resampling (e.g., 'D' for daily, 'W' for weekly)
+
+        Returns:
+            ResampleBins: The bins.
+        """
+        positions = pd.Series(
+            np.arange(len(dates)), index=pd.DatetimeIndex(dates)
+        ).resample(freq)
+        counts = positions.count()
+        nonempty = counts.to_numpy() > 0
+        return cls(
+            dates=counts.index.tolist(),
+            starts=positions.min().to_numpy()[nonempty].astype(np.int64),
+            counts=counts.to_numpy(),
+        )
+
+
+def resample_array(
+    array: np.ndarray,
+    bins: ResampleBins,
+    method: str,
+    axis: int,
+    fill_method: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Aggregates an array over time bins, as `pd.DataFrame.resample(...).agg(method)` does column-wise.
+
+    The whole array is reduced at once (e.g. the `(Nsim, T, C, N)` outputs of an ensemble), with
+    `np.add.reduceat`-style operations over the non-empty bins. Empty bins (when the simulation
+    step is longer than the bins) are 0 for "sum", and are otherwise filled with `fill_method`.
+
+    Args:
+        array (np.ndarray): The array to resample
+        bins (ResampleBins): The time bins
+        method (str): Aggregation method, one of `RESAMPLE_METHODS`
+        axis (int): The time axis of `array`
+        fill_method (str, optional): How empty bins are filled: 'ffill' (last valid bin), 'bfill' (next valid
+            bin), 'interpolate' (linear interpolation between bins), or None (0). Default is None.
+
+    Returns:
+        np.ndarray: The resampled array, with `len(bins.dates)` entries along `axis`.
+
+    Raises:
+        ValueError: If the method or the fill method is not supported.
+    """
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(
+            f"Unsupported resampling method: {method}. Supported methods are: {RESAMPLE_METHODS}"
+        )
+    if fill_method is not None and fill_method not in FILL_METHODS:
+        raise ValueError(f"fill_method must be one of {FILL_METHODS}")
+
+    axis = axis % array.ndim
+    nonempty = bins.counts > 0
+    counts = bins.counts[nonempty]
+    if method == "sum":
+        values = np.add.reduceat(array, bins.starts, axis=axis)
+    elif method == "mean":
+        shape = [1] * array.ndim
+        shape[axis] = len(counts)
+        values = np.add.reduceat(
+            array, bins.starts, axis=axis, dtype=np.float64
+        ) / counts.reshape(shape)
+    elif method == "first":
+        values = array.take(bins.starts, axis=axis)
+    elif method == "last":
+        values = array.take(bins.starts + counts - 1, axis=axis)
+    elif method == "min":
+        values = np.minimum.reduceat(array, bins.starts, axis=axis)
+    else:
+        values = np.maximum.reduceat(array, bins.starts, axis=axis)
+    if nonempty.all():
+        return values
+
+    n_bins = len(bins.counts)
+    filled = np.flatnonzero(nonempty)
+    if method == "sum" or fill_method is None:
+        shape = list(values.shape)
+        shape[axis] = n_bins
+        result = np.zeros(shape, dtype=values.dtype)
+        index = [slice(None)] * array.ndim
+        index[axis] = filled
+        result[tuple(index)] = values
+        return result
+
+    # Position of the last and next non-empty bins of every bin
+    positions = np.arange(n_bins)
+    previous = np.searchsorted(filled, positions, side="right") - 1
+    following = np.minimum(
+        np.searchsorted(filled, positions, side="left"), len(filled) - 1
+    )
+    if fill_method == "ffill":
+        return values.take(previous, axis=axis)
+    if fill_method == "bfill":
+        return values.take(following, axis=axis)
+
+    # Linear interpolation between bins, as np.interp; edges repeat the nearest bin
+    previous = np.maximum(previous, 0)
+    low = values.take(previous, axis=axis).astype(np.float64)
+    high = values.take(following, axis=axis).astype(np.float64)
+    span = filled[following] - filled[previous]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(span > 0, (positions - filled[previous]) / span, 0.0)
+    shape = [1] * array.ndim
+    shape[axis] = n_bins
+    return low + (high - low) * weight.reshape(shape)
+
+
+def _resample_variables(
+    variables: Mapping[str, np.ndarray],
+    dates: List[pd.Timestamp],
+    freq: str,
+    bins: ResampleBins,
+    method: Union[str, Dict[str, str]],
+    fill_method: Optional[str],
+) -> Mapping[str, np.ndarray]:
+    """
+    Resamples the variables of a trajectory.
+
+    Views are resampled through their arrays for `LINEAR_RESAMPLE_METHODS`; other methods, or a
+    method per variable, are applied to each variable (totals included). Methods not in
+    `RESAMPLE_METHODS`, and variables with NaN values (which pandas skips), are delegated to
+    pandas. Empty bins are filled with `fill_method`, or 0 if None.
+    """
+    if isinstance(variables, (NamedArrayView, SelectedOutputView)):
+        arrays = [variables.array]
+    else:
+        arrays = [np.asarray(values) for values in variables.values()]
+    has_nan = any(a.dtype.kind == "f" and np.isnan(a).any() for a in arrays)
+
+    if not has_nan and isinstance(method, str) and method in LINEAR_RESAMPLE_METHODS:
+        if isinstance(variables, NamedArrayView):
+            return variables.like(
+                resample_array(variables.array, bins, method, -3, fill_method)
+            )
+        if isinstance(variables, SelectedOutputView):
+            return variables.like(
+                resample_array(variables.array, bins, method, -2, fill_method)
+            )
+
+    # As with `DataFrame.agg`, a dictionary selects the variables and their methods
+    methods = method if isinstance(method, dict) else dict.fromkeys(variables, method)
+    if not has_nan and all(
+        isinstance(m, str) and m in RESAMPLE_METHODS for m in methods.values()
+    ):
+        columns = [
+            resample_array(np.asarray(variables[key]), bins, m, 0, fill_method)
+            for key, m in methods.items()
+        ]
+        return SelectedOutputView(np.stack(columns, axis=-1), list(methods))
+
+    df = pd.DataFrame(dict(variables), index=dates).resample(freq).agg(method)
+    if fill_method == "interpolate":
+        df = df.interpolate(method="linear").ffill().bfill()
+    elif fill_method == "ffill":
+        df = df.ffill()
+    elif fill_method == "bfill":
+        df = df.bfill()
+    else:
+        df = df.fillna(0)
+    return {k: np.array(v) for k, v in df.items()}
+
+
+def _output_keys(
+    idx: Dict[str, int], demographics: List[str]
+) -> Tuple[Dict[str, Tuple[int, int]], Dict[str, List[str]]]:
+    """
+    Lists the output keys of the names in `idx`, in the order of `format_simulation_output`.
+
+    Returns:
+        tuple: The `(position, group)` of each key (group is -1 for totals), and the keys of each name.
+    """
+    keys, by_name = {}, {}
+    for name, pos in idx.items():
+        by_name[name] = []
+        for i, dem in enumerate(demographics):
+            keys[f"{name}_{dem}"] = (pos, i)
+            by_name[name].append(f"{name}_{dem}")
+        keys[f"{name}_total"] = (pos, -1)
+        by_name[name].append(f"{name}_total")
+    return keys, by_name
+
+
+class OutputRecorder:
+    """
+    Records a selection of output variables at each step of a simulation.
+
+    Outputs are given as compartment or transition names, either as full keys (e.g.
+    `"Infected_total"`, `"Susceptible_to_Infected_0-4"`) or as bare names (e.g. `"Infected"`),
+    which select every group of that name and its total. Simulation kernels receiving a
+    recorder keep the full state of the current step only and pass it to `record`; the
+    recorder buffers the last `chunk_size` steps and reduces them at once into the selected
+    variables, stored in `(Nsim, T, K)` arrays. If given `is_absorbing`, the recorder also
+    tracks the extinction step of each trajectory.
+
+    Attributes:
+        compartment_keys (List[str]): Keys of the recorded compartments
+        transition_keys (List[str]): Keys of the recorded transitions
+        compartments (np.ndarray): Recorded compartments, of shape (Nsim, T, len(compartment_keys))
+        transitions (np.ndarray): Recorded transitions, of shape (Nsim, T, len(transition_keys))
+        extinction_steps (np.ndarray): First step at which each trajectory is in an absorbing state (-1 if none)
+    """
+
+    def __init__(
+        self,
+        outputs: List[str],
+        compartments_idx: Dict[str, int],
+        transitions_idx: Dict[str, int],
+        demographics: List[str],
+        Nsim: int,
+        T: int,
+        is_absorbing: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        chunk_size: int = 64,
+        dtype: Union[str, np.dtype] = np.float64,
+    ) -> None:
+        """
+        Args:
+            outputs (List[str]): Names of the variables to record
+            compartments_idx (Dict[str, int]): Dictionary mapping compartment names to indices
+            transitions_idx (Dict[str, int]): Dictionary mapping transition names to indices
+            demographics (List[str]): List of demographic group names
+            Nsim (int): Number of trajectories
+            T (int): Number of time steps
+            is_absorbing (callable, optional): Checks whether states of shape (..., C, N) are absorbing
+                (e.g. `CompiledModel.is_absorbing`). Default is None (no extinction tracking).
+            chunk_size (int, optional): Number of steps buffered before being reduced. Default is 64.
+            dtype (str or np.dtype, optional): The dtype of the recorded outputs. Default is float64.
+
+        Raises:
+            ValueError: If an output is not a compartment or transition of the model.
+        """
+        if isinstance(outputs, str):
+            outputs = [outputs]
+        N = len(demographics)
+        selections = []
+        for idx in (compartments_idx, transitions_idx):
+            keys, by_name = _output_keys(idx, demographics)
+            selections.append((keys, by_name, {}))
+
+        for name in outputs:
+            for keys, by_name, selected in selections:
+                if name in keys:
+                    selected.setdefault(name, keys[name])
+                    break
+                if name in by_name:
+                    for key in by_name[name]:
+                        selected.setdefault(key, keys[key])
+                    break
+            else:
+                raise ValueError(
+                    f"Unknown output variable: {name}. Outputs must be compartment or transition names, "
+                    "optionally followed by a demographic group or '_total' (e.g. 'Infected_total')."
+                )
+
+        (_, _, comp_selected), (_, _, trans_selected) = selections
+        self.compartment_keys = list(comp_selected)
+        self.transition_keys = list(trans_selected)
+        self._compartment_rows, self._compartment_weights = self._projection(
+            comp_selected, N
+        )
+        self._transition_rows, self._transition_weights = self._projection(
+            trans_selected, N
+        )
+        self.compartments = np.zeros((Nsim, T, len(self.compartment_keys)), dtype=dtype)
+        self.transitions = np.zeros((Nsim, T, len(self.transition_keys)), dtype=dtype)
+        self.extinction_steps = np.full(Nsim, -1, dtype=np.int64)
+        self.is_absorbing = is_absorbing
+        self.chunk_size = chunk_size
+        self._pop_buffer = None
+        self._transitions_buffer = None
+        self._start = 0
+        self._filled = 0
+
+    @staticmethod
+    def _projection(
+        selected: Dict[str, Tuple[int, int]], N: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """The row and the `(N,)` group weights (one-hot, or ones for totals) of each selected key."""
+        rows = np.array([pos for pos, _ in selected.values()], dtype=np.int64)
+        weights = np.zeros((len(selected), N), dtype=np.float64)
+        for k, (_, group) in enumerate(selected.values()):
+            if group < 0:
+                weights[k] = 1
+            else:
+                weights[k, group] = 1
+        return rows, weights
+
+    def project_compartments(self, pop: np.ndarray) -> np.ndarray:
+        """Reduces states of shape (..., C, N) to the selected compartments, of shape (..., K)."""
+        return np.einsum(
+            "...kn,kn->...k",
+            pop[..., self._compartment_rows, :],
+            self._compartment_weights,
+        )
+
+    def record(self, t: int, pop: np.ndarray, transitions: np.ndarray) -> None:
+        """
+        Records step `t`. Steps must be recorded in order.
+
+        Args:
+            t (int): The step
+            pop (np.ndarray): State at the end of the step, of shape (Nsim, C, N)
+            transitions (np.ndarray): Transitions of the step, of shape (Nsim, n_transitions, N)
+        """
+        if self._pop_buffer is None:
+            self._pop_buffer = np.empty(
+                (pop.shape[0], self.chunk_size) + pop.shape[1:], dtype=pop.dtype
+            )
+            self._transitions_buffer = np.empty(
+                (transitions.shape[0], self.chunk_size) + transitions.shape[1:],
+                dtype=transitions.dtype,
+            )
+            self._start = t
+        self._pop_buffer[:, self._filled] = pop
+        self._transitions_buffer[:, self._filled] = transitions
+        self._filled += 1
+        if self._filled == self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Reduces the buffered steps into the recorded outputs."""
+        n, start = self._filled, self._start
+        if n == 0:
+            return
+        pop = self._pop_buffer[:, :n]
+        self.compartments[:, start : start + n] = self.project_compartments(pop)
+        self.transitions[:, start : start + n] = np.einsum(
+            "...kn,kn->...k",
+            self._transitions_buffer[:, :n, self._transition_rows],
+            self._transition_weights,
+        )
+        if self.is_absorbing is not None:
+            absorbing = self.is_absorbing(pop)
+            reached = (self.extinction_steps < 0) & absorbing.any(axis=1)
+            self.extinction_steps[reached] = start + absorbing[reached].argmax(axis=1)
+        self._start += n
+        self._filled = 0
+
+    def fill(self, t: int, pop: np.ndarray) -> None:
+        """
+        Records the absorbing states `pop` of shape (Nsim, C, N) from step `t` onwards, with no transitions.
+        """
+        self.flush()
+        self.compartments[:, t:] = self.project_compartments(pop)[:, None]
+        self.extinction_steps[self.extinction_steps < 0] = t
+        self._start = len(self.compartments[0])
+
+
 @dataclass
 class Trajectory:
     """
     Class to store a single trajectory data.
 
+    Trajectories produced by the simulation engines are backed by the `(timesteps, C, N)`
+    compartments and `(timesteps, K, N)` transitions arrays (see `from_arrays`), with
+    `NamedArrayView` providing the named access. Simulations restricted to a selection of
+    outputs (see `OutputRecorder`) hold only those variables, through a `SelectedOutputView`.
+
     Attributes:
-        compartments (Dict[str, np.ndarray]): Dictionary mapping compartment names to arrays of shape (timesteps,)
-        transitions (Dict[str, np.ndarray]): Dictionary mapping transition names to arrays of shape (timesteps,)
+        compartments (Mapping[str, np.ndarray]): Mapping of compartment names to arrays of shape (timesteps,)
+        transitions (Mapping[str, np.ndarray]): Mapping of transition names to arrays of shape (timesteps,)
         dates (List[pd.Timestamp]): List of simulation dates
         compartment_idx (Dict[str, int]): Dictionary mapping compartment names to indices
         transitions_idx (Dict[str, int]): Dictionary mapping transition names to indices
         parameters (Dict[str, Any]): Dictionary of parameters used in the simulation
+        metadata (Dict[str, Any]): Additional information about the run (e.g. "extinction_step" and
+            "extinction_date", the first simulation step and date at which no transition can occur anymore,
+            or None if the epidemic does not die out)
     """
 
-    compartments: Dict[str, np.ndarray]
-    transitions: Dict[str, np.ndarray]
+    compartments: Mapping[str, np.ndarray]
+    transitions: Mapping[str, np.ndarray]
     dates: List[pd.Timestamp]
     compartment_idx: Dict[str, int]
     transitions_idx: Dict[str, int]
     parameters: Dict[str, Any]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        compartments_evolution: np.ndarray,
+        transitions_evolution: np.ndarray,
+        dates: List[pd.Timestamp],
+        compartment_idx: Dict[str, int],
+        transitions_idx: Dict[str, int],
+        demographics: List[str],
+        parameters: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> "Trajectory":
+        """
+        Creates a trajectory backed by the simulation output arrays, without copying them.
+
+        Args:
+            compartments_evolution (np.ndarray): Array of shape (timesteps, n_compartments, n_demographics)
+            transitions_evolution (np.ndarray): Array of shape (timesteps, n_transitions, n_demographics)
+            dates (List[pd.Timestamp]): List of simulation dates
+            compartment_idx (Dict[str, int]): Dictionary mapping compartment names to indices
+            transitions_idx (Dict[str, int]): Dictionary mapping transition names to indices
+            demographics (List[str]): List of demographic group names
+            parameters (Dict[str, Any]): Dictionary of parameters used in the simulation
+            metadata (Dict[str, Any], optional): Additional information about the run
+
+        Returns:
+            Trajectory: The array-backed trajectory
+        """
+        return cls(
+            compartments=NamedArrayView(
+                compartments_evolution, compartment_idx, demographics
+            ),
+            transitions=NamedArrayView(
+                transitions_evolution, transitions_idx, demographics
+            ),
+            dates=dates,
+            compartment_idx=compartment_idx,
+            transitions_idx=transitions_idx,
+            parameters=parameters,
+            metadata={} if metadata is None else metadata,
+        )
 
     def resample(
         self,
         freq: str,
-        method_compartments: str = "last",
-        method_transitions: str = "sum",
+        method_compartments: Union[str, Dict[str, str]] = "last",
+        method_transitions: Union[str, Dict[str, str]] = "sum",
         fill_method: str = "ffill",
-    ) -> None:
+        bins: Optional[ResampleBins] = None,
+    ) -> "Trajectory":
         """
         Resample trajectory to new frequency.
 
+        The trajectory is updated in place and returned. Array-backed variables stay array-backed;
+        the bins are computed once from the dates, and the aggregations are applied to the arrays.
+
         Args:
             freq (str): Frequency for resampling (e.g., 'D' for daily, 'W' for weekly)
-            method_compartments (str): Aggregation method for compartments. Default is 'last'
-            method_transitions (str): Aggregation method for transitions. Default is 'sum'
+            method_compartments (str or dict): Aggregation method for compartments, or a method per variable
+                (as in `pd.DataFrame.agg`). Default is 'last'
+            method_transitions (str or dict): Aggregation method for transitions, or a method per variable.
+                Default is 'sum'
             fill_method (str): Method to fill NaN values after resampling. Options are:
                 - 'ffill': Forward fill (use last valid observation)
                 - 'bfill': Backward fill (use next valid observation)
                 - 'interpolate': Linear interpolation between points
                 Default is 'ffill'.
+            bins (ResampleBins, optional): The bins of `freq` over the dates of the trajectory, if already
+                computed. Default is None.
+
+        Returns:
+            Trajectory: The resampled trajectory (self).
 
         Raises:
             ValueError: If fill_method is not one of ['ffill', 'bfill', 'interpolate']
         """
-        if fill_method not in ["ffill", "bfill", "interpolate"]:
-            raise ValueError(
-                "fill_method must be one of ['ffill', 'bfill', 'interpolate']"
-            )
-
-        # Resample compartments
-        df_comp = pd.DataFrame(self.compartments, index=self.dates)
-        df_comp_resampled = df_comp.resample(freq).agg(method_compartments)
-
-        # Resample transitions
-        df_trans = pd.DataFrame(self.transitions, index=self.dates)
-        df_trans_resampled = df_trans.resample(freq).agg(method_transitions)
-
-        # Handle NaN values
-        if fill_method == "interpolate":
-            df_comp_resampled = df_comp_resampled.interpolate(method="linear")
-            # Handle edge cases
-            df_comp_resampled = df_comp_resampled.ffill().bfill()
-            df_trans_resampled = df_trans_resampled.fillna(0)
-        else:
-            if fill_method == "ffill":
-                df_comp_resampled = df_comp_resampled.ffill()
-            else:
-                df_comp_resampled = df_comp_resampled.bfill()
-            df_trans_resampled = df_trans_resampled.fillna(0)
+        if fill_method not in FILL_METHODS:
+            raise ValueError(f"fill_method must be one of {FILL_METHODS}")
+        if bins is None:
+            bins = ResampleBins.from_dates(self.dates, freq)
 
-        # Update
-        self.compartments = {k: np.array(v) for k, v in df_comp_resampled.items()}
-        self.transitions = {k: np.array(v) for k, v in df_trans_resampled.items()}
-        self.dates = df_comp_resampled.index.tolist()
+        self.compartments = _resample_variables(
+            self.compartments,
+            self.dates,
+            freq,
+            bins,
+            method_compartments,
+            fill_method,
+        )
+        # Transitions of empty bins are zero
+        self.transitions = _resample_variables(
+            self.transitions, self.dates, freq, bins, method_transitions, None
+        )
+        self.dates = bins.dates
+        return self
@@ -1,10 +1,151 @@
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import warnings
+from collections.abc import Mapping
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 
 import numpy as np
 import pandas as pd
 
-from .simulation_output import Trajectory
+from .simulation_output import (
+    FILL_METHODS,
+    LINEAR_RESAMPLE_METHODS,
+    NamedArrayView,
+    ResampleBins,
+    SelectedOutputView,
+    Trajectory,
+    resample_array,
+)
+
+# Number of values (trajectories x time steps) loaded at once when computing quantiles
+QUANTILE_CHUNK_SIZE = 2**22
+
+# The array-backed output attributes of a trajectory
+ATTRIBUTES = ("compartments", "transitions")
+
+
+def _shared_base(arrays: List[np.ndarray]) -> Optional[np.ndarray]:
+    """
+    Returns the base array of which `arrays` are the consecutive sub-arrays (as the trajectories
+    of a batch simulation are), or None.
+    """
+    first = arrays[0]
+    base = first.base
+    if (
+        isinstance(base, np.ndarray)
+        and base.shape == (len(arrays),) + first.shape
+        and base.dtype == first.dtype
+        and all(a.base is base and a.strides == base.strides[1:] for a in arrays)
+    ):
+        start = base.__array_interface__["data"][0]
+        if all(
+            a.__array_interface__["data"][0] == start + b * base.strides[0]
+            for b, a in enumerate(arrays)
+        ):
+            return base
+    return None
+
+
+def _stack_arrays(arrays: List[np.ndarray]) -> np.ndarray:
+    """
+    Stacks arrays of the same shape along a new first axis.
+
+    If the arrays are the consecutive sub-arrays of a single base array, the base array is
+    returned without copying.
+    """
+    base = _shared_base(arrays)
+    return np.stack(arrays, axis=0) if base is None else base
+
+
+def _backing_view(
+    trajectory: Trajectory, attribute: str
+) -> Optional[Union[NamedArrayView, SelectedOutputView]]:
+    """The array-backed view of the trajectory's `attribute`, or None if it is a plain dictionary."""
+    view = getattr(trajectory, attribute)
+    return view if isinstance(view, (NamedArrayView, SelectedOutputView)) else None
+
+
+def collect_trajectories(
+    chunks: Iterable[List[Trajectory]], Nsim: int
+) -> List[Trajectory]:
+    """
+    Gathers chunks of trajectories into contiguous `(Nsim, timesteps, ...)` arrays.
+
+    The arrays are allocated when the first chunk arrives, and each array-backed trajectory is
+    copied into its row and then backed by a view of it, so the per-trajectory arrays of a
+    chunk are released once it is copied and stacking the ensemble costs nothing. A single chunk
+    whose trajectories already are consecutive rows of one array (as with the "batch" engine)
+    is kept without copying. From the first trajectory whose views differ in type, layout,
+    shape or dtype, trajectories are kept as they are.
+
+    Args:
+        chunks (Iterable[List[Trajectory]]): The trajectories, in chunks
+        Nsim (int): The total number of trajectories
+
+    Returns:
+        List[Trajectory]: The trajectories.
+    """
+    trajectories = []
+    arrays = None
+    consolidate = True
+    for chunk in chunks:
+        start = len(trajectories)
+        trajectories.extend(chunk)
+        if not consolidate or not chunk:
+            continue
+        first = {name: _backing_view(chunk[0], name) for name in ATTRIBUTES}
+        if arrays is None:
+            if any(view is None for view in first.values()):
+                consolidate = False
+                continue
+            if len(chunk) == Nsim and all(
+                _shared_base([getattr(t, name).array for t in chunk]) is not None
+                for name in ATTRIBUTES
+            ):
+                # Already rows of one array
+                consolidate = False
+                continue
+            arrays = {
+                name: np.empty((Nsim,) + view.array.shape, dtype=view.array.dtype)
+                for name, view in first.items()
+            }
+            layouts = first
+        for b, trajectory in enumerate(chunk, start=start):
+            views = {name: _backing_view(trajectory, name) for name in ATTRIBUTES}
+            if b >= Nsim or any(
+                view is None
+                or type(view) is not type(layouts[name])
+                or view.layout != layouts[name].layout
+                or view.array.shape != arrays[name].shape[1:]
+                or view.array.dtype != arrays[name].dtype
+                for name, view in views.items()
+            ):
+                consolidate = False
+                break
+            for name, view in views.items():
+                arrays[name][b] = view.array
+                setattr(trajectory, name, view.like(arrays[name][b]))
+    return trajectories
+
+
+class _StackedVariables(Mapping):
+    """Read-only mapping over a subset of the keys of a stacked view."""
+
+    def __init__(
+        self, view: Union[NamedArrayView, SelectedOutputView], keys: List[str]
+    ) -> None:
+        self.view = view
+        self.keys_list = [key for key in keys if key in view]
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        if key not in self.keys_list:
+            raise KeyError(key)
+        return self.view[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys_list)
+
+    def __len__(self) -> int:
+        return len(self.keys_list)
 
 
 @dataclass
@@ -12,6 +153,12 @@ class SimulationResults:
     """
     Class to store and manage multiple simulation results.
 
+    When all trajectories are array-backed (as produced by the simulation engines), stacking
+    works on the whole `(Nsim, timesteps, C, N)` and `(Nsim, timesteps, K, N)` arrays at once.
+    The trajectories returned by `EpiModel.run_simulations` are rows of these contiguous arrays
+    (see `collect_trajectories`), so they are not copied and the stacked variables are views
+    into them. Otherwise, they are stacked on each call, and the copy is not kept.
+
     Attributes:
         trajectories (List[Trajectory]): List of simulation trajectories
         parameters (Dict[str, Any]): Dictionary of parameters used in the simulations
@@ -20,6 +167,24 @@ class SimulationResults:
     trajectories: List[Trajectory]
     parameters: Dict[str, Any]
 
+    @classmethod
+    def load(cls, path: str) -> "SimulationResults":
+        """
+        Loads results written to disk by `EpiModel.run_simulations(sink=path)`.
+
+        The trajectories are views into the memory-mapped arrays of the store, read lazily.
+
+        Args:
+            path: The store directory
+
+        Returns:
+            SimulationResults: The stored results (with empty parameters).
+        """
+        # Imported here to avoid a circular import with ensemble_store.py
+        from .ensemble_store import EnsembleStore
+
+        return EnsembleStore.open(path).to_results()
+
     @property
     def Nsim(self) -> int:
         """Number of simulations."""
@@ -35,6 +200,59 @@ class SimulationResults:
         """Compartment indices."""
         return self.trajectories[0].compartment_idx if self.trajectories else {}
 
+    def _stacked_view(
+        self, attribute: str
+    ) -> Optional[Union[NamedArrayView, SelectedOutputView]]:
+        """
+        Returns a view over the stacked arrays of the trajectories' `attribute` ("compartments"
+        or "transitions"), or None if some trajectory is not array-backed.
+        """
+        views = [getattr(t, attribute) for t in self.trajectories]
+        first = views[0]
+        if not isinstance(first, (NamedArrayView, SelectedOutputView)) or any(
+            type(v) is not type(first)
+            or v.layout != first.layout
+            or v.array.shape != first.array.shape
+            for v in views
+        ):
+            return None
+
+        return first.like(_stack_arrays([v.array for v in views]))
+
+    def _get_stacked(
+        self, attribute: str, variables: Optional[List[str]]
+    ) -> Dict[str, np.ndarray]:
+        """Stacks the variables of the trajectories' `attribute` into arrays of shape (Nsim, timesteps)."""
+        if not self.trajectories:
+            return {}
+
+        view = self._stacked_view(attribute)
+        if view is not None:
+            keys = variables if variables else view.keys()
+            return {name: view[name] for name in keys if name in view}
+
+        first = getattr(self.trajectories[0], attribute)
+        keys = variables if variables else first.keys()
+        return {
+            name: np.stack(
+                [getattr(t, attribute)[name] for t in self.trajectories], axis=0
+            )
+            for name in keys
+            if name in first
+        }
+
+    def _stacked_variables(
+        self, attribute: str, variables: Optional[List[str]]
+    ) -> Mapping[str, np.ndarray]:
+        """
+        Like `_get_stacked`, but array-backed variables are only computed when accessed, so totals
+        of memory-mapped ensembles are summed one variable at a time.
+        """
+        view = self._stacked_view(attribute) if self.trajectories else None
+        if view is None:
+            return self._get_stacked(attribute, variables)
+        return _StackedVariables(view, variables if variables else list(view))
+
     def get_stacked_compartments(
         self, variables: Optional[List[str]] = None
     ) -> Dict[str, np.ndarray]:
@@ -44,17 +262,7 @@ class SimulationResults:
         Args:
             variables: List of compartment names to include. If None, all compartments are included.
         """
-        if not self.trajectories:
-            return {}
-
-        keys = variables if variables else self.trajectories[0].compartments.keys()
-        return {
-            comp_name: np.stack(
-                [t.compartments[comp_name] for t in self.trajectories], axis=0
-            )
-            for comp_name in keys
-            if comp_name in self.trajectories[0].compartments
-        }
+        return self._get_stacked("compartments", variables)
 
     def get_stacked_transitions(
         self, variables: Optional[List[str]] = None
@@ -65,21 +273,11 @@ class SimulationResults:
         Args:
             variables: List of transition names to include. If None, all transitions are included.
         """
-        if not self.trajectories:
-            return {}
-
-        keys = variables if variables else self.trajectories[0].transitions.keys()
-        return {
-            trans_name: np.stack(
-                [t.transitions[trans_name] for t in self.trajectories], axis=0
-            )
-            for trans_name in keys
-            if trans_name in self.trajectories[0].transitions
-        }
+        return self._get_stacked("transitions", variables)
 
     def get_quantiles(
         self,
-        stacked: Dict[str, np.ndarray],
+        stacked: Mapping[str, np.ndarray],
         quantiles: Optional[List[float]] = None,
         ignore_nan: bool = False,
     ) -> pd.DataFrame:
@@ -87,11 +285,14 @@ class SimulationResults:
         Compute quantiles across all trajectories.
 
         Args:
-            stacked: Dictionary of stacked trajectory arrays
+            stacked: Dictionary (or mapping) of stacked trajectory arrays of shape (Nsim, timesteps)
             quantiles: List of quantile values to compute. If None, defaults to [0.025, 0.05, 0.25, 0.5, 0.75, 0.95, 0.975]
             ignore_nan: If True, use np.nanquantile to ignore NaN values. Defaults to False.
                 When enabled, a warning is issued if any time point has >50% NaN values,
                 as quantiles may be unreliable with small sample sizes.
+
+        Variables stored with a 32-bit dtype (int32 or float32) are summarized in float32, others in float64.
+        Quantiles are computed over chunks of time steps, one variable at a time.
         """
         if quantiles is None:
             quantiles = [0.025, 0.05, 0.25, 0.5, 0.75, 0.95, 0.975]
@@ -109,25 +310,33 @@ class SimulationResults:
         # Add data
         quantile_func = np.nanquantile if ignore_nan else np.quantile
 
-        # Check for high NaN proportions when ignore_nan is enabled
-        if ignore_nan:
-            import warnings
-
-            for comp_name, comp_data in stacked.items():
-                nan_prop = np.isnan(comp_data).mean(axis=0)
-                max_nan_prop = np.max(nan_prop)
-                if max_nan_prop > 0.5:
-                    warnings.warn(
-                        f"Variable '{comp_name}' has time points with up to {max_nan_prop:.1%} NaN values. "
-                        f"Quantiles at these time points may be unreliable due to small sample size."
+        for comp_name in stacked:
+            values = stacked[comp_name]
+            # Compact (32-bit) outputs are summarized in float32
+            dtype = np.float32 if values.dtype.itemsize <= 4 else np.float64
+            n_steps = values.shape[1]
+            comp_quantiles = np.empty((len(quantiles), n_steps), dtype=dtype)
+            max_nan_prop = 0.0
+
+            # Work on chunks of time steps, so memory-mapped ensembles are never fully loaded
+            step = max(1, QUANTILE_CHUNK_SIZE // max(1, values.shape[0]))
+            for start in range(0, n_steps, step):
+                chunk = np.asarray(values[:, start : start + step], dtype=dtype)
+                if ignore_nan:
+                    # Check for high NaN proportions when ignore_nan is enabled
+                    max_nan_prop = max(
+                        max_nan_prop, float(np.max(np.isnan(chunk).mean(axis=0)))
                     )
+                comp_quantiles[:, start : start + step] = quantile_func(
+                    chunk, quantiles, axis=0
+                )
 
-        for comp_name, comp_data in stacked.items():
-            comp_quantiles = []
-            for q in quantiles:
-                quant_values = quantile_func(comp_data, q, axis=0)
-                comp_quantiles.extend(quant_values)
-            data[comp_name] = comp_quantiles
+            if max_nan_prop > 0.5:
+                warnings.warn(
+                    f"Variable '{comp_name}' has time points with up to {max_nan_prop:.1%} NaN values. "
+                    f"Quantiles at these time points may be unreliable due to small sample size."
+                )
+            data[comp_name] = comp_quantiles.ravel()
 
         return pd.DataFrame(data)
 
@@ -147,7 +356,7 @@ class SimulationResults:
             ignore_nan: If True, use np.nanquantile to ignore NaN values. Defaults to False.
             variables: List of transition names to include. If None, all transitions are included.
         """
-        stacked = self.get_stacked_transitions(variables=variables)
+        stacked = self._stacked_variables("transitions", variables)
         return self.get_quantiles(stacked, quantiles, ignore_nan)
 
     def get_quantiles_compartments(
@@ -166,16 +375,66 @@ class SimulationResults:
             ignore_nan: If True, use np.nanquantile to ignore NaN values. Defaults to False.
             variables: List of compartment names to include. If None, all compartments are included.
         """
-        stacked = self.get_stacked_compartments(variables=variables)
+        stacked = self._stacked_variables("compartments", variables)
         return self.get_quantiles(stacked, quantiles, ignore_nan)
 
     def resample(
-        self, freq: str, method: str = "last", fill_method: str = "ffill"
+        self,
+        freq: str,
+        method: Union[str, Dict[str, str]] = "last",
+        fill_method: str = "ffill",
+        method_transitions: Union[str, Dict[str, str]] = "sum",
     ) -> "SimulationResults":
-        """Resample all trajectories to new frequency."""
-        return SimulationResults(
-            trajectories=[
-                t.resample(freq, method, fill_method) for t in self.trajectories
-            ],
-            parameters=self.parameters,
-        )
+        """
+        Resample all trajectories to new frequency.
+
+        The bins are computed once from the dates. When the trajectories are array-backed, aggregations
+        commuting with the sum over demographic groups are applied to the whole stacked ensemble at once.
+        The trajectories of these results are left unchanged.
+
+        Args:
+            freq (str): Frequency for resampling (e.g., 'D' for daily, 'W' for weekly)
+            method (str or dict): Aggregation method for compartments, or a method per variable. Default is 'last'
+            fill_method (str): Method to fill NaN values after resampling ('ffill', 'bfill' or 'interpolate').
+                Default is 'ffill'.
+            method_transitions (str or dict): Aggregation method for transitions, or a method per variable.
+                Default is 'sum'
+
+        Returns:
+            SimulationResults: The resampled results.
+
+        Raises:
+            ValueError: If fill_method is not one of ['ffill', 'bfill', 'interpolate']
+        """
+        if fill_method not in FILL_METHODS:
+            raise ValueError(f"fill_method must be one of {FILL_METHODS}")
+        if not self.trajectories:
+            return SimulationResults(trajectories=[], parameters=self.parameters)
+
+        bins = ResampleBins.from_dates(self.dates, freq)
+        trajectories = [replace(t) for t in self.trajectories]
+        views = {
+            "compartments": (self._stacked_view("compartments"), method, fill_method),
+            "transitions": (
+                self._stacked_view("transitions"),
+                method_transitions,
+                None,
+            ),
+        }
+        if all(
+            view is not None and agg in LINEAR_RESAMPLE_METHODS
+            for view, agg, _ in views.values()
+        ):
+            # One reduction over the whole ensemble
+            for attribute, (view, agg, fill) in views.items():
+                resampled = resample_array(view.array, bins, agg, 1, fill)
+                for b, trajectory in enumerate(trajectories):
+                    setattr(trajectory, attribute, view.like(resampled[b]))
+            for trajectory in trajectories:
+                trajectory.dates = bins.dates
+        else:
+            for trajectory in trajectories:
+                trajectory.resample(
+                    freq, method, method_transitions, fill_method, bins=bins
+                )
+        return SimulationResults(trajectories=trajectories, parameters=self.parameters)
@@ -3,8 +3,13 @@
 from .abc_smc_utils import (
     DefaultPerturbationContinuous,
     DefaultPerturbationDiscrete,
+    MultivariateNormalPerturbation,
+    MultivariatePerturbation,
+    NearestNeighboursPerturbation,
+    OptimalLocalCovariancePerturbation,
     Perturbation,
     compute_effective_sample_size,
+    compute_smc_weights,
     sample_prior,
     weighted_quantile,
 )
@@ -26,6 +31,11 @@ __all__ = [
     "Perturbation",
     "DefaultPerturbationDiscrete",
     "DefaultPerturbationContinuous",
+    "MultivariatePerturbation",
+    "MultivariateNormalPerturbation",
+    "NearestNeighboursPerturbation",
+    "OptimalLocalCovariancePerturbation",
+    "compute_smc_weights",
     "combine_simulation_outputs",
     "get_initial_conditions_dict",
 ]
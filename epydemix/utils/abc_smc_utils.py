@@ -1,7 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Union
+from typing import Any, Dict, List, Optional, Union
 
 import numpy as np
+from scipy.spatial import cKDTree
+from scipy.special import logsumexp
+
+# Rows of the (new, previous) kernel matrix computed at once by `compute_smc_weights`
+WEIGHTS_BLOCK_SIZE = 1024
 
 
 def fast_normal_pdf(x, mean, std):
@@ -28,6 +33,14 @@ class Perturbation(ABC):
         """Evaluate the PDF of the kernel."""
         pass
 
+    def logpdf(self, x, center):
+        """Evaluate the log-PDF of the kernel elementwise over broadcast arrays of values and centers.
+
+        The default implementation calls ``pdf`` for every pair; kernels override it with a vectorized version.
+        """
+        with np.errstate(divide="ignore"):
+            return np.log(np.vectorize(self.pdf, otypes=[float])(x, center))
+
     @abstractmethod
     def update(self, particles, weights, param_names):
         """Update the kernel parameters based on particles and weights."""
@@ -52,6 +65,11 @@ class DefaultPerturbationContinuous(Perturbation):
         """Evaluate the PDF of the kernel."""
         return fast_normal_pdf(x, center, self.std)
 
+    def logpdf(self, x, center):
+        """Evaluate the log-PDF of the kernel elementwise."""
+        z = (np.asarray(x, dtype=float) - center) / self.std
+        return -0.5 * z * z - np.log(np.sqrt(2 * np.pi) * self.std)
+
     def update(self, particles, weights, param_names):
         """Update the standard deviation based on previous generation variance."""
         index = param_names.index(self.param_name)
@@ -86,11 +104,231 @@ class DefaultPerturbationDiscrete(Perturbation):
             return self.rest_prob
         return 0
 
+    def logpdf(self, x, center):
+        """Log transition probability for the discrete parameter, elementwise."""
+        x, center = np.broadcast_arrays(x, center)
+        with np.errstate(divide="ignore"):
+            return np.where(
+                x == center,
+                np.log(1 - self.jump_probability),
+                np.where(np.isin(x, self.support), np.log(self.rest_prob), -np.inf),
+            )
+
     def update(self, particles, weights, param_names):
         """Update jump_probability or other characteristics if needed."""
         pass
 
 
+class MultivariatePerturbation(ABC):
+    """
+    Base class of perturbation kernels moving several continuous parameters jointly.
+
+    A multivariate kernel is registered under each of its parameters in the perturbations of
+    `ABCSampler.run_smc`. Its values are arrays over `param_names`, and it can depend on the
+    previous particle being perturbed, given by its `index` among the particles of the last `update`.
+    """
+
+    def __init__(self, param_names):
+        self.param_names = list(param_names)
+
+    @abstractmethod
+    def propose(self, x, rng=None, index=None):
+        """Propose new values of the parameters from the current values ``x`` of the particle ``index``."""
+        pass
+
+    @abstractmethod
+    def logpdf(self, x, center, index=None):
+        """Evaluate the log-PDF of the kernel over broadcast arrays of values and centers (last axis: parameters).
+
+        ``index`` holds the indices of the centers among the particles of the last `update`.
+        """
+        pass
+
+    @abstractmethod
+    def update(self, particles, weights, param_names, distances=None, epsilon=None):
+        """Update the kernel from the particles, weights and distances of the previous generation.
+
+        ``epsilon`` is the tolerance of the next generation.
+        """
+        pass
+
+    def pdf(self, x, center, index=None):
+        """Evaluate the PDF of the kernel."""
+        return np.exp(self.logpdf(x, center, index))
+
+
+def _cholesky(covariances):
+    """Cholesky factors of one or a stack of covariance matrices, with a small ridge if they are singular."""
+    try:
+        return np.linalg.cholesky(covariances)
+    except np.linalg.LinAlgError:
+        d = covariances.shape[-1]
+        variance = np.trace(covariances, axis1=-2, axis2=-1)[..., None, None] / d
+        ridge = 1e-10 * np.where(variance > 0, variance, 1e-2)
+        return np.linalg.cholesky(covariances + ridge * np.eye(d))
+
+
+class MultivariateNormalPerturbation(MultivariatePerturbation):
+    """
+    Multivariate normal perturbation kernel with twice the weighted covariance of the previous particles.
+
+    Unlike the component-wise kernels, it follows the correlations of the posterior
+    (Filippi et al. (2013)). Subclasses set a covariance per particle (local kernels).
+    """
+
+    def __init__(self, param_names, scale=2.0):
+        super().__init__(param_names)
+        self.scale = scale
+        self.set_covariances(np.eye(len(self.param_names)) * 0.01)
+
+    def set_covariances(self, covariances):
+        """Set the covariance matrix, or the stack of covariance matrices of every particle."""
+        self.covariances = np.asarray(covariances, dtype=float)
+        cholesky = _cholesky(self.covariances)
+        self._inverse_cholesky = np.linalg.inv(cholesky)
+        self._cholesky = cholesky
+        self._log_norm = np.sum(
+            np.log(np.diagonal(cholesky, axis1=-2, axis2=-1)), axis=-1
+        ) + 0.5 * len(self.param_names) * np.log(2 * np.pi)
+
+    def _covariances(self, values, weights, distances, epsilon):
+        """Covariance of the kernel, from the `(n, d)` values of the previous particles."""
+        mean = weights @ values
+        centered = values - mean
+        return self.scale * (centered.T * weights) @ centered
+
+    def update(self, particles, weights, param_names, distances=None, epsilon=None):
+        """Update the covariance based on the previous generation."""
+        indices = [param_names.index(name) for name in self.param_names]
+        values = np.asarray(particles, dtype=float)[:, indices]
+        weights = np.asarray(weights, dtype=float) / np.sum(weights)
+        self.set_covariances(self._covariances(values, weights, distances, epsilon))
+
+    def _local(self, index):
+        if self.covariances.ndim == 2:
+            return self._cholesky, self._inverse_cholesky, self._log_norm
+        if index is None:
+            raise ValueError(
+                f"{type(self).__name__} needs the index of the perturbed particle"
+            )
+        return (
+            self._cholesky[index],
+            self._inverse_cholesky[index],
+            self._log_norm[index],
+        )
+
+    def propose(self, x, rng=None, index=None):
+        """Propose new values based on the current values."""
+        rng = np.random.default_rng(rng)
+        cholesky, _, _ = self._local(index)
+        return np.asarray(x, dtype=float) + cholesky @ rng.standard_normal(
+            len(self.param_names)
+        )
+
+    def logpdf(self, x, center, index=None):
+        """Evaluate the log-PDF of the kernel, vectorized over pairs of values and centers."""
+        _, inverse_cholesky, log_norm = self._local(index)
+        diff = np.asarray(x, dtype=float) - center
+        z = np.einsum("...ij,...j->...i", inverse_cholesky, diff)
+        return -0.5 * np.sum(z * z, axis=-1) - log_norm
+
+
+class NearestNeighboursPerturbation(MultivariateNormalPerturbation):
+    """
+    Multivariate normal kernel with the covariance of the M nearest neighbours of each particle.
+
+    Local covariances adapt the kernel to curved or multimodal posteriors (Filippi et al. (2013)).
+    Neighbours are found with a KD-tree, over parameters scaled by their standard deviation.
+    """
+
+    def __init__(self, param_names, n_neighbours=None, scale=1.0):
+        super().__init__(param_names, scale=scale)
+        self.n_neighbours = n_neighbours
+
+    def _covariances(self, values, weights, distances, epsilon):
+        n, d = values.shape
+        if self.n_neighbours is None:
+            n_neighbours = max(d + 1, n // 4)
+        else:
+            n_neighbours = self.n_neighbours
+        n_neighbours = min(n_neighbours, n)
+        spread = np.std(values, axis=0)
+        spread[spread == 0] = 1.0
+        _, neighbours = cKDTree(values / spread).query(values / spread, k=n_neighbours)
+        neighbour_values = values[neighbours.reshape(n, -1)]
+        centered = neighbour_values - neighbour_values.mean(axis=1, keepdims=True)
+        return (
+            self.scale
+            * np.einsum("nmi,nmj->nij", centered, centered)
+            / max(n_neighbours - 1, 1)
+        )
+
+
+class OptimalLocalCovariancePerturbation(MultivariateNormalPerturbation):
+    """
+    Multivariate normal kernel with the optimal local covariance matrix (OLCM) of each particle.
+
+    The covariance around particle ``j`` is ``sum_k w_k (x_k - x_j)(x_k - x_j)^T`` over the previous
+    particles ``k`` already within the next tolerance ``epsilon``, with normalized weights
+    (Filippi et al. (2013)). If none is, all previous particles are used.
+    """
+
+    def __init__(self, param_names):
+        super().__init__(param_names, scale=1.0)
+
+    def _covariances(self, values, weights, distances, epsilon):
+        selected = np.ones(len(values), dtype=bool)
+        if distances is not None and epsilon is not None:
+            within = np.asarray(distances) <= epsilon
+            if within.any():
+                selected = within
+        subset_weights = weights[selected] / np.sum(weights[selected])
+        mean = subset_weights @ values[selected]
+        centered = values[selected] - mean
+        covariance = (centered.T * subset_weights) @ centered
+        offsets = mean - values
+        return covariance + offsets[:, :, None] * offsets[:, None, :]
+
+
+PERTURBATION_KERNELS = {
+    "mvn": MultivariateNormalPerturbation,
+    "nearest_neighbours": NearestNeighboursPerturbation,
+    "olcm": OptimalLocalCovariancePerturbation,
+}
+
+
+def perturbation_groups(perturbations, param_names):
+    """Groups the parameters by perturbation kernel.
+
+    Args:
+        perturbations: Dictionary mapping each parameter name to its kernel. A `MultivariatePerturbation`
+            appears under each of its parameters.
+        param_names: The parameter names, in the order of the particle columns
+
+    Returns:
+        list: ``(kernel, indices)`` pairs, with the column indices of the parameters of each kernel.
+    """
+    groups, seen = [], set()
+    for i, name in enumerate(param_names):
+        kernel = perturbations[name]
+        if isinstance(kernel, MultivariatePerturbation):
+            if id(kernel) not in seen:
+                seen.add(id(kernel))
+                groups.append(
+                    (kernel, [param_names.index(param) for param in kernel.param_names])
+                )
+        else:
+            groups.append((kernel, [i]))
+    return groups
+
+
+def _log_kernel(kernel, indices, x, center, index):
+    """Log-density of a kernel of `perturbation_groups` over broadcast particles (last axis: parameters)."""
+    if isinstance(kernel, MultivariatePerturbation):
+        return kernel.logpdf(x[..., indices], center[..., indices], index)
+    return kernel.logpdf(x[..., indices[0]], center[..., indices[0]])
+
+
 def sample_prior(priors, param_names, rng=None):
     """Samples a parameter set from the given prior distributions.
     priors: dictionary mapping parameter names to scipy.stats distributions
@@ -102,6 +340,112 @@ def sample_prior(priors, param_names, rng=None):
     return [priors[param].rvs(random_state=rng) for param in param_names]
 
 
+def compute_smc_weights(
+    new_particles: np.ndarray,
+    particles: np.ndarray,
+    weights: np.ndarray,
+    priors: Dict[str, Any],
+    perturbations: Dict[str, Perturbation],
+    param_names: List[str],
+    truncation: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Computes the normalized importance weights of a new ABC-SMC generation.
+
+    The weight of a new particle is its prior density divided by the mixture of perturbation
+    kernels centred on the previous particles, ``sum_j w_j K(x | x_j)``. The kernel log-densities
+    of every (new, previous) pair are computed at once as a ``(n_new, n_previous)`` matrix, and the
+    mixture is reduced with ``logsumexp``, so the weights do not underflow.
+
+    With ``truncation``, the mixture of each new particle only sums the previous particles whose
+    kernel is at least ``exp(-truncation**2 / 2)`` times the one of its nearest previous particle,
+    found with a KD-tree over the parameters whose component-wise kernel has a ``std`` (such as
+    `DefaultPerturbationContinuous`), scaled by that ``std``. This approximation pays off with many
+    particles and kernels narrow compared with the spread of the particles; ``truncation=5`` keeps
+    the relative error of the weights small for most purposes. Without kernels having a ``std``,
+    the exact sum is computed.
+
+    Args:
+        new_particles (np.ndarray): The new particles, of shape ``(n_new, n_params)``.
+        particles (np.ndarray): The previous particles, of shape ``(n_previous, n_params)``.
+        weights (np.ndarray): The weights of the previous particles.
+        priors (Dict[str, Any]): The priors, as scipy.stats distributions.
+        perturbations (Dict[str, Perturbation]): The perturbation kernel of each parameter (see `perturbation_groups`).
+        param_names (List[str]): The parameter names, in the order of the particle columns.
+        truncation (float, optional): Truncation radius of the kernel, in kernel standard deviations.
+            Default is None (exact).
+
+    Returns:
+        np.ndarray: The normalized weights of the new particles.
+    """
+    new_particles = np.asarray(new_particles, dtype=float)
+    particles = np.asarray(particles, dtype=float)
+    with np.errstate(divide="ignore"):
+        log_weights = np.log(np.asarray(weights, dtype=float) / np.sum(weights))
+
+    log_prior = np.zeros(len(new_particles))
+    for i, param in enumerate(param_names):
+        prior = priors[param]
+        logpdf = prior.logpdf if hasattr(prior, "logpdf") else prior.logpmf
+        log_prior += logpdf(new_particles[:, i])
+
+    log_mixture = np.full(len(new_particles), -np.inf)
+    exact = np.ones(len(new_particles), dtype=bool)
+    groups = perturbation_groups(perturbations, param_names)
+    scaled = [
+        indices[0]
+        for kernel, indices in groups
+        if not isinstance(kernel, MultivariatePerturbation)
+        and getattr(kernel, "std", None)
+    ]
+    if truncation is not None and scaled:
+        scales = np.array([perturbations[param_names[i]].std for i in scaled])
+        points = new_particles[:, scaled] / scales
+        tree = cKDTree(particles[:, scaled] / scales)
+        # Radius around each new particle beyond which kernels are below exp(-truncation**2 / 2)
+        # times the kernel of its nearest previous particle
+        nearest, _ = tree.query(points)
+        neighbours = tree.query_ball_point(
+            points, np.sqrt(nearest**2 + truncation**2), return_sorted=False
+        )
+        rows = np.repeat(
+            np.arange(len(new_particles)), [len(cols) for cols in neighbours]
+        )
+        cols = np.concatenate(neighbours).astype(int)
+        log_terms = log_weights[cols] + sum(
+            _log_kernel(kernel, indices, new_particles[rows], particles[cols], cols)
+            for kernel, indices in groups
+        )
+        row_max = np.full(len(new_particles), -np.inf)
+        np.maximum.at(row_max, rows, log_terms)
+        sums = np.zeros(len(new_particles))
+        with np.errstate(invalid="ignore"):
+            np.add.at(sums, rows, np.exp(log_terms - row_max[rows]))
+        # Rows whose neighbours all have a zero kernel (e.g. another discrete value) are summed exactly
+        exact = ~np.isfinite(row_max)
+        log_mixture[~exact] = row_max[~exact] + np.log(sums[~exact])
+
+    # Exact mixture, by blocks of rows to bound the size of the kernel matrix
+    exact_rows = np.flatnonzero(exact)
+    for start in range(0, len(exact_rows), WEIGHTS_BLOCK_SIZE):
+        block = exact_rows[start : start + WEIGHTS_BLOCK_SIZE]
+        log_kernels = log_weights[None, :] + sum(
+            _log_kernel(
+                kernel,
+                indices,
+                new_particles[block, None, :],
+                particles[None, :, :],
+                np.arange(len(particles))[None, :],
+            )
+            for kernel, indices in groups
+        )
+        log_mixture[block] = logsumexp(log_kernels, axis=1)
+
+    log_new_weights = log_prior - log_mixture
+    new_weights = np.exp(log_new_weights - np.max(log_new_weights))
+    return new_weights / new_weights.sum()
+
+
 def compute_effective_sample_size(weights: np.ndarray) -> float:
     """
     Computes the effective sample size (ESS) of a set of weights.
@@ -0,0 +1,96 @@
+import ast
+from dataclasses import dataclass
+from functools import lru_cache
+from types import CodeType
+from typing import Any, Mapping, Tuple
+
+from evalidate import EvalModel, ExecutionException, Expr, base_eval_model
+
+# Whitelist of the syntax nodes allowed in parameter expressions: the evalidate base
+# model (comparisons, arithmetic, boolean logic, subscripts) plus multiplication and power
+EXPRESSION_MODEL = EvalModel(nodes=base_eval_model.nodes + ["Mult", "Pow"])
+
+# Number of compiled expressions kept in the LRU cache
+EXPRESSION_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    """
+    A validated parameter expression compiled to Python bytecode.
+
+    Calling the object evaluates the expression over the named parameters of an
+    environment. Operands are used as given, so passing whole `(T, N)` parameter arrays
+    evaluates the expression for every time step and group in one vectorized call.
+
+    Attributes:
+        expr (str): The expression text.
+        names (tuple): The parameter names the expression refers to.
+        code (CodeType): The compiled bytecode of the expression.
+    """
+
+    expr: str
+    names: Tuple[str, ...]
+    code: CodeType
+
+    def __call__(self, env: Mapping[str, Any]) -> Any:
+        """
+        Evaluates the expression.
+
+        Args:
+            env (Mapping): The environment containing the parameter values. It is not modified.
+
+        Returns:
+            Any: The result of the expression.
+
+        Raises:
+            ExecutionException: If a referenced parameter is missing from `env` or the
+                evaluation fails.
+        """
+        try:
+            namespace = {name: env[name] for name in self.names}
+            return eval(self.code, {"__builtins__": {}}, namespace)
+        except Exception as e:
+            raise ExecutionException(e) from e
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(expr: str) -> CompiledExpression:
+    """
+    Validates and compiles a parameter expression.
+
+    Only the operations whitelisted in `EXPRESSION_MODEL` are allowed. Compiled
+    expressions are cached by their text, so parsing and validation run once per
+    distinct expression.
+
+    Args:
+        expr (str): The expression to compile (e.g. "transmission_rate * (1 - vaccine_efficacy)").
+
+    Returns:
+        CompiledExpression: The compiled expression.
+
+    Raises:
+        CompilationException: If the expression is not valid Python syntax.
+        ValidationException: If the expression uses an operation that is not whitelisted.
+    """
+    validated = Expr(expr, model=EXPRESSION_MODEL)
+    names = tuple(
+        dict.fromkeys(
+            node.id for node in ast.walk(validated.node) if isinstance(node, ast.Name)
+        )
+    )
+    return CompiledExpression(expr=expr, names=names, code=validated.code)
+
+
+def validate_expression(expr: str) -> None:
+    """
+    Checks that an expression can be compiled, without evaluating it.
+
+    Args:
+        expr (str): The expression to validate.
+
+    Raises:
+        CompilationException: If the expression is not valid Python syntax.
+        ValidationException: If the expression uses an operation that is not whitelisted.
+    """
+    compile_expression(expr)
@@ -2,11 +2,14 @@ import datetime
 import random
 import string
 from collections.abc import Iterable
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Union
 
 import numpy as np
 import pandas as pd
-from evalidate import Expr, base_eval_model
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+from .expressions import compile_expression
 
 try:
     from numba import njit
@@ -80,25 +83,31 @@ def resize_parameter(value: Any, T: int, n_age: int) -> np.ndarray:
     """
     Resizes the input value to have the shape (T, n_age).
 
+    Scalars, 1D arrays and arrays with a first dimension of 1 are not tiled: the result is a
+    read-only broadcast view of the compact value, so a constant parameter takes the memory of
+    a single value whatever the simulation length. Full arrays are copied and made read-only.
+    Overrides are layered on top of the result by `apply_overrides` rather than written into it.
+
     Args:
         value (Union[np.ndarray, int, float]): The value to be resized, which can be a NumPy array or a scalar.
         T (int): The length of the first dimension.
         n_age (int): The length of the second dimension.
 
     Returns:
-        np.ndarray: A 2D array with shape (T, n_age).
+        np.ndarray: A read-only 2D array with shape (T, n_age).
     """
     if is_scalar(value):  # Scalar value
-        return np.full((T, n_age), value)
+        return np.broadcast_to(np.array(value), (T, n_age))
 
     value = np.array(value)
 
     if value.ndim == 1:  # 1D array
-        return np.tile(value, (n_age, 1)).T
+        return np.broadcast_to(value[:, None], (len(value), n_age))
 
     elif value.ndim == 2:  # 2D array
         if value.shape[0] == 1:  # If the first dimension is 1, repeat it to match T
-            return np.tile(value, (T, 1))
+            return np.broadcast_to(value, (T, value.shape[1]))
+        value.flags.writeable = False
         return value
 
 
@@ -114,7 +123,8 @@ def create_definitions(
         n_age (int): The length of the second dimension of the arrays to be created.
 
     Returns:
-        Dict[str, np.ndarray]: A dictionary where keys are the same as in `parameters` and values are 2D arrays of shape `(T, n_age)`.
+        Dict[str, np.ndarray]: A dictionary where keys are the same as in `parameters` and values are read-only 2D arrays
+            of shape `(T, n_age)` (see `resize_parameter`).
 
     Raises:
         ValueError: If any parameter value does not meet the required shape criteria.
@@ -180,6 +190,113 @@ def str_to_date(date_str: str) -> datetime.date:
     return datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
 
 
+@dataclass(eq=False)
+class PiecewiseParameter(NDArrayOperatorsMixin):
+    """
+    A parameter definition with date-range overrides layered on top of it.
+
+    The base definition (usually a read-only broadcast view, see `resize_parameter`) is
+    never copied: each override keeps its own `(steps, n_age)` value covering only the
+    steps it selects, and integer arrays map every step to the override in effect. Indexing
+    with a step returns the row of that step, as the simulation kernels do, while slicing,
+    arithmetic and `np.asarray` work on the dense `(T, n_age)` array built on demand.
+
+    Attributes:
+        base (np.ndarray): The `(T, n_age)` definition of the parameter.
+        pieces (list): The value of each override, one row per step it covers.
+        piece_index (np.ndarray): The override in effect at each step, -1 where the base applies.
+        piece_offset (np.ndarray): The row of that override holding each step.
+    """
+
+    base: np.ndarray
+    pieces: List[np.ndarray]
+    piece_index: np.ndarray
+    piece_offset: np.ndarray
+
+    @classmethod
+    def from_base(cls, base: Any) -> "PiecewiseParameter":
+        """
+        Creates a parameter without overrides.
+
+        Args:
+            base (np.ndarray or PiecewiseParameter): The `(T, n_age)` definition. A
+                `PiecewiseParameter` is copied, so overriding the result leaves it unchanged.
+
+        Returns:
+            PiecewiseParameter: A parameter equal to `base` at every step.
+        """
+        if isinstance(base, PiecewiseParameter):
+            return cls(
+                base=base.base,
+                pieces=list(base.pieces),
+                piece_index=base.piece_index.copy(),
+                piece_offset=base.piece_offset.copy(),
+            )
+        return cls(
+            base=base,
+            pieces=[],
+            piece_index=np.full(len(base), -1, dtype=np.int64),
+            piece_offset=np.zeros(len(base), dtype=np.int64),
+        )
+
+    @property
+    def shape(self) -> tuple:
+        return self.base.shape
+
+    @property
+    def ndim(self) -> int:
+        return self.base.ndim
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.base.dtype
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def override(self, mask: np.ndarray, value: np.ndarray) -> None:
+        """
+        Overrides the parameter at the steps selected by `mask`.
+
+        Values are cast to the dtype of the base definition, and steps selected by an
+        earlier override take the new value.
+
+        Args:
+            mask (np.ndarray): Boolean array selecting the overridden steps.
+            value (np.ndarray): The value at the selected steps, of shape `(mask.sum(), n_age)`.
+        """
+        steps = np.flatnonzero(mask)
+        self.pieces.append(np.asarray(value, dtype=self.dtype))
+        self.piece_index[steps] = len(self.pieces) - 1
+        self.piece_offset[steps] = np.arange(len(steps))
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        """
+        Returns the value at a step (int) without building the dense array, or indexes the dense array.
+        """
+        if isinstance(key, (int, np.integer)):
+            piece = self.piece_index[key]
+            if piece < 0:
+                return self.base[key]
+            return self.pieces[piece][self.piece_offset[key]]
+        return np.asarray(self)[key]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        dense = np.array(self.base)
+        for piece, value in enumerate(self.pieces):
+            steps = self.piece_index == piece
+            dense[steps] = value[self.piece_offset[steps]]
+        return dense if dtype is None else dense.astype(dtype, copy=False)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if any(isinstance(out, PiecewiseParameter) for out in kwargs.get("out", ())):
+            return NotImplemented
+        inputs = tuple(
+            np.asarray(x) if isinstance(x, PiecewiseParameter) else x for x in inputs
+        )
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+
 def apply_overrides(
     definitions: Dict[str, np.ndarray],
     overrides: Dict[str, List[Dict[str, Any]]],
@@ -200,6 +317,8 @@ def apply_overrides(
 
     Returns:
         dict: A dictionary with the same keys as `definitions`, but with values updated according to the overrides.
+            Overridden parameters are `PiecewiseParameter` objects storing only the overridden steps; the
+            others are shared with `definitions`, which is not modified.
 
     Raises:
         ValueError: If the `override` values do not match the expected shape for the specified date ranges.
@@ -208,30 +327,31 @@ def apply_overrides(
         return definitions
 
     result = definitions.copy()
+    dates_pd = pd.DatetimeIndex(dates)
 
     for name, overrides in overrides.items():
         if name not in definitions:
             continue
 
+        # The definition (possibly a read-only broadcast view) is left untouched: each
+        # override only stores its value over the steps it covers
+        result[name] = PiecewiseParameter.from_base(definitions[name])
+        n_age = definitions[name].shape[1]
+
         for override in overrides:
             start_date = pd.Timestamp(override["start_date"])
             end_date = pd.Timestamp(override["end_date"])
             override_value = override["value"]
 
-            # Convert dates to pandas timestamps for comparison
-            dates_pd = pd.DatetimeIndex(dates)
-
             # Validate override value
-            T = sum((dates_pd >= start_date) & (dates_pd <= end_date))
-            n_age = definitions[name].shape[1]
+            mask = (dates_pd >= start_date) & (dates_pd <= end_date)
+            T = int(mask.sum())
             validate_parameter_shape(name, override_value, T=T, n_age=n_age)
 
-            # Resize override value
-            override_array = resize_parameter(override_value, T=T, n_age=n_age)
-
-            # Apply override
-            mask = (dates_pd >= start_date) & (dates_pd <= end_date)
-            result[name][mask] = override_array
+            # Resize override value and apply it to the selected steps
+            result[name].override(
+                mask, resize_parameter(override_value, T=T, n_age=n_age)
+            )
 
     return result
 
@@ -270,9 +390,9 @@ def evaluate(expr: str, env: dict) -> any:
     """
     Evaluates the expression with the given environment, allowing only whitelisted operations.
 
-    This function extends the base evaluation model to whitelist the 'Mult' (multiplication)
-    and 'Pow' (power) operations, ensuring that only these operations are permitted during
-    the evaluation.
+    The expression is validated and compiled once by `compile_expression` (see
+    `epydemix.utils.expressions`) and the compiled form is cached, so repeated
+    evaluations of the same expression only execute it.
 
     Args:
         expr (str): The expression to evaluate. It is expected to be a string containing
@@ -288,9 +408,7 @@ def evaluate(expr: str, env: dict) -> any:
         EvalException: If there is an error in evaluating the expression, such as an invalid
                        operation or an undefined variable.
     """
-    eval_model = base_eval_model
-    eval_model.nodes.extend(["Mult", "Pow"])
-    return Expr(expr, model=eval_model).eval(env)
+    return compile_expression(expr)(env)
 
 
 def compute_simulation_dates(
@@ -499,6 +617,42 @@ def multinomial(
     return rng.multinomial(int(n), probs)
 
 
+def multinomial_probs(
+    rates: np.ndarray,
+    stay_idx: int,
+    dt: float,
+    apply_linear_approximation: bool = False,
+) -> np.ndarray:
+    """
+    Vectorized counterpart of `_multinomial_probs` over any number of leading axes.
+
+    Args:
+        rates (np.ndarray): Array of shape (..., C) with the rates towards each compartment.
+            The entry at `stay_idx` is ignored.
+        stay_idx (int): Index of the stay compartment.
+        dt (float or np.ndarray): Time step size, or step sizes broadcastable against `rates`
+            (e.g. one per trajectory, of shape (Nsim, 1, 1)).
+        apply_linear_approximation (bool): Whether to apply a linear approximation to the probabilities.
+
+    Returns:
+        np.ndarray: Array of shape (..., C) of probabilities, ready to pass to `Generator.multinomial`.
+    """
+    probs = rates * dt
+    probs[..., stay_idx] = 0.0
+    H = probs.sum(axis=-1)
+
+    if apply_linear_approximation:
+        probs[..., stay_idx] = 1.0 - H
+        return probs
+
+    p_leave = -np.expm1(-H)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(H > 0.0, p_leave / H, 0.0)
+    probs *= scale[..., None]
+    probs[..., stay_idx] = 1.0 - p_leave
+    return probs
+
+
 # Trigger JIT compilation at import time so the first simulation call
 # doesn't pay the compilation cost.
 _multinomial_probs(
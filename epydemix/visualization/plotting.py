@@ -760,7 +760,7 @@ def plot_spectral_radius(
     Raises:
         ValueError: If no contact matrices are defined or layer doesn't exist
     """
-    if len(epimodel.Cs) == 0:
+    if epimodel.Cs is None or len(epimodel.Cs) == 0:
         raise ValueError("No contact matrices defined over time")
 
     if layer not in epimodel.population.layers + ["overall"]:
@@ -773,8 +773,9 @@ def plot_spectral_radius(
         _, ax = plt.subplots(figsize=(10, 6), dpi=300)
 
     # Compute spectral radius
-    dates = list(epimodel.Cs.keys())
-    rho = [np.linalg.eigvals(epimodel.Cs[date][layer]).max().real for date in dates]
+    # Computed once per contact epoch and expanded to every date
+    dates = epimodel.Cs.dates
+    rho = epimodel.Cs.spectral_radius(layer)
 
     # Normalize and convert to percentage if requested
     if show_perc:
@@ -0,0 +1,25 @@
+import pytest
+
+from epydemix import EpiModel
+
+
+@pytest.fixture
+def sir_model():
+    model = EpiModel(
+        compartments=["S", "I", "R"],
+        parameters={"transmission_rate": 0.3, "recovery_rate": 0.1},
+    )
+    model.add_transition("S", "I", kind="mediated", params=("transmission_rate", "I"))
+    model.add_transition("I", "R", kind="spontaneous", params="recovery_rate")
+    return model
+
+
+@pytest.fixture
+def sir_simulation_kwargs():
+    """Simulation arguments of `sir_model`, without the number of simulations"""
+    return dict(
+        start_date="2023-01-01",
+        end_date="2023-03-31",
+        initial_conditions_dict={"S": [99900], "I": [100], "R": [0]},
+        rng=7,
+    )
@@ -2,6 +2,7 @@ import matplotlib
 import pytest
 
 matplotlib.use("Agg")  # Use non-GUI backend before importing pyplot
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 import numpy as np
@@ -327,3 +328,259 @@ def test_abc_smc_verbose_reports_later_gen_interruption(basic_abc_sampler, capsy
 
     captured = capsys.readouterr()
     assert "keeping last complete generation" in captured.out
+
+
+@pytest.mark.parametrize("strategy", ["smc", "rejection", "top_fraction"])
+def test_abc_executor_is_reproducible(strategy):
+    """Batched calibration with an executor does not depend on the executor or the batch size"""
+
+    def noisy_simulation(params):
+        t = np.arange(10)
+        noise = params["rng"].normal(size=10)
+        return {"data": 100 * np.exp(-params["beta"] * params["gamma"] * t) + noise}
+
+    kwargs = {
+        "smc": dict(num_particles=10, num_generations=3),
+        "rejection": dict(epsilon=40.0, num_particles=10),
+        "top_fraction": dict(top_fraction=0.2, Nsim=25),
+    }[strategy]
+    posteriors = []
+    for max_workers, batch_size in [(1, 1), (4, 7), (2, None)]:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            sampler = ABCSampler(
+                simulation_function=noisy_simulation,
+                priors={
+                    "beta": stats.uniform(0.1, 0.5),
+                    "gamma": stats.uniform(0.05, 0.2),
+                },
+                parameters={},
+                observed_data=np.array([90, 82, 75, 68, 62, 57, 52, 48, 44, 40]),
+                rng=42,
+                executor=executor,
+                batch_size=batch_size,
+            )
+            results = sampler.calibrate(strategy=strategy, verbose=False, **kwargs)
+        posteriors.append(results.get_posterior_distribution())
+
+    for posterior in posteriors[1:]:
+        np.testing.assert_array_equal(posterior.values, posteriors[0].values)
+
+    with pytest.raises(ValueError, match="batch_size"):
+        ABCSampler(noisy_simulation, {}, {}, None, batch_size=0)
+
+
+@pytest.mark.parametrize("strategy", ["smc", "rejection"])
+def test_abc_executor_respects_budget(strategy, capsys):
+    """Batches never exceed the simulation budget, and every started simulation is counted"""
+    calls = []
+
+    def counted_simulation(params):
+        calls.append(1)
+        t = np.arange(10)
+        return {"data": 100 * np.exp(-params["beta"] * params["gamma"] * t)}
+
+    kwargs = {
+        "smc": dict(num_particles=10, num_generations=10, epsilon_quantile_level=0.2),
+        "rejection": dict(epsilon=0.1, num_particles=1000),
+    }[strategy]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        sampler = ABCSampler(
+            simulation_function=counted_simulation,
+            priors={"beta": stats.uniform(0.1, 0.5), "gamma": stats.uniform(0.05, 0.2)},
+            parameters={},
+            observed_data=np.array([90, 82, 75, 68, 62, 57, 52, 48, 44, 40]),
+            rng=0,
+            executor=executor,
+            batch_size=16,
+        )
+        sampler.calibrate(strategy=strategy, total_simulations_budget=60, **kwargs)
+    assert len(calls) <= 60
+
+    # Every simulation that ran is reported, including the batch still in flight
+    output = capsys.readouterr().out
+    if strategy == "rejection":
+        assert f"from {len(calls)} simulations" in output
+    else:
+        reported = [
+            int(line.split("/")[1].split()[0])
+            for line in output.splitlines()
+            if "Accepted " in line
+        ]
+        assert 0 < reported[-1] <= len(calls)
+
+
+@pytest.mark.parametrize("kernel", ["mvn", "nearest_neighbours", "olcm"])
+def test_abc_smc_multivariate_kernels(basic_abc_sampler, kernel):
+    """SMC runs with the multivariate perturbation kernels"""
+    results = basic_abc_sampler.calibrate(
+        strategy="smc",
+        num_particles=20,
+        num_generations=3,
+        perturbations=kernel,
+        verbose=False,
+    )
+    final_posterior = results.get_posterior_distribution()
+    assert len(final_posterior) == 20
+    assert np.all((0.1 <= final_posterior["beta"]) & (final_posterior["beta"] <= 0.6))
+    assert results.get_weights().sum() == pytest.approx(1.0)
+
+
+def test_abc_smc_invalid_kernel(basic_abc_sampler):
+    """Unknown kernel names are rejected"""
+    with pytest.raises(ValueError, match="Unknown perturbation kernel"):
+        basic_abc_sampler.calibrate(strategy="smc", perturbations="gaussian")
+
+
+def test_abc_early_abort():
+    """Aborting simulations above the tolerance does not change the calibration"""
+    model = create_sir(transmission_rate=0.3, recovery_rate=0.1)
+    population = Population()
+    population.add_population([10000])
+    population.add_contact_matrix(np.array([[1.0]]))
+    model.set_population(population)
+    parameters = dict(
+        epimodel=model,
+        start_date="2023-01-01",
+        end_date="2023-03-31",
+        initial_conditions_dict={
+            "Susceptible": np.array([9900]),
+            "Infected": np.array([100]),
+            "Recovered": np.array([0]),
+        },
+        resample_frequency="W",
+    )
+
+    def observation(trajectory):
+        return {"data": trajectory.transitions["Susceptible_to_Infected_total"]}
+
+    def simulate_wrapper(params):
+        return observation(simulate(**params))
+
+    observed = simulate_wrapper({**parameters, "rng": 0})["data"]
+    posteriors = []
+    for early_abort in (None, observation):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            sampler = ABCSampler(
+                simulation_function=simulate_wrapper,
+                priors={
+                    "transmission_rate": stats.uniform(0.1, 0.4),
+                    "recovery_rate": stats.uniform(0.05, 0.15),
+                },
+                parameters=parameters,
+                observed_data=observed,
+                rng=1,
+                executor=executor,
+                batch_size=8,
+                early_abort=early_abort,
+            )
+            results = sampler.calibrate(
+                strategy="smc", num_particles=10, num_generations=2, verbose=False
+            )
+        posteriors.append(results.get_posterior_distribution())
+    np.testing.assert_array_equal(posteriors[0].values, posteriors[1].values)
+
+    with pytest.raises(ValueError, match="partial distance"):
+        ABCSampler(
+            simulate_wrapper,
+            {},
+            {},
+            observed,
+            distance_function=lambda data, simulation: 0.0,
+            early_abort=observation,
+        )
+
+
+@pytest.mark.parametrize(
+    "store_trajectories, generations",
+    [("all", [0, 1, 2]), ("last_generation", [2]), ("none", [])],
+)
+def test_abc_store_trajectories(
+    mock_simulation_function, store_trajectories, generations
+):
+    """The policy selects the stored generations, without changing the calibration"""
+
+    def calibrate(**kwargs):
+        sampler = ABCSampler(
+            simulation_function=mock_simulation_function,
+            priors={"beta": stats.uniform(0.1, 0.5), "gamma": stats.uniform(0.05, 0.2)},
+            parameters={},
+            observed_data=np.array([90, 82, 75, 68, 62, 57, 52, 48, 44, 40]),
+            rng=0,
+            **kwargs,
+        )
+        return sampler.calibrate(
+            strategy="smc", num_particles=10, num_generations=3, verbose=False
+        )
+
+    reference = calibrate()
+    results = calibrate(store_trajectories=store_trajectories)
+    assert list(results.selected_trajectories) == generations
+    for gen in generations:
+        trajectories = results.get_selected_trajectories(gen)
+        assert trajectories.arrays["data"].shape == (10, 10)
+        assert not trajectories.arrays["data"].flags.writeable
+        np.testing.assert_array_equal(
+            trajectories.arrays["data"],
+            reference.get_calibration_trajectories(gen)["data"],
+        )
+    np.testing.assert_array_equal(
+        results.get_posterior_distribution().values,
+        reference.get_posterior_distribution().values,
+    )
+
+    with pytest.raises(ValueError, match="Unknown store_trajectories"):
+        calibrate(store_trajectories="best")
+
+
+@pytest.mark.parametrize("strategy", ["smc", "rejection", "top_fraction"])
+def test_abc_trajectory_projection(basic_abc_sampler, strategy):
+    """Only the projection of the accepted simulations is stored, and copies share it"""
+    basic_abc_sampler.trajectory_projection = lambda simulation: {
+        "peak": simulation["data"].max(),
+        "last": simulation["data"][-3:],
+    }
+    kwargs = {
+        "smc": dict(num_particles=10, num_generations=2),
+        "rejection": dict(epsilon=100.0, num_particles=10),
+        "top_fraction": dict(top_fraction=0.5, Nsim=20),
+    }[strategy]
+    results = basic_abc_sampler.calibrate(strategy=strategy, verbose=False, **kwargs)
+
+    trajectories = results.get_selected_trajectories()
+    assert trajectories.keys() == ["peak", "last"]
+    assert len(trajectories) == len(results.get_posterior_distribution())
+    assert trajectories.arrays["last"].shape == (len(trajectories), 3)
+    assert trajectories[0]["peak"] == trajectories.arrays["peak"][0]
+    stacked = results.get_calibration_trajectories(variables=["last"])
+    assert stacked["last"] is trajectories.arrays["last"]
+    assert (
+        basic_abc_sampler.results.get_selected_trajectories().arrays
+        is trajectories.arrays
+    )
+
+
+def test_abc_stores_ragged_simulations():
+    """Simulated variables whose length varies between particles are stored per particle"""
+
+    def simulation_with_events(params):
+        data = 100 * np.exp(-params["beta"] * params["gamma"] * np.arange(10))
+        return {"data": data, "events": np.flatnonzero(data > 80)}
+
+    sampler = ABCSampler(
+        simulation_function=simulation_with_events,
+        priors={"beta": stats.uniform(0.1, 0.5), "gamma": stats.uniform(0.05, 0.2)},
+        parameters={},
+        observed_data=np.array([90, 82, 75, 68, 62, 57, 52, 48, 44, 40]),
+        rng=0,
+    )
+    results = sampler.calibrate(
+        strategy="smc", num_particles=20, num_generations=2, verbose=False
+    )
+    trajectories = results.get_selected_trajectories()
+    assert trajectories.arrays["data"].shape == (20, 10)
+    assert trajectories.arrays["events"].dtype == object
+    for particle in range(20):
+        simulated = trajectories[particle]
+        np.testing.assert_array_equal(
+            simulated["events"], np.flatnonzero(simulated["data"] > 80)
+        )
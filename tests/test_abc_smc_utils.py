@@ -9,6 +9,10 @@ from scipy import stats
 from epydemix.utils.abc_smc_utils import (
     DefaultPerturbationContinuous,
     DefaultPerturbationDiscrete,
+    MultivariateNormalPerturbation,
+    NearestNeighboursPerturbation,
+    OptimalLocalCovariancePerturbation,
+    compute_smc_weights,
     fast_normal_pdf,
     sample_prior,
 )
@@ -167,3 +171,156 @@ def test_sample_prior_respects_param_name_order():
     # Each value lands in its prior's range regardless of order.
     assert 0.1 <= forward[0] <= 0.6 and 0.05 <= forward[1] <= 0.25
     assert 0.05 <= reverse[0] <= 0.25 and 0.1 <= reverse[1] <= 0.6
+
+
+# --- compute_smc_weights ------------------------------------------------------
+
+
+def _smc_generation(n_previous, n_new, std=None):
+    rng = np.random.default_rng(0)
+    priors = {"beta": stats.norm(0, 1), "k": stats.randint(0, 5)}
+    perturbations = {
+        "beta": DefaultPerturbationContinuous("beta"),
+        "k": DefaultPerturbationDiscrete("k", priors["k"]),
+    }
+    if std is not None:
+        perturbations["beta"].std = std
+    particles = np.column_stack(
+        [rng.normal(size=n_previous), rng.integers(0, 5, n_previous)]
+    )
+    new_particles = np.column_stack([rng.normal(size=n_new), rng.integers(0, 5, n_new)])
+    weights = rng.random(n_previous)
+    return new_particles, particles, weights, priors, perturbations
+
+
+def test_kernel_logpdf_matches_pdf():
+    """The vectorized log-densities match the scalar ``pdf`` of each kernel."""
+    continuous = DefaultPerturbationContinuous("beta")
+    x, centers = np.array([0.1, 0.45, 0.9]), np.array([0.5, 0.2])
+    expected = np.log([[continuous.pdf(a, c) for c in centers] for a in x])
+    np.testing.assert_allclose(
+        continuous.logpdf(x[:, None], centers[None, :]), expected
+    )
+
+    discrete = _discrete_kernel()
+    x, centers = np.array([0, 2, 7]), np.array([2, 3])
+    with np.errstate(divide="ignore"):
+        expected = np.log([[discrete.pdf(a, c) for c in centers] for a in x])
+    np.testing.assert_allclose(discrete.logpdf(x[:, None], centers[None, :]), expected)
+
+
+def test_compute_smc_weights_matches_pairwise_sum():
+    """Bulk weights equal prior / sum_j w_j K(x | x_j), normalized."""
+    new_particles, particles, weights, priors, perturbations = _smc_generation(50, 20)
+    names = ["beta", "k"]
+    expected = np.array(
+        [
+            priors["beta"].pdf(x[0])
+            * priors["k"].pmf(x[1])
+            / sum(
+                w
+                * perturbations["beta"].pdf(x[0], p[0])
+                * perturbations["k"].pdf(x[1], p[1])
+                for w, p in zip(weights, particles)
+            )
+            for x in new_particles
+        ]
+    )
+    weights_new = compute_smc_weights(
+        new_particles, particles, weights, priors, perturbations, names
+    )
+    assert weights_new == pytest.approx(expected / expected.sum())
+
+
+def test_compute_smc_weights_truncation_is_close_to_exact():
+    """The KD-tree truncated mixture approximates the exact weights."""
+    generation = _smc_generation(2000, 500, std=0.05)
+    exact = compute_smc_weights(*generation, ["beta", "k"])
+    truncated = compute_smc_weights(*generation, ["beta", "k"], truncation=5)
+    assert truncated == pytest.approx(exact, rel=1e-3)
+
+
+# --- Multivariate kernels ----------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "kernel_class",
+    [
+        MultivariateNormalPerturbation,
+        NearestNeighboursPerturbation,
+        OptimalLocalCovariancePerturbation,
+    ],
+)
+def test_multivariate_logpdf_matches_scipy(kernel_class):
+    """The vectorized log-density is the normal density with the covariance of each center."""
+    rng = np.random.default_rng(0)
+    particles = rng.multivariate_normal([0, 0], [[1, 0.9], [0.9, 1]], size=100)
+    kernel = kernel_class(["a", "b"])
+    kernel.update(
+        particles, rng.random(100), ["a", "b"], distances=rng.random(100), epsilon=0.5
+    )
+
+    x = rng.normal(size=(6, 2))
+    logpdf = kernel.logpdf(x[:, None, :], particles[None, :, :], np.arange(100)[None])
+    for j in (0, 42, 99):
+        cov = (
+            kernel.covariances
+            if kernel.covariances.ndim == 2
+            else kernel.covariances[j]
+        )
+        expected = stats.multivariate_normal(particles[j], cov).logpdf(x)
+        np.testing.assert_allclose(logpdf[:, j], expected)
+
+    proposal = kernel.propose(particles[3], np.random.default_rng(1), index=3)
+    assert proposal.shape == (2,)
+
+
+def test_mvn_covariance_is_weighted_and_correlated():
+    """The global kernel uses twice the weighted covariance of the particles."""
+    particles = np.array([[0.0, 0.0], [1.0, 1.0], [2.0, 2.0], [10.0, -10.0]])
+    weights = np.array([1.0, 1.0, 1.0, 0.0])
+    kernel = MultivariateNormalPerturbation(["a", "b"])
+    kernel.update(particles, weights, ["a", "b"])
+    np.testing.assert_allclose(kernel.covariances, 2 * np.full((2, 2), 2 / 3))
+
+
+def test_olcm_covariance():
+    """OLCM covariance of particle j is sum_k w_k (x_k - x_j)(x_k - x_j)^T over particles within epsilon."""
+    rng = np.random.default_rng(0)
+    particles, weights = rng.normal(size=(20, 2)), rng.random(20)
+    distances = rng.random(20)
+    kernel = OptimalLocalCovariancePerturbation(["a", "b"])
+    kernel.update(particles, weights, ["a", "b"], distances=distances, epsilon=0.5)
+
+    within = distances <= 0.5
+    w = weights[within] / weights[within].sum()
+    for j in (0, 5):
+        offsets = particles[within] - particles[j]
+        np.testing.assert_allclose(kernel.covariances[j], (offsets.T * w) @ offsets)
+
+
+def test_compute_smc_weights_with_multivariate_kernel():
+    """Bulk weights with a local multivariate kernel match the pairwise sum."""
+    rng = np.random.default_rng(0)
+    priors = {"a": stats.norm(0, 1), "b": stats.norm(0, 2)}
+    particles, weights = rng.normal(size=(40, 2)), rng.random(40)
+    new_particles = rng.normal(size=(10, 2))
+    kernel = NearestNeighboursPerturbation(["a", "b"], n_neighbours=10)
+    kernel.update(particles, weights, ["a", "b"])
+    perturbations = {"a": kernel, "b": kernel}
+
+    expected = np.array(
+        [
+            priors["a"].pdf(x[0])
+            * priors["b"].pdf(x[1])
+            / sum(
+                w * kernel.pdf(x, p, j)
+                for j, (w, p) in enumerate(zip(weights, particles))
+            )
+            for x in new_particles
+        ]
+    )
+    result = compute_smc_weights(
+        new_particles, particles, weights, priors, perturbations, ["a", "b"]
+    )
+    assert result == pytest.approx(expected / expected.sum())
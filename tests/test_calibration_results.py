@@ -4,7 +4,10 @@ import warnings
 import numpy as np
 import pytest
 
-from epydemix.calibration.calibration_results import CalibrationResults
+from epydemix.calibration.calibration_results import (
+    CalibrationResults,
+    ParticleTrajectories,
+)
 
 
 @pytest.fixture
@@ -430,3 +433,55 @@ def test_calibration_quantiles_skips_non_numeric_with_ignore_nan(mock_data_with_
     assert "S" in quantiles_df.columns
     assert "I" in quantiles_df.columns
     assert "dates" not in quantiles_df.columns
+
+
+def test_particle_trajectories():
+    """Simulations are written into preallocated arrays and read back as dictionaries."""
+    trajectories = ParticleTrajectories(4)
+    for i in range(3):
+        trajectories.append({"I": np.arange(5) * i, "peak": 4 * i})
+    # Later floats upcast the integer arrays
+    trajectories.append({"I": np.full(5, 0.5), "peak": 2})
+    with pytest.raises(IndexError):
+        trajectories.append({"I": np.zeros(5), "peak": 0})
+    trajectories.finalize()
+
+    assert len(trajectories) == 4
+    assert trajectories.arrays["I"].dtype == np.float64
+    np.testing.assert_array_equal(trajectories[2]["I"], np.arange(5) * 2)
+    assert trajectories[-1]["peak"] == 2
+    selected = trajectories[np.array([True, False, True, False])]
+    np.testing.assert_array_equal(selected.arrays["peak"], [0, 8])
+
+    results = CalibrationResults(selected_trajectories={0: trajectories})
+    stacked = results.get_calibration_trajectories()
+    assert stacked["I"].shape == (4, 5)
+    assert not stacked["I"].flags.writeable
+
+    partial = ParticleTrajectories(3)
+    partial.append({"I": np.zeros(5)})
+    with pytest.raises(ValueError, match="same keys"):
+        partial.append({"R": np.zeros(5)})
+    assert len(partial.finalize()) == 1
+
+
+def test_particle_trajectories_ragged_and_upcast():
+    """Ragged variables are kept per particle, and dtypes are widened without losing values."""
+    trajectories = ParticleTrajectories(3)
+    trajectories.append({"I": np.ones(4, dtype=np.float32), "events": np.arange(2)})
+    trajectories.append({"I": np.full(4, 1e-50), "events": np.arange(5)})
+    trajectories.append({"I": np.zeros(4), "events": np.arange(1)})
+    trajectories.finalize()
+
+    assert trajectories.arrays["I"].dtype == np.float64
+    assert trajectories[1]["I"][0] == 1e-50
+    events = trajectories.arrays["events"]
+    assert events.shape == (3,) and events.dtype == object
+    assert [len(e) for e in events] == [2, 5, 1]
+    np.testing.assert_array_equal(trajectories[1]["events"], np.arange(5))
+    assert [len(e) for e in trajectories[1:].arrays["events"]] == [5, 1]
+
+    # Ragged variables are left out of the quantiles
+    results = CalibrationResults(selected_trajectories={0: trajectories})
+    quantiles = results.get_calibration_quantiles(quantiles=[0.5])
+    assert "I" in quantiles.columns and "events" not in quantiles.columns
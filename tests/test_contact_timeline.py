@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from epydemix.model import EpiModel
+from epydemix.model.contact_timeline import ContactTimeline
+from epydemix.population import Population
+from epydemix.utils import compute_simulation_dates
+
+
+@pytest.fixture
+def layered_model():
+    population = Population()
+    population.add_population([1000, 2000])
+    population.add_contact_matrix(np.array([[1.0, 2.0], [3.0, 4.0]]), "home")
+    population.add_contact_matrix(np.array([[2.0, 1.0], [1.0, 2.0]]), "work")
+    model = EpiModel(compartments=["S", "I"])
+    model.set_population(population)
+    model.add_intervention("work", "2024-01-05", "2024-01-10", reduction_factor=0.5)
+    model.add_intervention(
+        "home", "2024-01-08", "2024-01-12", new_matrix=np.zeros((2, 2))
+    )
+    return model
+
+
+def _expected_matrices(model, date):
+    """Per-date reference: apply every active intervention to a copy of the layers"""
+    matrices = {k: np.copy(m) for k, m in model.population.contact_matrices.items()}
+    for intervention in model.interventions:
+        if intervention["start_date"] <= date <= intervention["end_date"]:
+            if intervention["reduction_factor"] is not None:
+                matrices[intervention["layer"]] *= intervention["reduction_factor"]
+            else:
+                matrices[intervention["layer"]] = intervention["new_matrix"]
+    matrices["overall"] = np.sum(np.array(list(matrices.values())), axis=0)
+    return matrices
+
+
+def test_contact_reductions_epochs(layered_model):
+    simulation_dates = compute_simulation_dates("2024-01-01", "2024-01-20", dt=0.25)
+    layered_model.compute_contact_reductions(simulation_dates)
+    timeline = layered_model.Cs
+
+    assert isinstance(timeline, ContactTimeline)
+    assert len(timeline) == len(simulation_dates)
+    # before / work only / work + home / home only / after (same as before)
+    assert timeline.n_epochs == 4
+    assert np.all(np.diff(np.unique(timeline.epoch_index, return_index=True)[1]) > 0)
+
+    for t, date in enumerate(pd.DatetimeIndex(simulation_dates)):
+        expected = _expected_matrices(layered_model, date)
+        for layer, matrix in expected.items():
+            assert np.array_equal(timeline[t][layer], matrix)
+            assert np.array_equal(timeline[date][layer], matrix)
+
+    # The population's matrices are not modified
+    assert np.array_equal(
+        layered_model.population.contact_matrices["work"],
+        np.array([[2.0, 1.0], [1.0, 2.0]]),
+    )
+
+
+def test_spectral_radius_per_step(layered_model):
+    simulation_dates = compute_simulation_dates("2024-01-01", "2024-01-20")
+    layered_model.compute_contact_reductions(simulation_dates)
+    rho = layered_model.Cs.spectral_radius("overall")
+    expected = [
+        np.linalg.eigvals(layered_model.Cs[t]["overall"]).max().real
+        for t in range(len(simulation_dates))
+    ]
+    assert np.allclose(rho, expected)
+
+
+def test_split_copies_shared_epochs():
+    dates = compute_simulation_dates("2024-01-01", "2024-01-05")
+    timeline = ContactTimeline.constant({"all": np.ones((2, 2))}, dates)
+    mask = np.array([False, True, True, False, False])
+
+    selected = timeline.split(mask)
+    assert selected == [1]
+    assert timeline.epoch_index.tolist() == [0, 1, 1, 0, 0]
+
+    timeline.epochs[1]["all"] *= 2
+    assert np.all(timeline[0]["all"] == 1)
+    assert np.all(timeline[2]["all"] == 2)
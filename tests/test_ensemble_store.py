@@ -0,0 +1,80 @@
+import numpy as np
+
+import epydemix.model.epimodel as epimodel_module
+from epydemix.model.ensemble_store import EnsembleStore
+from epydemix.model.simulation_results import SimulationResults
+
+
+def assert_same_results(results, reference):
+    for stacked, expected in (
+        (results.get_stacked_compartments(), reference.get_stacked_compartments()),
+        (results.get_stacked_transitions(), reference.get_stacked_transitions()),
+    ):
+        assert list(stacked) == list(expected)
+        for key, value in stacked.items():
+            np.testing.assert_array_equal(value, expected[key])
+    assert [t.metadata for t in results.trajectories] == [
+        t.metadata for t in reference.trajectories
+    ]
+
+
+def test_run_simulations_sink(sir_model, tmp_path, sir_simulation_kwargs):
+    """Trajectories written to a sink match the in-memory results and can be reloaded"""
+    reference = sir_model.run_simulations(Nsim=5, **sir_simulation_kwargs)
+    path = str(tmp_path / "ensemble")
+    results = sir_model.run_simulations(sink=path, Nsim=5, **sir_simulation_kwargs)
+
+    assert isinstance(results.trajectories[0].compartments.array, np.memmap)
+    assert_same_results(results, reference)
+    assert_same_results(SimulationResults.load(path), reference)
+    assert results.get_quantiles_compartments().equals(
+        reference.get_quantiles_compartments()
+    )
+
+    store = EnsembleStore.open(path)
+    assert store.Nsim == 5
+    assert store.compartments.shape == (5, len(reference.dates), 3, 1)
+
+
+def test_run_simulations_sink_batch_chunks(
+    sir_model, tmp_path, monkeypatch, sir_simulation_kwargs
+):
+    """The batch engine writes its trajectories chunk by chunk"""
+    monkeypatch.setattr(epimodel_module, "SINK_BATCH_SIZE", 2)
+    path = str(tmp_path / "ensemble")
+    results = sir_model.run_simulations(
+        engine="batch", sink=path, Nsim=5, **sir_simulation_kwargs
+    )
+    assert_same_results(SimulationResults.load(path), results)
+
+    infected = results.get_stacked_compartments()["I_total"]
+    assert infected.shape[0] == 5
+    # Every chunk is a new draw
+    assert len({tuple(row) for row in infected}) == 5
+
+
+def test_run_simulations_sink_selected_outputs(
+    sir_model, tmp_path, sir_simulation_kwargs
+):
+    """Selected outputs are stored column-wise"""
+    reference = sir_model.run_simulations(
+        outputs=["I_total"], Nsim=5, **sir_simulation_kwargs
+    )
+    path = str(tmp_path / "ensemble")
+    sir_model.run_simulations(
+        outputs=["I_total"], sink=path, Nsim=5, **sir_simulation_kwargs
+    )
+    results = SimulationResults.load(path)
+    assert EnsembleStore.open(path).compartments.shape == (5, len(reference.dates), 1)
+    assert_same_results(results, reference)
+
+
+def test_get_quantiles_chunked(sir_model, monkeypatch, sir_simulation_kwargs):
+    """Quantiles computed over chunks of time steps match a single pass"""
+    results = sir_model.run_simulations(Nsim=5, **sir_simulation_kwargs)
+    expected = results.get_quantiles_compartments(quantiles=[0.1, 0.5, 0.9])
+    monkeypatch.setattr(
+        "epydemix.model.simulation_results.QUANTILE_CHUNK_SIZE", 3 * results.Nsim
+    )
+    chunked = results.get_quantiles_compartments(quantiles=[0.1, 0.5, 0.9])
+    assert chunked.equals(expected)
@@ -3,11 +3,25 @@ import pytest
 
 matplotlib.use("Agg")  # Use non-GUI backend before importing pyplot
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
-from epydemix.model.epimodel import EpiModel, stochastic_simulation
+import epydemix.model.epimodel as epimodel_module
+from epydemix.model.epimodel import (
+    EpiModel,
+    SimulationAborted,
+    adaptive_leap_sizes,
+    batch_stochastic_simulation,
+    deterministic_simulation,
+    resolve_output_dtype,
+    resolve_rate_parameters,
+    simulate,
+    spawn_seeds,
+    stochastic_simulation,
+)
 from epydemix.population import Population
-from epydemix.utils.utils import apply_initial_conditions
+from epydemix.utils.utils import _NUMBA_AVAILABLE, apply_initial_conditions
 
 # filepath: epydemix/tests/test_epimodel.py
 
@@ -92,6 +106,19 @@ def test_transition_management(basic_model):
     assert len(basic_model.transitions_list) == 0
 
 
+def test_add_transition_invalid_expression(mock_epimodel):
+    with pytest.raises(ValueError, match="Invalid rate expression"):
+        mock_epimodel.add_transition(
+            "Infected", "Recovered", "spontaneous", "recovery_rate.__class__"
+        )
+    with pytest.raises(ValueError, match="Invalid rate expression"):
+        mock_epimodel.add_transition(
+            "Susceptible", "Infected", "mediated", ("open('f')", "Infected")
+        )
+    # The model is left unchanged
+    assert len(mock_epimodel.transitions_list) == 2
+
+
 def test_parameter_management(basic_model):
     """Test parameter management"""
     # Test adding single parameter
@@ -298,3 +325,551 @@ def test_stochastic_simulation_duplicate_transition_pair_not_double_counted(
     susceptible_start = initial_conditions[susceptible_idx, :].sum()
     susceptible_end = compartments_evolution[-1, susceptible_idx].sum()
     assert np.isclose(susceptible_start - susceptible_end, total_inflow)
+
+
+def test_compile_plan_structure(duplicate_pair_epimodel):
+    """The compiled plan groups transitions by source and dedupes recorded (source, target) pairs"""
+    plan = duplicate_pair_epimodel.compile()
+    idx = duplicate_pair_epimodel.compartments_idx
+
+    assert plan.n_transitions == 3
+    assert plan.n_outputs == 2
+    assert plan.group_source.tolist() == [idx["Susceptible"], idx["Exposed"]]
+    assert plan.group_ptr.tolist() == [0, 2, 3]
+    assert plan.agent.tolist() == [idx["Infected"], idx["Asymptomatic"], -1]
+    assert plan.rate_params == (
+        "transmission_rate",
+        "transmission_rate_asym",
+        "progression_rate",
+    )
+    # Both Susceptible -> Exposed transitions are recorded once
+    assert plan.record_ptr.tolist() == [0, 1, 2]
+    assert plan.record_target.tolist() == [idx["Exposed"], idx["Infected"]]
+
+    # The plan is cached until the model is modified
+    assert duplicate_pair_epimodel.compile() is plan
+
+
+def test_compile_shares_mediating_agents():
+    """Mediated transitions driven by the same agent share one interaction slot"""
+    model = EpiModel(
+        compartments=["S", "V", "I", "R"],
+        parameters={"beta": 0.3, "mu": 0.1, "ve": 0.8},
+    )
+    model.add_transition("S", "I", "mediated", ("beta", "I"))
+    model.add_transition("V", "I", "mediated", ("beta * (1 - ve)", "I"))
+    model.add_transition("S", "R", "mediated", ("beta", "R"))
+    model.add_transition("I", "R", "spontaneous", "mu")
+    idx = model.compartments_idx
+
+    plan = model.compile()
+    assert plan.mediating_agents.tolist() == [idx["I"], idx["R"]]
+    # Transitions are ordered by source: S -> I, S -> R, V -> I, I -> R
+    assert plan.agent_slot.tolist() == [0, 1, 0, -1]
+
+
+def test_compile_invalidated_on_model_changes(mock_epimodel):
+    """add_transition, add_compartments and register_transition_kind invalidate the plan"""
+    plan = mock_epimodel.compile()
+
+    mock_epimodel.add_compartments("Dead")
+    plan_compartments = mock_epimodel.compile()
+    assert plan_compartments is not plan
+    assert plan_compartments.n_compartments == 4
+
+    mock_epimodel.add_transition("Infected", "Dead", "spontaneous", "recovery_rate")
+    plan_transitions = mock_epimodel.compile()
+    assert plan_transitions is not plan_compartments
+    assert plan_transitions.n_transitions == 3
+
+    def custom_rate(params, data):
+        return params
+
+    mock_epimodel.register_transition_kind("spontaneous", custom_rate)
+    plan_kinds = mock_epimodel.compile()
+    assert plan_kinds is not plan_transitions
+    assert plan_kinds.has_custom_kinds
+
+
+def test_compile_unknown_kind_raises(mock_epimodel):
+    mock_epimodel.add_transition("Recovered", "Susceptible", "waning", "recovery_rate")
+    with pytest.raises(ValueError, match="waning"):
+        mock_epimodel.compile()
+
+
+def test_batch_stochastic_simulation(mock_epimodel):
+    """The batch kernel advances every trajectory and conserves population in each"""
+    T, Nsim = 10, 4
+    contact_matrices = [
+        {"overall": mock_epimodel.population.contact_matrices["all"]} for _ in range(T)
+    ]
+    initial_conditions = np.array([[990, 990, 990], [10, 10, 10], [0, 0, 0]])
+    parameters = {
+        "transmission_rate": np.full(T, 0.3),
+        "recovery_rate": np.full(T, 0.1),
+    }
+
+    def _run(seed):
+        return batch_stochastic_simulation(
+            Nsim=Nsim,
+            T=T,
+            contact_matrices=contact_matrices,
+            epimodel=mock_epimodel,
+            parameters=parameters,
+            initial_conditions=initial_conditions,
+            dt=1.0,
+            rng=np.random.default_rng(seed),
+        )
+
+    compartments_evolution, transitions_evolution = _run(0)
+    assert compartments_evolution.shape == (Nsim, T, 3, 3)
+    assert transitions_evolution.shape == (Nsim, T, 2, 3)
+    assert np.all(compartments_evolution.sum(axis=2) == initial_conditions.sum(axis=0))
+    assert np.all(transitions_evolution >= 0)
+    # Trajectories are independent draws
+    assert np.unique(compartments_evolution[:, -1], axis=0).shape[0] > 1
+
+    compartments_again, transitions_again = _run(0)
+    assert np.array_equal(compartments_evolution, compartments_again)
+    assert np.array_equal(transitions_evolution, transitions_again)
+
+
+def test_run_simulations_batch_engine(mock_epimodel):
+    results = mock_epimodel.run_simulations(
+        start_date="2023-01-01",
+        end_date="2023-01-31",
+        Nsim=6,
+        engine="batch",
+        rng=1,
+    )
+    assert results.Nsim == 6
+    stacked = results.get_stacked_compartments(["Infected_total"])["Infected_total"]
+    assert stacked.shape == (6, 31)
+
+    with pytest.raises(ValueError, match="engine"):
+        mock_epimodel.run_simulations(Nsim=1, engine="unknown")
+
+
+def test_expression_rates_resolved_once(mock_epimodel, monkeypatch):
+    """Expression rates are evaluated once per simulation and match explicit parameters"""
+    import epydemix.model.epimodel as epimodel_module
+
+    T = 10
+    parameters = {
+        "transmission_rate": np.full((T, 3), 0.3),
+        "recovery_rate": np.full((T, 3), 0.1),
+    }
+    resolved = resolve_rate_parameters(
+        ("recovery_rate", "2 * recovery_rate", 0.5), parameters
+    )
+    assert resolved[0] is parameters["recovery_rate"]
+    assert np.allclose(resolved[1], 0.2) and resolved[1].shape == (T, 3)
+    assert resolved[2] == 0.5
+
+    expr_model = EpiModel(
+        compartments=["Susceptible", "Infected", "Recovered"],
+        parameters={"transmission_rate": 0.3, "recovery_rate": 0.1, "r": 0.5},
+    )
+    expr_model.add_transition(
+        "Susceptible", "Infected", "mediated", ("2 * r * transmission_rate", "Infected")
+    )
+    expr_model.add_transition("Infected", "Recovered", "spontaneous", "recovery_rate")
+    expr_model.set_population(mock_epimodel.population)
+
+    calls = []
+    evaluate = epimodel_module.evaluate
+    monkeypatch.setattr(
+        epimodel_module,
+        "evaluate",
+        lambda expr, env: calls.append(expr) or evaluate(expr=expr, env=env),
+    )
+    kwargs = dict(
+        start_date="2023-01-01",
+        end_date="2023-01-31",
+        initial_conditions_dict={
+            "Susceptible": [990, 990, 990],
+            "Infected": [10, 10, 10],
+            "Recovered": [0, 0, 0],
+        },
+        Nsim=1,
+        rng=3,
+    )
+    from_expression = expr_model.run_simulations(**kwargs)
+    assert calls == ["2 * r * transmission_rate"]
+
+    from_parameter = mock_epimodel.run_simulations(**kwargs)
+    assert np.array_equal(
+        from_expression.get_stacked_compartments()["Infected_total"],
+        from_parameter.get_stacked_compartments()["Infected_total"],
+    )
+
+
+def test_deterministic_simulation_expected_flows(mock_epimodel):
+    """The deterministic engine advances the expected flows of each step"""
+    T = 20
+    contact_matrices = [
+        {"overall": mock_epimodel.population.contact_matrices["all"]} for _ in range(T)
+    ]
+    initial_conditions = np.array([[0, 0, 0], [1000, 500, 10], [0, 0, 0]])
+    compartments_evolution, transitions_evolution = deterministic_simulation(
+        T=T,
+        contact_matrices=contact_matrices,
+        epimodel=mock_epimodel,
+        parameters={
+            "transmission_rate": np.full(T, 0.3),
+            "recovery_rate": np.full(T, 0.1),
+        },
+        initial_conditions=initial_conditions,
+        dt=1.0,
+    )
+    # Without susceptibles, infected decay exponentially
+    decay = np.exp(-0.1) ** np.arange(1, T + 1)
+    assert np.allclose(compartments_evolution[:, 1], decay[:, None] * [1000, 500, 10])
+    assert np.allclose(
+        transitions_evolution[:, 1],
+        -np.diff(compartments_evolution[:, 1], axis=0, prepend=[[1000, 500, 10]]),
+    )
+    assert np.allclose(compartments_evolution.sum(axis=1), [1000, 500, 10])
+
+
+def test_run_simulations_deterministic_engine(mock_epimodel):
+    kwargs = dict(
+        start_date="2023-01-01",
+        end_date="2023-03-31",
+        initial_conditions_dict={
+            "Susceptible": [990, 990, 990],
+            "Infected": [10, 10, 10],
+            "Recovered": [0, 0, 0],
+        },
+        Nsim=50,
+    )
+    results = mock_epimodel.run_simulations(engine="deterministic", **kwargs)
+    assert results.Nsim == 1
+    infected = results.get_stacked_compartments(["Infected_total"])["Infected_total"]
+    assert infected.shape == (1, 90)
+    assert not np.allclose(infected, np.round(infected))
+
+    # The deterministic run tracks the mean of the stochastic ensemble
+    stochastic = mock_epimodel.run_simulations(rng=0, **kwargs)
+    recovered = results.get_stacked_compartments()["Recovered_total"][0, -1]
+    mean_recovered = stochastic.get_stacked_compartments()["Recovered_total"][
+        :, -1
+    ].mean()
+    assert abs(recovered - mean_recovered) / mean_recovered < 0.1
+
+
+def test_adaptive_leap_sizes():
+    """A single decay reaction: tau bounds the mean and the spread of the change of each population"""
+    eps, r = 0.03, 0.5
+    x = np.array([[[0.0, 0.0], [10.0, 1000.0]]])  # (Nsim, C, N): compartments S, I
+    rates = np.zeros((1, 1, 2, 2))  # one group (I), rate towards S
+    rates[0, 0, :, 0] = r
+    tau = adaptive_leap_sizes(x, rates, np.array([1]), np.ones(2), eps)
+    # Both I (losing r * x) and S (gaining r * x) bound the leap
+    a = r * x[0, 1]
+    bound = np.maximum(eps * x[0], 1.0)
+    expected = np.minimum(bound / a, bound**2 / a).min()
+    assert tau.shape == (1,)
+    assert np.isclose(tau[0], expected)
+
+    # Without transitions the leap is unbounded
+    assert np.isinf(
+        adaptive_leap_sizes(x, np.zeros((1, 1, 2, 2)), np.array([1]), np.ones(2), eps)
+    ).all()
+
+
+def test_run_simulations_adaptive_tau_engine(mock_epimodel):
+    kwargs = dict(
+        start_date="2023-01-01",
+        end_date="2023-02-28",
+        initial_conditions_dict={
+            "Susceptible": [990, 990, 990],
+            "Infected": [10, 10, 10],
+            "Recovered": [0, 0, 0],
+        },
+        Nsim=3,
+        engine="adaptive_tau",
+        rng=5,
+    )
+    results = mock_epimodel.run_simulations(**kwargs)
+    compartments = results.get_stacked_compartments()
+    total = sum(compartments[f"{c}_total"] for c in mock_epimodel.compartments)
+    assert compartments["Infected_total"].shape == (3, 59)
+    assert np.all(total == 3000)
+    assert np.array_equal(
+        compartments["Recovered_total"], np.round(compartments["Recovered_total"])
+    )
+
+    again = mock_epimodel.run_simulations(**kwargs).get_stacked_compartments()
+    assert np.array_equal(compartments["Infected_total"], again["Infected_total"])
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"engine": "batch"}, {"n_jobs": 1}, {"resample_frequency": "W"}],
+)
+def test_run_simulations_stacked_view_shares_memory(mock_epimodel, options):
+    """The trajectories are rows of one contiguous array, so stacking them copies nothing"""
+    results = mock_epimodel.run_simulations(
+        start_date="2023-01-01", end_date="2023-02-28", Nsim=4, rng=2, **options
+    )
+    for attribute in ("compartments", "transitions"):
+        stacked = results._stacked_view(attribute).array
+        assert stacked.shape[0] == 4
+        for trajectory in results.trajectories:
+            assert np.shares_memory(stacked, getattr(trajectory, attribute).array)
+    key = f"Infected_{mock_epimodel.population.Nk_names[0]}"
+    infected = results.get_stacked_compartments([key])[key]
+    assert np.shares_memory(infected, results.trajectories[0].compartments.array)
+    np.testing.assert_array_equal(
+        infected[3], results.trajectories[3].compartments[key]
+    )
+
+
+def test_run_simulations_compiled_engine(mock_epimodel):
+    """The compiled kernel draws its multinomials like the stochastic engine"""
+    kwargs = dict(start_date="2023-01-01", end_date="2023-02-28", Nsim=3, rng=5)
+    results = mock_epimodel.run_simulations(engine="compiled", **kwargs)
+    reference = mock_epimodel.run_simulations(engine="stochastic", **kwargs)
+    compartments = results.get_stacked_compartments()
+    total = sum(compartments[f"{c}_total"] for c in mock_epimodel.compartments)
+    assert np.all(total == 3000)
+    again = mock_epimodel.run_simulations(engine="compiled", **kwargs)
+    np.testing.assert_array_equal(
+        compartments["Infected_total"],
+        again.get_stacked_compartments()["Infected_total"],
+    )
+    if not _NUMBA_AVAILABLE:
+        # The plain Python kernel uses the binomial draws of numpy
+        for key, value in compartments.items():
+            np.testing.assert_array_equal(
+                value, reference.get_stacked_compartments()[key]
+            )
+        assert [t.metadata for t in results.trajectories] == [
+            t.metadata for t in reference.trajectories
+        ]
+
+    mock_epimodel.register_transition_kind("spontaneous", lambda params, data: params)
+    with pytest.raises(RuntimeError, match="custom kinds"):
+        mock_epimodel.run_simulations(engine="compiled", **kwargs)
+
+
+def test_compiled_engine_compact_inputs(mock_epimodel):
+    """The compiled kernel reads contact epochs and distinct rate rows, and records selected outputs by block"""
+    mock_epimodel.add_intervention("all", "2023-01-20", "2023-02-10", 0.5)
+    mock_epimodel.override_parameter(
+        "2023-02-01", "2023-02-05", "transmission_rate", 0.2
+    )
+    simulation_dates, *_, inputs = epimodel_module._prepare_simulation(
+        mock_epimodel,
+        "2023-01-01",
+        "2023-02-28",
+        None,
+        0.01,
+        1.0,
+        None,
+        None,
+        {},
+        "compiled",
+    )
+    T = len(simulation_dates)
+    # The steps before and after the intervention share the unreduced matrix
+    assert inputs.contacts.shape == (2, 3, 3)
+    np.testing.assert_array_equal(np.bincount(inputs.epoch_index), [37, 22])
+    # One row per constant rate, and one more for the override
+    assert inputs.rate_rows.shape == (3, 3)
+    assert inputs.rate_index.shape == (2, T)
+    assert all(
+        not array.flags.writeable
+        for array in (inputs.contacts, inputs.rate_rows, inputs.rate_index)
+    )
+
+    kwargs = dict(
+        start_date="2023-01-01", end_date="2023-02-28", Nsim=2, rng=4, engine="compiled"
+    )
+    full = mock_epimodel.run_simulations(**kwargs).get_stacked_compartments()
+    selected = mock_epimodel.run_simulations(
+        outputs=["Infected_total"], **kwargs
+    ).get_stacked_compartments()
+    np.testing.assert_array_equal(selected["Infected_total"], full["Infected_total"])
+
+
+@pytest.mark.parametrize("outputs", [None, ["Infected_total"]])
+def test_simulate_stop_condition(mock_epimodel, outputs):
+    """The stop condition sees the trajectory simulated so far and can abort the simulation"""
+    kwargs = dict(
+        start_date="2023-01-01",
+        end_date="2023-01-30",
+        initial_conditions_dict={
+            "Susceptible": np.array([990, 1000, 1000]),
+            "Infected": np.array([10, 0, 0]),
+            "Recovered": np.array([0, 0, 0]),
+        },
+        rng=1,
+        outputs=outputs,
+    )
+    seen = []
+
+    def stop_condition(trajectory):
+        seen.append(len(trajectory.dates))
+        return len(trajectory.dates) >= 9
+
+    with pytest.raises(SimulationAborted) as aborted:
+        simulate(mock_epimodel, stop_condition=stop_condition, **kwargs)
+    assert seen == [3, 6, 9]
+    assert aborted.value.step == 8
+
+    # Checkpoints do not change the trajectory
+    trajectory = simulate(mock_epimodel, stop_condition=lambda t: False, **kwargs)
+    reference = simulate(mock_epimodel, **kwargs)
+    np.testing.assert_array_equal(
+        trajectory.compartments["Infected_total"],
+        reference.compartments["Infected_total"],
+    )
+
+    with pytest.raises(ValueError, match="not supported by the gillespie engine"):
+        simulate(mock_epimodel, engine="gillespie", stop_condition=stop_condition)
+
+
+def test_extinction_detection(mock_epimodel):
+    """Absorbing states are detected, fast-forwarded and reported in the metadata"""
+    plan = mock_epimodel.compile()
+    idx = mock_epimodel.compartments_idx
+    assert plan.extinction_compartments.tolist() == [idx["Infected"]]
+    states = np.zeros((2, 3, 3))
+    states[:, idx["Susceptible"]] = 100
+    states[1, idx["Infected"], 2] = 1
+    assert plan.is_absorbing(states).tolist() == [True, False]
+
+    results = mock_epimodel.run_simulations(
+        start_date="2023-01-01",
+        end_date="2023-06-30",
+        initial_conditions_dict={
+            "Susceptible": [999, 1000, 1000],
+            "Infected": [1, 0, 0],
+            "Recovered": [0, 0, 0],
+        },
+        Nsim=10,
+        rng=4,
+    )
+    infected = results.get_stacked_compartments()["Infected_total"]
+    new_infections = results.get_stacked_transitions()["Susceptible_to_Infected_total"]
+    for b, trajectory in enumerate(results.trajectories):
+        step = trajectory.metadata["extinction_step"]
+        if step is None:
+            assert infected[b, -1] > 0
+            continue
+        assert trajectory.metadata["extinction_date"] == trajectory.dates[step]
+        assert np.all(infected[b, step:] == 0)
+        assert step == 0 or infected[b, step - 1] > 0
+        assert np.all(new_infections[b, step + 1 :] == 0)
+    # With a single initial case, some runs die out early
+    steps = [tr.metadata["extinction_step"] for tr in results.trajectories]
+    assert any(step is not None for step in steps)
+
+
+@pytest.mark.parametrize("engine", ["stochastic", "batch", "gillespie"])
+def test_run_simulations_selected_outputs(mock_epimodel, engine):
+    """Selected outputs match the full output and keep the extinction metadata"""
+    kwargs = dict(
+        start_date="2023-01-01",
+        end_date="2023-03-31",
+        initial_conditions_dict={
+            "Susceptible": [999, 1000, 1000],
+            "Infected": [1, 0, 0],
+            "Recovered": [0, 0, 0],
+        },
+        Nsim=5,
+        rng=4,
+        engine=engine,
+    )
+    full = mock_epimodel.run_simulations(**kwargs)
+    selected = mock_epimodel.run_simulations(
+        outputs=["Infected", "Susceptible_to_Infected_total"], **kwargs
+    )
+
+    compartments = selected.get_stacked_compartments()
+    transitions = selected.get_stacked_transitions()
+    groups = mock_epimodel.population.Nk_names
+    assert list(compartments) == [f"Infected_{g}" for g in groups] + ["Infected_total"]
+    assert list(transitions) == ["Susceptible_to_Infected_total"]
+    expected = full.get_stacked_compartments()
+    for key, value in compartments.items():
+        np.testing.assert_array_equal(value, expected[key])
+    np.testing.assert_array_equal(
+        transitions["Susceptible_to_Infected_total"],
+        full.get_stacked_transitions()["Susceptible_to_Infected_total"],
+    )
+    assert [t.metadata for t in selected.trajectories] == [
+        t.metadata for t in full.trajectories
+    ]
+
+    with pytest.raises(ValueError, match="Unknown output variable"):
+        simulate(mock_epimodel, outputs=["Exposed_total"])
+
+
+def test_resolve_output_dtype():
+    """Compact dtypes are validated against the engine and the population size"""
+    assert resolve_output_dtype("int32", 1e6) == np.int32
+    assert resolve_output_dtype(np.float32, 1e6) == np.float32
+    assert resolve_output_dtype("int64", 1e10) == np.int64
+    with pytest.raises(ValueError, match="overflows"):
+        resolve_output_dtype("int32", 3e9)
+    with pytest.raises(ValueError, match="floating dtype"):
+        resolve_output_dtype("int32", 1e6, engine="deterministic")
+    with pytest.raises(ValueError, match="Unsupported dtype"):
+        resolve_output_dtype("int16", 1e3)
+    with pytest.warns(UserWarning, match="float32"):
+        resolve_output_dtype("float32", 1e8)
+
+
+@pytest.mark.parametrize("engine", ["stochastic", "batch"])
+def test_run_simulations_compact_dtype(mock_epimodel, engine):
+    """Integer outputs hold the same counts as float64 and are summarized in float32"""
+    kwargs = dict(
+        start_date="2023-01-01", end_date="2023-02-28", Nsim=3, rng=2, engine=engine
+    )
+    reference = mock_epimodel.run_simulations(**kwargs)
+    compact = mock_epimodel.run_simulations(dtype="int32", **kwargs)
+    for key, value in compact.get_stacked_compartments().items():
+        assert value.dtype == np.int32
+        np.testing.assert_array_equal(value, reference.get_stacked_compartments()[key])
+    for key, value in compact.get_stacked_transitions().items():
+        assert value.dtype == np.int32
+        np.testing.assert_array_equal(value, reference.get_stacked_transitions()[key])
+    quantiles = compact.get_quantiles_compartments(quantiles=[0.5])
+    assert quantiles["Infected_total"].dtype == np.float32
+
+
+def test_spawn_seeds():
+    """Child seeds depend only on the root seed; spawning from a generator advances it"""
+    first = spawn_seeds(5, 3)
+    assert [s.spawn_key for s in first] == [(0,), (1,), (2,)]
+    assert [s.entropy for s in first] == [5, 5, 5]
+    rng = np.random.default_rng(5)
+    assert [s.spawn_key for s in spawn_seeds(rng, 2)] == [(0,), (1,)]
+    assert [s.spawn_key for s in spawn_seeds(rng, 2)] == [(2,), (3,)]
+
+
+@pytest.mark.parametrize("engine", ["stochastic", "batch"])
+def test_run_simulations_parallel(mock_epimodel, engine, monkeypatch):
+    """Parallel results do not depend on the number of workers or on the executor"""
+    monkeypatch.setattr(epimodel_module, "SINK_BATCH_SIZE", 2)
+    kwargs = dict(
+        start_date="2023-01-01", end_date="2023-02-28", Nsim=5, rng=4, engine=engine
+    )
+    reference = mock_epimodel.run_simulations(n_jobs=1, **kwargs)
+    assert len(reference.trajectories) == 5
+    assert np.all(reference.trajectories[0].parameters["recovery_rate"] == 0.1)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        threaded = mock_epimodel.run_simulations(executor=executor, **kwargs)
+    processes = mock_epimodel.run_simulations(n_jobs=2, **kwargs)
+    for results in (threaded, processes):
+        for key, value in results.get_stacked_compartments().items():
+            np.testing.assert_array_equal(
+                value, reference.get_stacked_compartments()[key]
+            )
+
+    with pytest.raises(ValueError, match="n_jobs"):
+        mock_epimodel.run_simulations(n_jobs=0, **kwargs)
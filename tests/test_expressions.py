@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from evalidate import EvalException
+
+from epydemix.utils.expressions import (
+    EXPRESSION_MODEL,
+    compile_expression,
+    validate_expression,
+)
+from epydemix.utils.utils import evaluate
+
+
+def test_compile_expression_vectorized():
+    T, N = 5, 3
+    env = {
+        "transmission_rate": np.full((T, N), 0.3),
+        "vaccine_efficacy": np.linspace(0, 1, T * N).reshape(T, N),
+        "unused": np.zeros((T, N)),
+    }
+    compiled = compile_expression("transmission_rate * (1 - vaccine_efficacy) ** 2")
+    assert compiled.names == ("transmission_rate", "vaccine_efficacy")
+
+    result = compiled(env)
+    assert result.shape == (T, N)
+    assert np.allclose(result, 0.3 * (1 - env["vaccine_efficacy"]) ** 2)
+    # The environment is left untouched
+    assert set(env) == {"transmission_rate", "vaccine_efficacy", "unused"}
+
+
+def test_compile_expression_cached():
+    compile_expression.cache_clear()
+    first = compile_expression("a * b")
+    assert compile_expression("a * b") is first
+    assert compile_expression.cache_info().hits == 1
+
+
+def test_evaluate_does_not_grow_whitelist():
+    n_nodes = len(EXPRESSION_MODEL.nodes)
+    for _ in range(3):
+        assert evaluate("2 * x", {"x": 1.5}) == 3.0
+    assert len(EXPRESSION_MODEL.nodes) == n_nodes
+
+
+@pytest.mark.parametrize(
+    "expr", ["__import__('os')", "x.__class__", "lambda: 1", "x +"]
+)
+def test_invalid_expressions_rejected(expr):
+    with pytest.raises(EvalException):
+        validate_expression(expr)
+
+
+def test_missing_parameter_raises():
+    with pytest.raises(EvalException, match="beta"):
+        compile_expression("beta * gamma")({"gamma": 1.0})
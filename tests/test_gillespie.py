@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from epydemix.model import EpiModel
+from epydemix.model.gillespie import gillespie_simulation
+from epydemix.population import Population
+
+
+@pytest.fixture
+def sir_model():
+    model = EpiModel(
+        compartments=["Susceptible", "Infected", "Recovered"],
+        parameters={"transmission_rate": 0.3, "recovery_rate": 0.1},
+    )
+    model.add_transition(
+        "Susceptible", "Infected", "mediated", ("transmission_rate", "Infected")
+    )
+    model.add_transition("Infected", "Recovered", "spontaneous", "recovery_rate")
+
+    population = Population()
+    population.add_population([1000, 2000])
+    population.add_contact_matrix(np.array([[1.0, 0.5], [0.5, 1.0]]))
+    model.set_population(population)
+    return model
+
+
+def _run(model, initial_conditions, T=10, **kwargs):
+    return gillespie_simulation(
+        T=T,
+        contact_matrices=[
+            {"overall": model.population.contact_matrices["all"]} for _ in range(T)
+        ],
+        epimodel=model,
+        parameters={
+            "transmission_rate": np.full((T, 2), 0.3),
+            "recovery_rate": np.full((T, 2), 0.1),
+        },
+        initial_conditions=initial_conditions,
+        dt=1.0,
+        **kwargs,
+    )
+
+
+def test_gillespie_events_are_consistent(sir_model):
+    initial_conditions = np.array([[990, 1990], [10, 10], [0, 0]])
+    compartments, transitions = _run(sir_model, initial_conditions, rng=1)
+
+    assert compartments.shape == (10, 3, 2)
+    assert np.all(compartments.sum(axis=1) == [1000, 2000])
+    assert np.array_equal(compartments, np.round(compartments))
+    # Every recorded event moves exactly one individual
+    infected = sir_model.transitions_idx["Susceptible_to_Infected"]
+    assert np.array_equal(
+        initial_conditions[0] - compartments[:, 0],
+        np.cumsum(transitions[:, infected], axis=0),
+    )
+
+    again, _ = _run(sir_model, initial_conditions, rng=1)
+    assert np.array_equal(compartments, again)
+
+
+def test_gillespie_exponential_decay(sir_model):
+    """Without susceptibles, the infected decay with mean I0 * exp(-mu * t)"""
+    initial_conditions = np.array([[0, 0], [1000, 2000], [0, 0]])
+    infected = np.mean(
+        [_run(sir_model, initial_conditions, rng=s)[0][:, 1] for s in range(5)],
+        axis=0,
+    )
+    expected = np.exp(-0.1 * np.arange(1, 11))[:, None] * [1000, 2000]
+    assert np.allclose(infected, expected, rtol=0.05)
+
+
+def test_gillespie_hybrid_threshold(sir_model):
+    initial_conditions = np.array([[990, 1990], [10, 10], [0, 0]])
+    compartments, transitions = _run(
+        sir_model, initial_conditions, rng=2, hybrid_threshold=100
+    )
+    assert np.all(compartments.sum(axis=1) == [1000, 2000])
+    assert np.all(compartments >= 0)
+    assert transitions.sum() > 0
+
+
+def test_run_simulations_gillespie_engine(sir_model):
+    kwargs = dict(
+        start_date="2023-01-01",
+        end_date="2023-01-20",
+        initial_conditions_dict={
+            "Susceptible": [995, 1995],
+            "Infected": [5, 5],
+            "Recovered": [0, 0],
+        },
+        Nsim=2,
+        engine="gillespie",
+        rng=3,
+    )
+    results = sir_model.run_simulations(**kwargs)
+    infected = results.get_stacked_compartments()["Infected_total"]
+    assert infected.shape == (2, 20)
+    again = sir_model.run_simulations(**kwargs).get_stacked_compartments()
+    assert np.array_equal(infected, again["Infected_total"])
@@ -1,7 +1,15 @@
 import numpy as np
 import pytest
 
-from epydemix.calibration.metrics import ae, mae, mape, rmse, validate_data, wmape
+from epydemix.calibration.metrics import (
+    ae,
+    get_partial_distance,
+    mae,
+    mape,
+    rmse,
+    validate_data,
+    wmape,
+)
 
 
 @pytest.fixture
@@ -145,3 +153,18 @@ def test_metric_properties(sample_data):
     # Test triangle inequality for MAE
     third = {"data": np.array([11, 19, 31, 39, 51])}
     assert mae(observed, simulated) <= mae(observed, third) + mae(third, simulated)
+
+
+@pytest.mark.parametrize("distance", [rmse, mae, mape, wmape])
+def test_partial_distance_is_lower_bound(sample_data, distance):
+    """Partial distances grow with the observations simulated and end at the full distance"""
+    observed, simulated = sample_data
+    partial = get_partial_distance(distance)
+    bounds = [
+        partial(observed, {"data": simulated["data"][:k]})
+        for k in range(len(simulated["data"]) + 1)
+    ]
+    assert bounds[0] == 0
+    assert np.all(np.diff(bounds) >= 0)
+    assert bounds[-1] == pytest.approx(distance(observed, simulated))
+    assert get_partial_distance(ae) is None
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from epydemix.model.quantile_summary import QuantileSketch, QuantileSummary
+
+
+def assert_within_rank_error(estimates, samples, quantiles, rank_error):
+    """Each estimate lies between the order statistics at the quantile position plus or minus the bound"""
+    n = len(samples)
+    ordered = np.sort(samples, axis=0)
+    for estimate, q in zip(estimates, quantiles):
+        position = q * (n - 1)
+        low = int(max(np.floor(position - rank_error * n), 0))
+        high = int(min(np.ceil(position + rank_error * n), n - 1))
+        assert np.all(ordered[low] <= estimate) and np.all(estimate <= ordered[high])
+
+
+def test_quantile_sketch():
+    """Sketch estimates are exact up to k observations and within the rank-error bound beyond"""
+    rng = np.random.default_rng(0)
+    samples = rng.normal(size=(5000, 3, 2))
+    quantiles = [0.0, 0.025, 0.5, 0.95, 1.0]
+    sketch = QuantileSketch(quantiles, (3, 2), k=64)
+    assert np.isnan(sketch.result()).all()
+
+    for i, sample in enumerate(samples):
+        sketch.update(sample)
+        if i < 64 and i % 9 == 0:
+            np.testing.assert_allclose(
+                sketch.result(), np.quantile(samples[: i + 1], quantiles, axis=0)
+            )
+            assert sketch.rank_error() == 0
+            # Level 0 grows with the count instead of holding k rows from the start
+            assert sketch.nbytes <= 2 * (i + 1) * 6 * 8
+        elif i in (64, 200, 1023, 4999):
+            assert_within_rank_error(
+                sketch.result(), samples[: i + 1], quantiles, sketch.rank_error()
+            )
+    assert sketch.result().shape == (5, 3, 2)
+    assert sketch.rank_error() == (np.floor(np.log2(5000 / 64)) + 3) / 64
+    # Memory grows with the logarithm of the number of observations
+    assert len(sketch._levels) <= np.floor(np.log2(5000 / 64)) + 2
+    assert sketch.nbytes <= 64 * len(sketch._levels) * 6 * 8
+
+    with pytest.raises(ValueError, match="NaN"):
+        sketch.update(np.full((3, 2), np.nan))
+    with pytest.raises(ValueError):
+        QuantileSketch([1.5], (3,))
+    with pytest.raises(ValueError, match="even"):
+        QuantileSketch([0.5], (3,), k=7)
+
+
+def test_run_simulations_summary_exact(sir_model, sir_simulation_kwargs):
+    """With up to five trajectories, the summary equals the quantiles of the stored trajectories"""
+    reference = sir_model.run_simulations(Nsim=5, **sir_simulation_kwargs)
+    summary = sir_model.run_simulations(
+        Nsim=5, summary="quantiles", **sir_simulation_kwargs
+    )
+
+    assert isinstance(summary, QuantileSummary)
+    assert summary.Nsim == 5
+    n_values = len(summary.dates) * (
+        len(summary.compartment_keys) + len(summary.transition_keys)
+    )
+    assert summary.nbytes <= 2 * 5 * n_values * 8
+    expected = reference.get_quantiles_compartments()
+    result = summary.get_quantiles_compartments()
+    assert list(result.columns) == list(expected.columns)
+    assert result["date"].equals(expected["date"])
+    assert result["quantile"].equals(expected["quantile"])
+    np.testing.assert_allclose(
+        result.drop(columns=["date", "quantile"]).to_numpy(),
+        expected.drop(columns=["date", "quantile"]).to_numpy(),
+    )
+
+    expected = reference.get_quantiles_transitions(
+        quantiles=[0.5], variables=["S_to_I_total"]
+    )
+    result = summary.get_quantiles_transitions(
+        quantiles=[0.5], variables=["S_to_I_total"]
+    )
+    assert list(result.columns) == ["date", "quantile", "S_to_I_total"]
+    np.testing.assert_allclose(result["S_to_I_total"], expected["S_to_I_total"])
+
+    with pytest.raises(ValueError, match="not tracked"):
+        summary.get_quantiles_compartments(quantiles=[0.1])
+
+
+@pytest.mark.parametrize("engine", ["stochastic", "batch"])
+def test_run_simulations_summary_approximate(sir_model, engine, sir_simulation_kwargs):
+    """Beyond the sketch size, the summary is within its rank-error bound of the exact quantiles"""
+    quantiles = [0.05, 0.5, 0.95]
+    reference = sir_model.run_simulations(
+        Nsim=200, engine=engine, **sir_simulation_kwargs
+    )
+    summary = sir_model.run_simulations(
+        Nsim=200,
+        engine=engine,
+        summary="quantiles",
+        summary_quantiles=quantiles,
+        summary_sketch_size=32,
+        **sir_simulation_kwargs,
+    )
+
+    assert summary.Nsim == 200
+    assert 0 < summary.rank_error() < 0.2
+    result = summary.get_quantiles_compartments()
+    estimates = np.stack(
+        [result.loc[result["quantile"] == q, "I_total"].to_numpy() for q in quantiles]
+    )
+    samples = reference.get_stacked_compartments(["I_total"])["I_total"]
+    assert_within_rank_error(estimates, samples, quantiles, summary.rank_error())
+
+
+def test_run_simulations_summary_errors(sir_model, tmp_path, sir_simulation_kwargs):
+    """Unknown summaries, sinks with a summary and NaN outputs are rejected"""
+    with pytest.raises(ValueError, match="Unknown summary"):
+        sir_model.run_simulations(Nsim=2, summary="mean", **sir_simulation_kwargs)
+    with pytest.raises(ValueError, match="cannot be used together"):
+        sir_model.run_simulations(
+            Nsim=2,
+            summary="quantiles",
+            sink=str(tmp_path / "ensemble"),
+            **sir_simulation_kwargs,
+        )
+
+    template = sir_model.run_simulations(Nsim=1, **sir_simulation_kwargs).trajectories[
+        0
+    ]
+    summary = QuantileSummary(template)
+    template.compartments.array[0] = np.nan
+    with pytest.raises(ValueError, match="NaN"):
+        summary.update(template)
@@ -4,8 +4,9 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from epydemix.model.simulation_output import Trajectory
+from epydemix.model.simulation_output import NamedArrayView, Trajectory
 from epydemix.model.simulation_results import SimulationResults
+from epydemix.utils.utils import format_simulation_output
 
 
 @pytest.fixture
@@ -360,3 +361,155 @@ def test_get_quantiles_compartments_variables_with_ignore_nan(
     )
     assert "I" in df.columns
     assert "S" not in df.columns
+
+
+@pytest.fixture
+def array_backed_trajectories():
+    """Create trajectories backed by the slices of one (Nsim, T, C, N) array."""
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2024-01-01", periods=10, freq="D").tolist()
+    compartments = rng.integers(0, 100, size=(4, 10, 3, 2)).astype(float)
+    transitions = rng.integers(0, 10, size=(4, 10, 2, 2)).astype(float)
+    compartment_idx = {"S": 0, "I": 1, "R": 2}
+    transitions_idx = {"S_to_I": 0, "I_to_R": 1}
+    trajectories = [
+        Trajectory.from_arrays(
+            compartments[b],
+            transitions[b],
+            dates=dates,
+            compartment_idx=compartment_idx,
+            transitions_idx=transitions_idx,
+            demographics=["young", "old"],
+            parameters={},
+        )
+        for b in range(4)
+    ]
+    return compartments, transitions, trajectories
+
+
+def test_named_array_view_matches_format_simulation_output(
+    array_backed_trajectories,
+):
+    """Array-backed trajectories expose the same keys and values as the formatted dictionaries."""
+    compartments, transitions, trajectories = array_backed_trajectories
+    expected = format_simulation_output(
+        compartments[0],
+        transitions[0],
+        {"S": 0, "I": 1, "R": 2},
+        {"S_to_I": 0, "I_to_R": 1},
+        ["young", "old"],
+    )
+    trajectory = trajectories[0]
+    assert isinstance(trajectory.compartments, NamedArrayView)
+    assert list(trajectory.compartments) == list(expected["compartments"])
+    assert list(trajectory.transitions) == list(expected["transitions"])
+    for key, value in expected["compartments"].items():
+        np.testing.assert_array_equal(trajectory.compartments[key], value)
+    for key, value in expected["transitions"].items():
+        np.testing.assert_array_equal(trajectory.transitions[key], value)
+
+    # Group keys are views into the array and totals are cached
+    assert np.shares_memory(trajectory.compartments["I_old"], compartments)
+    assert trajectory.compartments["I_total"] is trajectory.compartments["I_total"]
+    with pytest.raises(KeyError):
+        trajectory.compartments["I"]
+
+
+def test_get_stacked_array_backed(array_backed_trajectories):
+    """Stacking slices of one array is zero-copy and matches stacking per key."""
+    compartments, transitions, trajectories = array_backed_trajectories
+    sim = SimulationResults(trajectories=trajectories, parameters={})
+
+    stacked = sim.get_stacked_compartments()
+    assert list(stacked) == list(trajectories[0].compartments)
+    assert np.shares_memory(stacked["S_young"], compartments)
+    np.testing.assert_array_equal(stacked["R_total"], compartments[:, :, 2].sum(-1))
+
+    stacked = sim.get_stacked_transitions(variables=["I_to_R_old", "X_to_Y"])
+    assert list(stacked) == ["I_to_R_old"]
+    np.testing.assert_array_equal(stacked["I_to_R_old"], transitions[:, :, 1, 1])
+
+    # Trajectories with their own arrays are stacked once
+    copies = [
+        Trajectory.from_arrays(
+            np.copy(t.compartments.array),
+            np.copy(t.transitions.array),
+            dates=t.dates,
+            compartment_idx=t.compartment_idx,
+            transitions_idx=t.transitions_idx,
+            demographics=["young", "old"],
+            parameters={},
+        )
+        for t in trajectories
+    ]
+    sim = SimulationResults(trajectories=copies, parameters={})
+    stacked = sim.get_stacked_compartments(variables=["S_young"])
+    assert not np.shares_memory(stacked["S_young"], compartments)
+    np.testing.assert_array_equal(stacked["S_young"], compartments[:, :, 0, 0])
+
+
+def pandas_resample(variables, dates, freq, method, fill_method):
+    df = pd.DataFrame(dict(variables), index=dates).resample(freq).agg(method)
+    if fill_method == "interpolate":
+        return df.interpolate(method="linear").ffill().bfill()
+    if fill_method == "ffill":
+        return df.ffill()
+    if fill_method == "bfill":
+        return df.bfill()
+    return df.fillna(0)
+
+
+@pytest.mark.parametrize(
+    "freq, method, fill_method",
+    [
+        ("W", "last", "ffill"),
+        ("3D", "mean", "ffill"),
+        ("12h", "last", "bfill"),
+        ("12h", "first", "interpolate"),
+        ("W", "max", "ffill"),
+        ("W", {"I_total": "max", "S_old": "sum"}, "ffill"),
+        ("W", "median", "ffill"),
+    ],
+)
+def test_resample_matches_pandas(array_backed_trajectories, freq, method, fill_method):
+    """Resampling the arrays gives the results of pandas, including empty bins"""
+    _, _, trajectories = array_backed_trajectories
+    sim = SimulationResults(trajectories=trajectories, parameters={})
+    resampled = sim.resample(freq, method, fill_method)
+
+    assert len(resampled.trajectories) == 4
+    for original, trajectory in zip(trajectories, resampled.trajectories):
+        compartments = pandas_resample(
+            original.compartments, original.dates, freq, method, fill_method
+        )
+        transitions = pandas_resample(
+            original.transitions, original.dates, freq, "sum", None
+        )
+        assert trajectory.dates == compartments.index.tolist()
+        assert list(trajectory.compartments) == list(compartments.columns)
+        for key, values in compartments.items():
+            np.testing.assert_allclose(trajectory.compartments[key], values)
+        for key, values in transitions.items():
+            np.testing.assert_allclose(trajectory.transitions[key], values)
+        # The original trajectories are left unchanged
+        assert len(original.dates) == 10
+
+
+def test_resample_array_backed_ensemble(array_backed_trajectories):
+    """Linear aggregations resample the stacked ensemble at once and keep the named views"""
+    compartments, transitions, trajectories = array_backed_trajectories
+    sim = SimulationResults(trajectories=trajectories, parameters={})
+    resampled = sim.resample("W", method_transitions="sum")
+
+    stacked = resampled.get_stacked_transitions()
+    assert stacked["S_to_I_total"].shape == (4, 2)
+    assert isinstance(resampled.trajectories[0].compartments, NamedArrayView)
+    np.testing.assert_array_equal(
+        stacked["S_to_I_young"][:, 0], transitions[:, :7, 0, 0].sum(axis=1)
+    )
+    np.testing.assert_array_equal(
+        resampled.get_stacked_compartments()["R_old"][:, -1], compartments[:, -1, 2, 1]
+    )
+    assert trajectories[0].resample("W", "last", "sum", "ffill") is trajectories[0]
+    with pytest.raises(ValueError, match="fill_method"):
+        sim.resample("W", fill_method="nearest")
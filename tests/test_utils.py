@@ -1,9 +1,16 @@
 """Unit tests for ``epydemix.utils.utils``."""
 
 import numpy as np
+import pandas as pd
 import pytest
 
-from epydemix.utils.utils import multinomial
+from epydemix.utils.utils import (
+    _multinomial_probs,
+    apply_overrides,
+    create_definitions,
+    multinomial,
+    multinomial_probs,
+)
 
 # A simple 3-compartment layout: index 0 is the 'stay' compartment, indices 1 and 2
 # are the two 'leave' destinations selected by the mask.
@@ -137,3 +144,75 @@ def test_multinomial_without_rng_is_nondeterministic():
     draw_a = multinomial(1000, RATES, STAY_IDX, MASK, dt=1.0)
     draw_b = multinomial(1000, RATES, STAY_IDX, MASK, dt=1.0)
     assert draw_a != pytest.approx(draw_b)
+
+
+@pytest.mark.parametrize("apply_linear_approximation", [False, True])
+def test_multinomial_probs_matches_scalar_version(apply_linear_approximation):
+    """The vectorized probabilities match the per-group compiled computation"""
+    rates = np.array([[0.0, 0.3, 0.1], [0.0, 0.0, 0.0], [0.0, 0.05, 0.2]])
+    probs = multinomial_probs(
+        rates, STAY_IDX, 0.5, apply_linear_approximation=apply_linear_approximation
+    )
+    for row, expected_rates in zip(probs, rates):
+        expected = _multinomial_probs(
+            1.0, expected_rates, STAY_IDX, MASK, 0.5, apply_linear_approximation
+        )
+        assert row == pytest.approx(expected)
+
+
+def test_create_definitions_are_broadcast_views():
+    """Compact parameters are not materialized into (T, n_age) arrays"""
+    definitions = create_definitions(
+        {"beta": 0.3, "gamma": np.arange(5.0), "mu": [[0.1, 0.2]]}, T=5, n_age=2
+    )
+    for name, expected in [
+        ("beta", np.full((5, 2), 0.3)),
+        ("gamma", np.tile(np.arange(5.0), (2, 1)).T),
+        ("mu", np.tile([[0.1, 0.2]], (5, 1))),
+    ]:
+        assert definitions[name].shape == (5, 2)
+        assert not definitions[name].flags.writeable
+        assert 0 in definitions[name].strides
+        np.testing.assert_array_equal(definitions[name], expected)
+
+
+def test_apply_overrides_copy_on_write():
+    """Overrides materialize only the overridden parameters and leave the definitions untouched"""
+    dates = list(pd.date_range("2024-01-01", periods=5))
+    definitions = create_definitions({"beta": 0.3, "gamma": 0.1}, T=5, n_age=2)
+    overrides = {
+        "beta": [{"start_date": "2024-01-02", "end_date": "2024-01-03", "value": 0.5}]
+    }
+    result = apply_overrides(definitions, overrides, dates)
+
+    np.testing.assert_array_equal(result["beta"][:, 0], [0.3, 0.5, 0.5, 0.3, 0.3])
+    np.testing.assert_array_equal(definitions["beta"], np.full((5, 2), 0.3))
+    assert result["gamma"] is definitions["gamma"]
+
+
+def test_apply_overrides_stores_only_overridden_steps():
+    """Overrides keep the broadcast base and store values only for the steps they cover"""
+    dates = list(pd.date_range("2024-01-01", periods=100))
+    definitions = create_definitions({"beta": 0.3}, T=100, n_age=3)
+    overrides = {
+        "beta": [
+            {"start_date": "2024-01-11", "end_date": "2024-01-20", "value": 0.5},
+            {
+                "start_date": "2024-01-16",
+                "end_date": "2024-01-18",
+                "value": [[0.1, 0.2, 0.3]] * 3,
+            },
+        ]
+    }
+    beta = apply_overrides(definitions, overrides, dates)["beta"]
+
+    expected = np.full((100, 3), 0.3)
+    expected[10:20] = 0.5
+    expected[15:18] = [0.1, 0.2, 0.3]
+    assert beta.shape == (100, 3) and np.ndim(beta) == 2
+    assert beta.base is definitions["beta"]
+    assert sum(np.asarray(piece).size for piece in beta.pieces) == 10 * 3 + 3 * 3
+    for t in range(100):
+        np.testing.assert_array_equal(beta[t], expected[t])
+    np.testing.assert_array_equal(np.asarray(beta), expected)
+    np.testing.assert_allclose(beta * (1 - 0.5), expected * 0.5)